@@ -0,0 +1,56 @@
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+import multiconfigparser
+
+
+def bench_parse(path):
+    def run():
+        config = multiconfigparser.ConfigParserMultiOpt()
+        config.read(path)
+
+    return synthetic.best_time(run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time portfolio.ini parsing")
+    parser.add_argument("--lines", type=int, default=100000)
+    args = parser.parse_args()
+
+    # the same number of lines spread over many sections, and piled into a few
+    # sections with thousands of fills each (the case that used to be quadratic)
+    layouts = [
+        ("1000 tickers", 1000),
+        ("100 tickers", 100),
+        ("10 tickers", 10),
+        ("1 ticker", 1),
+    ]
+
+    print("{:>14}{:>10}{:>12}{:>14}".format("layout", "lines", "seconds", "lines/s"))
+    with tempfile.TemporaryDirectory() as directory:
+        for name, count in layouts:
+            # every section has a header, a graph key, its fills and a blank line
+            fills = max(1, args.lines // count - 3)
+            path = synthetic.portfolio_ini(
+                os.path.join(directory, "portfolio.ini"),
+                synthetic.tickers(count),
+                fills_per_ticker=fills,
+            )
+            with open(path) as fp:
+                lines = sum(1 for _ in fp)
+            elapsed = bench_parse(path)
+            print(
+                "{:>14}{:>10}{:>12.4f}{:>14.0f}".format(
+                    name, lines, elapsed, lines / elapsed
+                )
+            )
+    return
+
+
+if __name__ == "__main__":
+    main()
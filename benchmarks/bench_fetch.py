@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+import argparse
+import urllib.request
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+import mockquotes
+import providers
+
+
+# one blocking request after another, the way a synchronous client fetches
+def fetch_sync(url, symbols):
+    latencies = []
+    for symbol in symbols:
+        start = time.perf_counter()
+        with urllib.request.urlopen(url + "/v8/finance/chart/" + symbol) as response:
+            providers.parse_chart(response.read())
+        latencies.append(time.perf_counter() - start)
+    return latencies, None
+
+
+# every request through ChartProvider, each one timed from sending it to its
+# complete response
+def fetch_pooled(url, symbols, connections):
+    provider = providers.ChartProvider(url, connections)
+    provider.start_loop()
+    latencies = []
+    request = provider.pool.request
+
+    async def timed_request(*args):
+        start = time.perf_counter()
+        try:
+            return await request(*args)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    provider.pool.request = timed_request
+    start = time.perf_counter()
+    first = None
+    for _ in provider.stream(symbols, "1m", period="1d"):
+        first = first or time.perf_counter() - start
+    provider.close()
+    return latencies, first
+
+
+def run(name, server, fetch, symbols):
+    url = server.start()
+    start = time.perf_counter()
+    latencies, first = fetch(url, symbols)
+    elapsed = time.perf_counter() - start
+    server.stop()
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    print(
+        "{:>16}{:>8}{:>10.2f}{:>10.0f}{:>8}{:>9.1f}{:>9.1f}{:>9.1f}{:>10}".format(
+            name,
+            len(symbols),
+            elapsed,
+            len(symbols) / elapsed,
+            server.connections,
+            p50,
+            p95,
+            p99,
+            "-" if first is None else "{:.0f}".format(first * 1000),
+        )
+    )
+    return
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time chart downloads against the local mock quote server"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument(
+        "--sync-limit",
+        type=int,
+        default=100,
+        help="the synchronous client only fetches this many tickers",
+    )
+    args = parser.parse_args()
+
+    print(
+        "{:>16}{:>8}{:>10}{:>10}{:>8}{:>9}{:>9}{:>9}{:>10}".format(
+            "client",
+            "tickers",
+            "seconds",
+            "per sec",
+            "conns",
+            "p50 ms",
+            "p95 ms",
+            "p99 ms",
+            "first ms",
+        )
+    )
+    for count in args.sizes:
+        symbols = synthetic.tickers(count)
+
+        def server(keep_alive=True):
+            return mockquotes.MockQuoteServer(
+                args.latency, args.jitter, keep_alive=keep_alive
+            )
+
+        run("sync", server(), fetch_sync, symbols[: args.sync_limit])
+        pooled = lambda url, symbols: fetch_pooled(url, symbols, args.connections)
+        run("no keep-alive", server(False), pooled, symbols)
+        run("pooled", server(), pooled, symbols)
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+import autocolors
+
+from portfolio import Graph, Stock
+from pricematrix import PriceMatrix
+
+BACKENDS = ("plotille", "braille")
+
+
+def stocks(count, bars):
+    symbols = synthetic.tickers(count)
+    matrix = PriceMatrix.from_download(
+        synthetic.market_data(symbols, bars=bars), symbols
+    )
+    return [Stock.from_matrix(matrix, symbol) for symbol in symbols]
+
+
+def render(backend, series, width, height):
+    graph = Graph(
+        series,
+        width,
+        height,
+        [None] * len(series),
+        timezone="America/New_York",
+        backend=backend,
+    )
+    graph.gen_graph(autocolors.color_list)
+    return graph()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the graph backends")
+    parser.add_argument("--bars", type=int, default=390)
+    args = parser.parse_args()
+
+    # time the colored output a terminal would get
+    os.environ["FORCE_COLOR"] = "1"
+
+    cases = [("80x20, 1 series", 80, 20, 1), ("80x20, 50 series", 80, 20, 50)]
+    cases += [("300x80, 1 series", 300, 80, 1), ("300x80, 50 series", 300, 80, 50)]
+
+    print(
+        "{:>20}".format("graph")
+        + "".join("{:>12}".format(backend) for backend in BACKENDS)
+        + "{:>10}{:>12}".format("speedup", "identical")
+    )
+    for name, width, height, count in cases:
+        series = stocks(count, args.bars)
+        timings = []
+        outputs = []
+        for backend in BACKENDS:
+            timings.append(
+                synthetic.best_time(lambda: render(backend, series, width, height))
+            )
+            outputs.append(render(backend, series, width, height))
+        print(
+            "{:>20}".format(name)
+            + "".join("{:>10.1f}ms".format(timing * 1000) for timing in timings)
+            + "{:>9.1f}x{:>12}".format(
+                timings[0] / timings[1], str(len(set(outputs)) == 1)
+            )
+        )
+    return
+
+
+if __name__ == "__main__":
+    main()
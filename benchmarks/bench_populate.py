@@ -0,0 +1,53 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+import portfolio as port
+
+
+def bench_populate(count, bars):
+    symbols = synthetic.tickers(count)
+    frame = synthetic.market_data(symbols, bars=bars)
+    stocks_config = synthetic.StocksConfig(
+        {symbol: {"buy": "10@100"} for symbol in symbols}
+    )
+
+    portfolio = port.Portfolio()
+    portfolio.provider = synthetic.StaticProvider(frame)
+
+    def run():
+        portfolio.reset()
+        portfolio.populate(stocks_config, synthetic.Args())
+
+    return synthetic.best_time(run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time Portfolio.populate")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 500, 1000, 2500, 5000]
+    )
+    parser.add_argument("--bars", type=int, default=390)
+    args = parser.parse_args()
+
+    print("{:>8}{:>12}{:>16}".format("tickers", "seconds", "us per ticker"))
+    per_ticker = []
+    for count in args.sizes:
+        elapsed = bench_populate(count, args.bars)
+        per_ticker.append(elapsed / count)
+        print("{:>8}{:>12.4f}{:>16.1f}".format(count, elapsed, elapsed / count * 1e6))
+
+    # linear scaling keeps the cost per ticker flat as the portfolio grows
+    print(
+        "\ncost per ticker at {} vs {} tickers: {:.2f}x".format(
+            args.sizes[-1], args.sizes[0], per_ticker[-1] / per_ticker[0]
+        )
+    )
+    return
+
+
+if __name__ == "__main__":
+    main()
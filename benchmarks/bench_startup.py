@@ -0,0 +1,82 @@
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules the entry point must not import before they are needed
+HEAVY_MODULES = ("pandas", "yfinance", "requests", "curl_cffi", "plotille")
+
+CHECK_IMPORTS = (
+    "import sys, cliStocksTracker; "
+    "print(' '.join(m for m in {!r} if m in sys.modules))".format(HEAVY_MODULES)
+)
+
+
+# median wall time of a fresh interpreter running code, in seconds
+def time_python(code, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=REPO, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+# the modules that took the longest to import, from python -X importtime
+def slowest_imports(code, count):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[12:].split("|")]
+        # only top level packages, their submodules are part of the cumulative time
+        if not name.startswith(" ") and "." not in name:
+            imports.append((int(cumulative), name))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the startup of the CLI")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    interpreter = time_python("pass", args.runs)
+    entry_point = time_python("import cliStocksTracker", args.runs)
+    print("{:32}{:>10.1f} ms".format("bare interpreter", interpreter * 1000))
+    print("{:32}{:>10.1f} ms".format("import cliStocksTracker", entry_point * 1000))
+    print(
+        "{:32}{:>10.1f} ms".format(
+            "startup cost of the entry point", (entry_point - interpreter) * 1000
+        )
+    )
+
+    loaded = subprocess.run(
+        [sys.executable, "-c", CHECK_IMPORTS],
+        cwd=REPO,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    print("\nheavy modules imported at startup: " + (", ".join(loaded) or "none"))
+
+    print("\nslowest imports:")
+    for cumulative, name in slowest_imports("import cliStocksTracker", 8):
+        print("  {:30}{:>10.1f} ms".format(name, cumulative / 1000))
+
+    # a non-zero exit lets CI fail when a heavy import sneaks back in
+    return 1 if loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
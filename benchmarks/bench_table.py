@@ -0,0 +1,62 @@
+import io
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+import portfolio as port
+
+from renderer import Renderer
+
+
+# a portfolio of count positions, populated from synthetic market data
+def build_portfolio(count, bars=30):
+    symbols = synthetic.tickers(count)
+    portfolio = port.Portfolio()
+    portfolio.provider = synthetic.StaticProvider(
+        synthetic.market_data(symbols, bars=bars)
+    )
+    portfolio.reset()
+    portfolio.populate(
+        synthetic.StocksConfig({symbol: {"buy": "10@100"} for symbol in symbols}),
+        synthetic.Args(),
+    )
+    return portfolio
+
+
+class CountingStream(io.StringIO):
+    """Counts the writes a frame takes"""
+
+    writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time rendering the table")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    print("{:>8}{:>12}{:>10}{:>10}".format("rows", "ms", "writes", "bytes"))
+    for count in args.sizes:
+        portfolio = build_portfolio(count)
+        renderer = Renderer("math", portfolio)
+        renderer.portfolio = portfolio
+
+        elapsed = synthetic.best_time(lambda: renderer.render(stream=io.StringIO()))
+        stream = CountingStream()
+        renderer.render(stream=stream)
+        print(
+            "{:>8}{:>12.1f}{:>10}{:>10}".format(
+                count, elapsed * 1000, stream.writes, len(stream.getvalue())
+            )
+        )
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import sys
+import json
+import zlib
+import asyncio
+import argparse
+import threading
+import urllib.parse
+
+import numpy as np
+
+BAR_SECONDS = {"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600}
+SESSION_START = 1614609000  # 2021-03-01 14:30 UTC
+
+
+# a Yahoo chart API response with random walk bars, the same ones for
+# the same ticker every time
+def chart_response(ticker, interval="1m", bars=390):
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+    prices = np.round(100 + np.cumsum(rng.normal(0, 0.5, bars)), 4)
+    step = BAR_SECONDS.get(interval, 60)
+    quote = {field: prices.tolist() for field in ["open", "high", "low", "close"]}
+    quote["volume"] = rng.integers(100, 10000, bars).tolist()
+    result = {
+        "meta": {"symbol": ticker, "dataGranularity": interval},
+        "timestamp": list(range(SESSION_START, SESSION_START + bars * step, step)),
+        "indicators": {"quote": [quote]},
+    }
+    return {"chart": {"result": [result], "error": None}}
+
+
+class MockQuoteServer:
+    """A local stand-in for the Yahoo chart API, for offline tests and benchmarks.
+
+    Serves GET /v8/finance/chart/<ticker> over HTTP/1.1 with keep-alive after
+    latency seconds (plus up to jitter more), answers 404 for tickers starting
+    with "MISSING" and a 503 for every fail_every-th request. It runs on its
+    own event loop thread, so the client under test has the process to itself.
+    """
+
+    def __init__(
+        self, latency=0.0, jitter=0.0, bars=390, keep_alive=True, fail_every=0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.bars = bars
+        self.keep_alive = keep_alive
+        self.fail_every = fail_every
+        self.connections = 0
+        self.requests = 0
+        self.rng = np.random.default_rng(0)
+        self.responses = {}
+        self.writers = set()
+        self.loop = None
+        self.server = None
+        return
+
+    def start(self, port=0):
+        started = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self.handle, "127.0.0.1", port)
+            )
+            started.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        started.wait()
+        return "http://127.0.0.1:{}".format(self.server.sockets[0].getsockname()[1])
+
+    def stop(self):
+        async def close():
+            self.server.close()
+            # hang up on idle keep-alive connections, so their handlers return
+            for writer in list(self.writers):
+                writer.close()
+            tasks = asyncio.all_tasks() - {asyncio.current_task()}
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        return
+
+    def body(self, ticker, interval):
+        key = (ticker, interval)
+        if key not in self.responses:
+            response = chart_response(ticker, interval, self.bars)
+            self.responses[key] = json.dumps(response).encode()
+        return self.responses[key]
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # headers are not needed
+
+                self.requests += 1
+                status, body = self.respond(request_line.decode().split(" ")[1])
+                delay = self.latency + self.jitter * self.rng.random()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                headers = "HTTP/1.1 {}\r\nContent-Type: application/json\r\n".format(
+                    status
+                )
+                headers += "Content-Length: {}\r\n".format(len(body))
+                headers += "Connection: {}\r\n\r\n".format(
+                    "keep-alive" if self.keep_alive else "close"
+                )
+                writer.write(headers.encode() + body)
+                await writer.drain()
+                if not self.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+        return
+
+    def respond(self, target):
+        parts = urllib.parse.urlsplit(target)
+        params = dict(urllib.parse.parse_qsl(parts.query))
+        ticker = parts.path.rsplit("/", 1)[-1]
+
+        if self.fail_every and self.requests % self.fail_every == 0:
+            return "503 Service Unavailable", b'{"chart": {"result": null}}'
+        if not parts.path.startswith("/v8/finance/chart/") or ticker.startswith(
+            "MISSING"
+        ):
+            error = {"code": "Not Found", "description": "No data found"}
+            return (
+                "404 Not Found",
+                json.dumps({"chart": {"result": None, "error": error}}).encode(),
+            )
+        return "200 OK", self.body(ticker, params.get("interval", "1m"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve mock Yahoo chart data")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = MockQuoteServer(args.latency, args.jitter)
+    url = server.start(args.port)
+    print("Serving chart data on", url, "(--provider chart --chart-url", url + ")")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+    return
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+import io
+import os
+import sys
+import json
+import argparse
+import tempfile
+import platform
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+import multiconfigparser
+import portfolio as port
+
+from renderer import Renderer
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+
+# at most this many tickers are graphed, one graph each
+MAX_GRAPHS = 10
+
+
+class Scale:
+    """One synthetic portfolio: its portfolio.ini, parsed sections and market data"""
+
+    def __init__(self, count, bars, directory):
+        self.count = count
+        self.symbols = synthetic.tickers(count)
+        self.path = synthetic.portfolio_ini(
+            os.path.join(directory, "portfolio_" + str(count) + ".ini"),
+            self.symbols,
+            fills_per_ticker=4,
+            graph_every=max(count // MAX_GRAPHS, 1),
+        )
+        self.stocks_config = multiconfigparser.ConfigParserMultiOpt()
+        self.stocks_config.read(self.path)
+        self.frame = synthetic.market_data(self.symbols, bars=bars)
+        return
+
+    def portfolio(self):
+        portfolio = port.Portfolio()
+        portfolio.provider = synthetic.StaticProvider(self.frame)
+        portfolio.graph_cache = None
+        portfolio.store = None
+        return portfolio
+
+    def populated(self):
+        portfolio = self.portfolio()
+        portfolio.reset()
+        portfolio.populate(self.stocks_config, synthetic.Args())
+        return portfolio
+
+
+def parse(scale):
+    def run():
+        config = multiconfigparser.ConfigParserMultiOpt()
+        config.read(scale.path)
+
+    return run
+
+
+def average_buyin(scale):
+    portfolio = scale.portfolio()
+    fills = [
+        (
+            scale.stocks_config[symbol].get("buy", ()),
+            scale.stocks_config[symbol].get("sell", ()),
+        )
+        for symbol in scale.symbols
+    ]
+
+    def run():
+        for buys, sells in fills:
+            portfolio.average_buyin(buys, sells)
+
+    return run
+
+
+def populate(scale):
+    portfolio = scale.portfolio()
+
+    def run():
+        portfolio.reset()
+        portfolio.populate(scale.stocks_config, synthetic.Args())
+
+    return run
+
+
+# one case per graph backend, they differ by an order of magnitude
+def gen_graphs(backend):
+    def case(scale):
+        portfolio = scale.populated()
+
+        def run():
+            portfolio.gen_graphs(True, 80, 20, "UTC", backend=backend)
+
+        return run
+
+    return case
+
+
+def print_new_table(scale):
+    renderer = Renderer("math", scale.populated())
+
+    def run():
+        renderer.print_new_table(out=io.StringIO())
+
+    return run
+
+
+# name -> a function of a Scale returning the callable to time
+CASES = {
+    "parse": parse,
+    "average_buyin": average_buyin,
+    "populate": populate,
+    "gen_graphs_plotille": gen_graphs("plotille"),
+    "gen_graphs_braille": gen_graphs("braille"),
+    "print_new_table": print_new_table,
+}
+
+
+# peak bytes allocated by one run of fn, traced apart from the timed runs so
+# tracemalloc's overhead never shows up in the times
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_suite(sizes, cases, bars=390, repeat=3, out=sys.stdout):
+    results = {}
+    out.write(
+        "{:>20}{:>9}{:>12}{:>14}{:>12}\n".format(
+            "case", "tickers", "ms", "us/ticker", "peak MB"
+        )
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for count in sizes:
+            scale = Scale(count, bars, directory)
+            for name in cases:
+                fn = CASES[name](scale)
+                seconds = synthetic.best_time(fn, repeat)
+                peak = peak_memory(fn)
+                results[name + "/" + str(count)] = {
+                    "seconds": seconds,
+                    "peak_bytes": peak,
+                }
+                out.write(
+                    "{:>20}{:>9}{:>12.2f}{:>14.2f}{:>12.2f}\n".format(
+                        name,
+                        count,
+                        seconds * 1000,
+                        seconds / count * 1e6,
+                        peak / 2**20,
+                    )
+                )
+    return results
+
+
+# the results slower or hungrier than the baseline by more than tolerance
+# (0.25 is 25%), as (key, metric, baseline, result) tuples; tiny absolute
+# differences are timer and allocator noise and never count
+def compare(results, baseline, tolerance=0.25, min_seconds=0.001, min_bytes=2**16):
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric, floor in (("seconds", min_seconds), ("peak_bytes", min_bytes)):
+            if (
+                result[metric] > base[metric] * (1 + tolerance)
+                and result[metric] - base[metric] > floor
+            ):
+                regressions.append((key, metric, base[metric], result[metric]))
+    return regressions
+
+
+def save_baseline(path, results):
+    document = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w") as fp:
+        json.dump(document, fp, indent=2, sort_keys=True)
+        fp.write("\n")
+    return
+
+
+def load_baseline(path):
+    try:
+        with open(path) as fp:
+            return json.load(fp)["results"]
+    except FileNotFoundError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the main code paths on synthetic portfolios, offline"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--bars", type=int, default=390)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        help="results to compare against (default benchmarks/baseline.json)",
+        default=DEFAULT_BASELINE,
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store these results as the new baseline instead of comparing",
+        default=False,
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        help="how much slower or bigger than the baseline counts as a regression (default 0.25)",
+        default=0.25,
+    )
+    parser.add_argument("--json", type=str, metavar="PATH", default=None)
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.cases, args.bars, args.repeat)
+    if args.json is not None:
+        with open(args.json, "w") as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print("\nSaved the baseline to", args.baseline)
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("\nNo baseline at", args.baseline + ", run with --save-baseline first")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if len(regressions) == 0:
+        print("\nNo regressions against", args.baseline)
+        return 0
+
+    print("\nRegressions against", args.baseline + ":")
+    for key, metric, base, result in regressions:
+        print(
+            "  {:<24}{:<12}{:>14.4g} -> {:<14.4g}{:>+8.0%}".format(
+                key, metric, base, result, result / base - 1
+            )
+        )
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import providers
+
+
+def tickers(count):
+    return ["T" + str(i).zfill(5) for i in range(count)]
+
+
+# random walk OHLCV bars for many tickers in the layout of yfinance.download
+# nan_fraction of the bars are missing, like thinly traded tickers in a real download
+def market_data(symbols, bars=390, interval="1min", nan_fraction=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2021-03-01 14:30", periods=bars, freq=interval, tz="UTC")
+
+    prices = 100 + np.cumsum(rng.normal(0, 0.5, size=(bars, len(symbols))), axis=0)
+    prices = np.abs(prices) + 1
+    prices[rng.random(prices.shape) < nan_fraction] = np.nan
+    volume = rng.integers(100, 10000, size=prices.shape).astype(float)
+
+    fields = {"Close": prices, "High": prices, "Low": prices, "Open": prices}
+    fields["Volume"] = volume
+    columns = pd.MultiIndex.from_product([list(fields), symbols])
+    return pd.DataFrame(np.hstack(list(fields.values())), index=index, columns=columns)
+
+
+# portfolio.ini with fills_per_ticker buy/sell keys in every section
+def portfolio_ini(path, symbols, fills_per_ticker=2, graph_every=0, seed=0):
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as fp:
+        for i, symbol in enumerate(symbols):
+            fp.write("[" + symbol + "]\n")
+            fp.write("graph=" + str(graph_every > 0 and i % graph_every == 0) + "\n")
+            counts = rng.integers(1, 100, size=fills_per_ticker)
+            prices = rng.uniform(1, 500, size=fills_per_ticker)
+            for j in range(fills_per_ticker):
+                # one sell for every three buys, never more than what was bought
+                key = "sell" if j % 4 == 3 else "buy"
+                count = counts[j] if key == "buy" else 1
+                fp.write(key + "=" + str(count) + "@" + str(round(prices[j], 2)) + "\n")
+            fp.write("\n")
+    return path
+
+
+class StaticProvider(providers.MarketDataProvider):
+    """Serves a prebuilt DataFrame, so benchmarks only measure the local work"""
+
+    name = "static"
+    batch_size = sys.maxsize  # the frame already holds every ticker
+
+    def __init__(self, frame):
+        self.frame = frame
+        return
+
+    def download(self, tickers, interval, period=None, start=None):
+        return self.frame
+
+
+class StocksConfig(dict):
+    """Minimal stand-in for a parsed portfolio.ini"""
+
+    def sections(self):
+        return list(self.keys())
+
+
+class Args:
+    time_period = "1d"
+    time_interval = "1m"
+    provider = None
+
+
+# best of repeat runs of fn(), in seconds
+def best_time(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,239 @@
+import os
+import sys
+import math
+
+import numpy as np
+
+# bit of the braille character for the dot at [row within the cell][column]
+# rows count from the bottom of the cell, like the canvas rows
+DOT_BITS = np.array([[1 << 6, 1 << 7], [1 << 2, 1 << 5], [1 << 1, 1 << 4], [1, 1 << 3]])
+
+BRAILLE = np.array([chr(0x2800 + code) for code in range(256)])
+
+RESET = "\x1b[0m"
+
+
+# the same rules as plotille: no colors for NO_COLOR, FORCE_COLOR=0 or when the
+# output is not a terminal unless FORCE_COLOR is set
+def colors_enabled():
+    if os.environ.get("NO_COLOR"):
+        return False
+    force_color = os.environ.get("FORCE_COLOR")
+    if force_color:
+        return force_color.strip().lower() not in ("0", "false", "none")
+    return sys.stdout.isatty()
+
+
+def rgb_code(rgb):
+    return "\x1b[38;2;" + ";".join(str(int(c)) for c in rgb) + "m"
+
+
+# numbers are formatted like plotille's axis labels
+def format_number(value, chars, left=False):
+    value = float(value)
+    align = "<" if left else ""
+    if abs(value - round(value)) < 1e-8:
+        value = int(round(value))
+        digits = 0 if value == 0 else math.ceil(math.log10(abs(value)))
+        if digits + (value < 0) > chars:
+            return large_number(value, chars, align, digits, value < 0)
+        return "{:{}{}d}".format(value, align, chars)
+
+    sign = 1 if value < 0 else 0
+    order = math.log10(abs(value))
+    if order >= 0:
+        digits = math.ceil(order)
+        if digits + sign > chars:
+            return large_number(value, chars, align, digits, sign)
+        fractionals = int(max(0, chars - 1 - digits - sign))
+        return "{:{}{}.{}f}".format(value, align, chars, fractionals)
+
+    order = abs(math.floor(order))
+    if order > 4:
+        exp_digits = int(max(2, math.ceil(math.log10(order)))) + 2
+        return "{:{}{}.{}e}".format(value, align, chars, chars - exp_digits - 2 - sign)
+    return "{:{}{}.{}f}".format(value, align, chars, chars - 2 - sign)
+
+
+def large_number(value, chars, align, digits, sign):
+    exp_digits = max(2, math.ceil(math.log10(digits))) + 2
+    residual_digits = int(max(0, chars - exp_digits - sign - 2))
+    return "{:{}{}.{}e}".format(value, align, chars, residual_digits)
+
+
+# dot coordinates of the polyline through (x, y), already in dot units
+# the points themselves plus the interpolated dots of every segment, computed
+# for all segments at once with the same rounding plotille uses
+def line_dots(x, y):
+    dx = np.diff(x)
+    dy = np.diff(y)
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+
+    inner = np.maximum(steps - 1, 0)
+    segment = np.repeat(np.arange(len(dx)), inner)
+    first = np.repeat(np.cumsum(inner) - inner, inner)
+    i = np.arange(len(segment)) - first + 1
+
+    xs = x[segment] + np.rint(dx[segment] / steps[segment] * i).astype(np.int64)
+    ys = y[segment] + np.rint(dy[segment] / steps[segment] * i).astype(np.int64)
+    return np.concatenate((x, xs)), np.concatenate((y, ys))
+
+
+class Figure:
+    """A braille line chart drawn with NumPy, a stand in for plotille.Figure.
+
+    It supports the part of the plotille API Graph uses, and draws the same
+    dots, axes and legend. Instead of setting dots one by one, every series is
+    turned into dot coordinates with array operations, OR-ed into a grid of
+    braille codes with np.bitwise_or.at, and every cell takes the color of
+    the last series that drew in it. The text is assembled in a single join.
+    Only the rgb color mode is supported.
+    """
+
+    def __init__(self):
+        self.width = 40
+        self.height = 20
+        self.color_mode = "rgb"
+        self.with_colors = True
+        self.origin = True
+        self.linesep = os.linesep
+        self.x_label = "X"
+        self.y_label = "Y"
+        self.x_ticks_fkt = None
+        self.x_limits = (0, 1)
+        self.y_limits = (0, 1)
+        self.series = []
+        return
+
+    def set_x_limits(self, min_=None, max_=None):
+        self.x_limits = (float(min_), float(max_))
+        return
+
+    def set_y_limits(self, min_=None, max_=None):
+        self.y_limits = (float(min_), float(max_))
+        return
+
+    def plot(self, X, Y, lc=None, label=None):
+        self.series.append(
+            (np.asarray(X, dtype=float), np.asarray(Y, dtype=float), lc, label)
+        )
+        return
+
+    # the canvas as (rows, columns) arrays of braille codes and series numbers,
+    # row 0 is the bottom row
+    def rasterize(self):
+        x_min, x_max = self.x_limits
+        y_min, y_max = self.y_limits
+        x_step = abs((x_max - x_min) / (self.width * 2))
+        y_step = abs((y_max - y_min) / (self.height * 4))
+
+        xs, ys, owners = [], [], []
+        lines = [(x, y, number) for number, (x, y, _, _) in enumerate(self.series)]
+        if self.origin and len(self.series) > 0:
+            # plotille draws both axes through the origin, without a color
+            lines.append((np.array([x_min, x_max]), np.array([0.0, 0.0]), -1))
+            lines.append((np.array([0.0, 0.0]), np.array([y_min, y_max]), -1))
+
+        for x, y, number in lines:
+            x = np.rint((x - x_min) / x_step).astype(np.int64)
+            y = np.rint((y - y_min) / y_step).astype(np.int64)
+            x, y = line_dots(x, y)
+            xs.append(x)
+            ys.append(y)
+            owners.append(np.full(len(x), number))
+
+        codes = np.zeros(self.height * self.width, dtype=np.int64)
+        owner = np.full(self.height * self.width, -1)
+        if len(xs) > 0:
+            x = np.concatenate(xs)
+            y = np.concatenate(ys)
+            number = np.concatenate(owners)
+            column, row = x // 2, y // 4
+            inside = (column >= 0) & (column < self.width)
+            inside &= (row >= 0) & (row < self.height)
+            x, y, number = x[inside], y[inside], number[inside]
+            cell = row[inside] * self.width + column[inside]
+            np.bitwise_or.at(codes, cell, DOT_BITS[y % 4, x % 2])
+            np.maximum.at(owner, cell, number)
+
+        shape = (self.height, self.width)
+        return codes.reshape(shape), owner.reshape(shape)
+
+    def canvas(self):
+        codes, owner = self.rasterize()
+        cells = BRAILLE[codes]
+
+        if self.with_colors and colors_enabled():
+            starts = np.array(
+                [rgb_code(lc) if lc else "" for _, _, lc, _ in self.series] + [""]
+            )
+            ends = np.array([RESET if lc else "" for _, _, lc, _ in self.series] + [""])
+            # owner -1 (no series) picks the trailing empty string
+            cells = np.char.add(np.char.add(starts[owner], cells), ends[owner])
+
+        rows = cells[::-1]
+        return rows
+
+    def y_axis(self):
+        y_min, y_max = self.y_limits
+        y_delta = abs(y_max - y_min) / self.height
+        labels = [
+            format_number(i * y_delta + y_min, 10) + " | " for i in range(self.height)
+        ]
+        labels.append(format_number(self.height * y_delta + y_min, 10) + " |")
+
+        label = "({})".format(self.y_label)
+        left = (10 - len(label)) // 2
+        right = left + len(label) % 2
+        labels.append(" " * left + label + " " * right + " ^")
+        return labels[::-1]
+
+    def x_axis(self):
+        x_min, x_max = self.x_limits
+        x_delta = abs(x_max - x_min) / self.width
+        lines = [
+            "-" * 11
+            + "|-"
+            + "|---------" * (self.width // 10)
+            + "|"
+            + "-" * (self.width % 10)
+            + "-> ("
+            + self.x_label
+            + ")"
+        ]
+        ticks = []
+        for i in range(self.width // 10 + 1):
+            value = i * 10 * x_delta + x_min
+            if self.x_ticks_fkt is not None:
+                tick = self.x_ticks_fkt(value, (i + 1) * 10 * x_delta + x_min)
+                ticks.append(str(tick)[:9].ljust(9))
+            else:
+                ticks.append(format_number(value, 9, left=True))
+        lines.append(" " * 11 + "| " + " ".join(ticks))
+        return lines
+
+    def legend(self):
+        lines = []
+        with_colors = self.with_colors and colors_enabled()
+        for i, (_, _, lc, label) in enumerate(self.series):
+            text = "⠤⠤ " + (label or "Label {}".format(i))
+            if with_colors and lc:
+                text = rgb_code(lc) + text + RESET
+            lines.append(text)
+        return lines
+
+    def show(self, legend=False):
+        y_axis = self.y_axis()
+        rows = self.canvas()
+
+        # one token list for the whole figure, joined once
+        tokens = [y_axis[0], self.linesep, y_axis[1], self.linesep]
+        for label, row in zip(y_axis[2:], rows):
+            tokens.append(label)
+            tokens.extend(row.tolist())
+            tokens.append(self.linesep)
+        tokens.append(self.linesep.join(self.x_axis()))
+        if legend:
+            tokens += [self.linesep * 2, "Legend:", self.linesep, "-------"]
+            tokens += [self.linesep, self.linesep.join(self.legend())]
+        return "".join(tokens)
@@ -0,0 +1,225 @@
+import os
+import re
+import time
+import contextlib
+import pickle
+import tempfile
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+# pandas is imported by the functions that handle frames, so importing this
+# module stays cheap for the entry point (see benchmarks/bench_startup.py)
+
+# how long (in seconds) a cached download stays fresh, keyed by the bar interval
+# short intervals go stale quickly, daily and longer bars only change once per session
+_interval_ttls = {
+    "1m": 60,
+    "2m": 120,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "60m": 3600,
+    "90m": 5400,
+    "1h": 3600,
+    "1d": 4 * 3600,
+    "5d": 12 * 3600,
+    "1wk": 24 * 3600,
+    "1mo": 24 * 3600,
+    "3mo": 24 * 3600,
+}
+_default_ttl = 60
+
+# default upper bound for the total size of the cache directory (bytes)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "cliStocksTracker")
+
+
+def interval_ttl(interval):
+    return _interval_ttls.get(interval, _default_ttl)
+
+
+# cut a frame down to the bars that belong to the requested period
+# day based periods keep the last N distinct trading dates, so a merged frame
+# never grows past what a fresh download of the same period would return
+def trim_to_period(frame, period):
+    if frame is None or len(frame) == 0 or period in (None, "max"):
+        return frame
+
+    index = frame.index
+    if period == "ytd":
+        return frame[index.year == index[-1].year]
+
+    match = re.fullmatch(r"(\d+)(m|h|d|wk|mo|y)", period)
+    if match is None:
+        return frame
+    amount, unit = int(match.group(1)), match.group(2)
+
+    if unit == "d":
+        dates = index.normalize().unique()
+        if len(dates) <= amount:
+            return frame
+        return frame[index.normalize() >= dates[-amount]]
+
+    return frame[index > index[-1] - period_span(period)]
+
+
+# the length of a period like "5d" or "1y", None for open ended ones ("max", "ytd")
+# days are calendar days here, trim_to_period counts trading dates instead
+def period_span(period):
+    match = re.fullmatch(r"(\d+)(m|h|d|wk|mo|y)", period or "")
+    if match is None:
+        return None
+    amount, unit = int(match.group(1)), match.group(2)
+    return {
+        "m": timedelta(minutes=amount),
+        "h": timedelta(hours=amount),
+        "d": timedelta(days=amount),
+        "wk": timedelta(weeks=amount),
+        "mo": timedelta(days=30 * amount),
+        "y": timedelta(days=365 * amount),
+    }[unit]
+
+
+# append newly downloaded bars to a cached frame, newer bars win on overlap
+def merge_tail(cached, tail, period):
+    if tail is None or len(tail) == 0:
+        return cached
+
+    import pandas as pd
+
+    merged = pd.concat([cached, tail])
+    merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+    return trim_to_period(merged, period)
+
+
+# split a yfinance download into one frame per ticker, dropping the rows that
+# only exist because another ticker traded at that time
+def split_by_ticker(frame, tickers):
+    frames = {}
+    if frame is None or len(frame.columns) == 0:
+        return frames
+    if frame.columns.nlevels == 1:
+        # older yfinance releases do not split single ticker downloads
+        frames[tickers[0]] = frame.dropna(how="all")
+        return frames
+    available = set(frame.columns.get_level_values(1))
+    for ticker in tickers:
+        if ticker in available:
+            frames[ticker] = frame.xs(ticker, axis=1, level=1).dropna(how="all")
+    return frames
+
+
+# inverse of split_by_ticker, produces the (field, ticker) column layout of yfinance
+def combine_tickers(frames):
+    import pandas as pd
+
+    if len(frames) == 0:
+        return pd.DataFrame()
+    combined = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+    return combined.sort_index(axis=1, level=0, sort_remaining=False)
+
+
+@dataclass
+class CacheEntry:
+    frame: "pandas.DataFrame"
+    age: float
+    fresh: bool
+
+    def last_timestamp(self):
+        return self.frame.index[-1] if len(self.frame) > 0 else None
+
+
+class MarketDataCache:
+    """On-disk cache of downloaded bars, one file per (ticker, period, interval)
+    and namespace, the provider the bars came from.
+
+    Files are written to a temporary name and atomically renamed into place, so
+    several invocations can share one cache directory without ever reading a
+    half written entry. The directory is kept under max_bytes by evicting the
+    entries that were refreshed least recently.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, namespace=None):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+        os.makedirs(self.directory, exist_ok=True)
+        return
+
+    def path(self, ticker, period, interval):
+        parts = (ticker, period, interval)
+        if self.namespace:
+            parts = (self.namespace,) + parts
+        name = "_".join(re.sub(r"[^A-Za-z0-9.^=-]", "-", part) for part in parts)
+        return os.path.join(self.directory, name + ".pkl")
+
+    def load(self, ticker, period, interval, now=None):
+        path = self.path(ticker, period, interval)
+        try:
+            with open(path, "rb") as fp:
+                frame = pickle.load(fp)
+            modified = os.stat(path).st_mtime
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        now = time.time() if now is None else now
+        age = now - modified
+        return CacheEntry(frame, age, age < interval_ttl(interval))
+
+    def store(self, ticker, period, interval, frame):
+        path = self.path(ticker, period, interval)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump(frame, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+        self.evict()
+        return
+
+    def touch(self, ticker, period, interval):
+        # refresh the timestamp of an entry whose data is still current
+        # (e.g. the market is closed and the tail download returned nothing new)
+        with contextlib.suppress(OSError):
+            os.utime(self.path(ticker, period, interval))
+        return
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pkl"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue  # removed by a concurrent invocation
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        # oldest entries go first
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                os.unlink(os.path.join(self.directory, name))
+            total -= size
+        return
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                with contextlib.suppress(OSError):
+                    os.unlink(os.path.join(self.directory, name))
+        return
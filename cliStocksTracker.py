@@ -1,29 +1,40 @@
-import pytz
-import utils
-import plotille
+import os
+import time
+import signal
 import warnings
+import cache
 import argparse
-import webcolors
-import autocolors
-import contextlib
+import daemon
+import exporter
+import snapshot
+import profiler
+import providers
 import multiconfigparser
 
-import numpy as np
-import yfinance as market
 import portfolio as port
 
-from datetime import datetime, timedelta
-from renderer import Renderer
+from concurrent.futures import ThreadPoolExecutor
+from ledger import COST_BASIS_MODES, LedgerError
+
+GRAPH_BACKENDS = ("plotille", "braille")
 
 
 def merge_config(config, args):
     if "General" in config:
         if "independent_graphs" in config["General"]:
             args.independent_graphs = config["General"]["independent_graphs"] == "True"
+        if "parallel_graphs" in config["General"]:
+            args.parallel_graphs = config["General"]["parallel_graphs"] == "True"
+        if "value_curve" in config["General"]:
+            args.value_curve = config["General"]["value_curve"] == "True"
+        if "graph_backend" in config["General"]:
+            args.graph_backend = config["General"]["graph_backend"]
         if "timezone" in config["General"]:
             args.timezone = config["General"]["timezone"]
         if "rounding_mode" in config["General"]:
             args.rounding_mode = config["General"]["rounding_mode"]
+        if "cost_basis" in config["General"]:
+            args.cost_basis = config["General"]["cost_basis"]
 
     if "Frame" in config:
         if "width" in config["Frame"]:
@@ -31,6 +42,28 @@ def merge_config(config, args):
         if "height" in config["Frame"]:
             args.heigth = int(config["Frame"]["height"])
 
+    if "Cache" in config:
+        if "directory" in config["Cache"]:
+            args.cache_dir = os.path.expanduser(config["Cache"]["directory"])
+        if "enabled" in config["Cache"]:
+            args.no_cache = args.no_cache or config["Cache"]["enabled"] != "True"
+        if "max_size" in config["Cache"]:
+            args.cache_max_size = int(config["Cache"]["max_size"])
+
+    if "Store" in config:
+        if "directory" in config["Store"]:
+            args.store_dir = os.path.expanduser(config["Store"]["directory"])
+
+    if "Download" in config:
+        if "batch_size" in config["Download"]:
+            args.download_batch_size = int(config["Download"]["batch_size"])
+        if "workers" in config["Download"]:
+            args.download_workers = int(config["Download"]["workers"])
+        if "retries" in config["Download"]:
+            args.download_retries = int(config["Download"]["retries"])
+        if "deadline" in config["Download"]:
+            args.download_deadline = float(config["Download"]["deadline"])
+
     return
 
 
@@ -39,29 +72,222 @@ def main():
     stocks_config = multiconfigparser.ConfigParserMultiOpt()
     args = parse_args()
 
+    run_profiler = None
+    if args.profile is not None or args.profile_dump is not None:
+        run_profiler = profiler.Profiler(args.profile or "text", args.profile_dump)
+        run_profiler.start()
+
     portfolio = port.Portfolio()
 
     # read config files
-    config.read(args.config)
-    stocks_config.read(args.portfolio_config)
-
-    # verify that config file is correct
     # merge options from cli and config
-    verify_stock_keys(stocks_config)
-    merge_config(config, args)
+    with profiler.phase("config"):
+        config.read(args.config)
+        merge_config(config, args)
+
+        if args.graph_backend not in GRAPH_BACKENDS:
+            print(
+                'Unknown graph_backend "{}", expected one of: {}'.format(
+                    args.graph_backend, ", ".join(GRAPH_BACKENDS)
+                )
+            )
+            exit()
+
+        try:
+            portfolio.provider = providers.from_args(args)
+        except ValueError as e:
+            print(e)
+            exit()
+
+        try:
+            render_engine = make_render_engine(portfolio, args)
+        except ValueError as e:
+            print(e)
+            exit()
+
+    with profiler.phase("positions"):
+        try:
+            positions = load_positions(stocks_config, args)
+        except LedgerError as e:
+            print(e)
+            exit()
+
+    # with --watch the table is shown while a streaming provider is still
+    # downloading, starting with the first tickers to arrive
+    on_batch = None
+    if args.watch and not args.daemon and portfolio.provider.streams:
+        on_batch = progress(render_engine)
+    with profiler.phase("populate"):
+        portfolio.populate_positions(positions, args, on_batch=on_batch)
+    try:
+        if not args.no_graphs and args.output is None:
+            portfolio.graph_cache = portfolio.open_graph_cache(args)
+            update_graphs(portfolio, args)
+
+        # print to the screen
+        if args.daemon:
+            serve(portfolio, render_engine, args)
+        elif args.watch:
+            watch(portfolio, render_engine, args)
+        else:
+            with profiler.phase("render"):
+                render_engine.render()
+    finally:
+        # the graph worker processes live until the last frame is drawn
+        portfolio.close()
+
+    if portfolio.graph_cache is not None:
+        portfolio.graph_cache.save()
+    if run_profiler is not None:
+        run_profiler.stop()
+        run_profiler.report()
+    return
+
+
+# redraws the frame after a batch of tickers arrived, at most every interval seconds
+def progress(render_engine, interval=0.5):
+    last = None
 
-    portfolio.populate(stocks_config, args)
-    portfolio.gen_graphs(
-        args.independent_graphs, args.width, args.height, args.timezone
+    def on_batch():
+        nonlocal last
+        now = time.monotonic()
+        if last is None or now - last >= interval:
+            render_engine.render(clear=True)
+            last = now
+        return
+
+    return on_batch
+
+
+# draw the graphs of the current data, unless the output has none
+def update_graphs(portfolio, args):
+    if args.no_graphs or args.output is not None:
+        return
+    with profiler.phase("graphs"):
+        portfolio.gen_graphs(
+            args.independent_graphs,
+            args.width,
+            args.height,
+            args.timezone,
+            parallel=args.parallel_graphs,
+            backend=args.graph_backend,
+            curve=args.value_curve,
+        )
+    profiler.count("graphs", len(portfolio.graphs))
+    return
+
+
+# keep the portfolio serving clients of daemon.py over a unix socket, the
+# market data is refreshed every args.watch seconds (one minute by default)
+def serve(portfolio, render_engine, args):
+    # clients print the frames to their terminals
+    os.environ.setdefault("FORCE_COLOR", "1")
+
+    def refresh(lock):
+        market_data = portfolio.fetch_updates(args)
+        with lock:
+            portfolio.apply_updates(market_data)
+            update_graphs(portfolio, args)
+            if portfolio.graph_cache is not None:
+                portfolio.graph_cache.save()
+        return
+
+    server = daemon.Daemon(
+        portfolio, render_engine, refresh, args.watch or 60, path=args.socket
     )
+    try:
+        server.listen()
+    except OSError as e:
+        print(e)
+        exit()
+
+    # clean up the socket when stopped by a service manager too
+    signal.signal(signal.SIGTERM, lambda signum, frame: exit())
+    print("Serving the portfolio on", server.path)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    return
+
 
-    # print to the screen
-    render_engine = Renderer(args.rounding_mode, portfolio)
-    render_engine.render()
+# keep the portfolio alive and redraw it every args.watch seconds
+# downloads run on a worker thread so a slow response never delays a frame,
+# their bars are folded into the portfolio on the first frame after they arrive
+def watch(portfolio, render_engine, args):
+    next_frame = time.monotonic()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(portfolio.fetch_updates, args)
+        try:
+            while True:
+                if pending.done():
+                    with profiler.phase("update"):
+                        portfolio.apply_updates(pending.result())
+                    update_graphs(portfolio, args)
+                    pending = executor.submit(portfolio.fetch_updates, args)
 
+                with profiler.phase("render"):
+                    render_engine.render(clear=True)
+
+                next_frame += args.watch
+                delay = next_frame - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # running behind, drop the missed frames instead of bursting
+                    next_frame = time.monotonic()
+        except KeyboardInterrupt:
+            pending.cancel()
     return
 
 
+# the table renderer, or an exporter for the machine readable --output formats
+def make_render_engine(portfolio, args):
+    if args.daemon:
+        args.output = None  # clients ask the daemon for the format they need
+    if args.output is not None:
+        return exporter.Exporter(args.output, portfolio, curve=args.value_curve)
+
+    # only the table needs colorama, headless runs never import it
+    from renderer import Renderer, TableFilter, TableView
+
+    view = TableView(
+        args.sort,
+        [TableFilter.parse(text) for text in args.filter],
+        args.limit,
+        args.page,
+    )
+    return Renderer(args.rounding_mode, portfolio, view=view)
+
+
+# the compiled portfolio.ini, straight from its snapshot when the file is unchanged
+def load_positions(stocks_config, args):
+    portfolio = port.Portfolio()
+    if args.no_snapshot:
+        stocks_config.read(args.portfolio_config)
+        verify_stock_keys(stocks_config)
+        return portfolio.compile_positions(stocks_config, args.cost_basis)
+
+    positions = snapshot.load(args.portfolio_config, args.cost_basis)
+    if positions is None:
+        key = snapshot.file_key(args.portfolio_config)
+        stocks_config.read(args.portfolio_config)
+
+        # verify that config file is correct
+        verify_stock_keys(stocks_config)
+        # the warnings are kept for the runs that skip compiling
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            positions = portfolio.compile_positions(stocks_config, args.cost_basis)
+        for warning in caught:
+            warnings.warn_explicit(
+                warning.message, warning.category, warning.filename, warning.lineno
+            )
+        messages = [str(warning.message) for warning in caught]
+        snapshot.store(args.portfolio_config, args.cost_basis, positions, key, messages)
+    return positions
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Options for cliStockTracker.py")
     parser.add_argument(
@@ -82,6 +308,31 @@ def parse_args():
         help="show a chart for each stock (default false)",
         default=False,
     )
+    parser.add_argument(
+        "--parallel-graphs",
+        action="store_true",
+        help="render independent graphs on one worker process per core (default false)",
+        default=False,
+    )
+    parser.add_argument(
+        "--graph-backend",
+        type=str,
+        choices=GRAPH_BACKENDS,
+        help="how graphs are drawn (plotille | braille) (default plotille)",
+        default="plotille",
+    )
+    parser.add_argument(
+        "--value-curve",
+        action="store_true",
+        help="graph the total portfolio value, and add it to the --output records",
+        default=False,
+    )
+    parser.add_argument(
+        "--no-graphs",
+        action="store_true",
+        help="only print the table, without drawing any graphs (starts faster)",
+        default=False,
+    )
     parser.add_argument(
         "--timezone",
         type=str,
@@ -95,6 +346,50 @@ def parse_args():
         help="how should numbers be rounded (math | down) (default math)",
         default="math",
     )
+    parser.add_argument(
+        "--cost-basis",
+        type=str,
+        choices=COST_BASIS_MODES,
+        help="how sells are matched against buys (net | average | fifo | lifo) (default net)",
+        default="net",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        choices=exporter.OUTPUT_FORMATS,
+        help="print one record per position and a summary record in this format "
+        "instead of the table and graphs",
+        default=None,
+    )
+    parser.add_argument(
+        "--sort",
+        type=str,
+        metavar="COLUMN",
+        help='sort the table by a column header (ex: Chg%%), prefix it with "-" to sort descending',
+        default=None,
+    )
+    parser.add_argument(
+        "--filter",
+        type=str,
+        metavar="EXPR",
+        action="append",
+        help='only show positions matching COLUMN OP VALUE (ex: "G/L/T<-1000"), can be repeated',
+        default=[],
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        metavar="N",
+        help="show at most N positions per page of the table",
+        default=None,
+    )
+    parser.add_argument(
+        "--page",
+        type=int,
+        metavar="P",
+        help="which page of --limit positions to show (default 1)",
+        default=1,
+    )
     parser.add_argument(
         "-ti",
         "--time-interval",
@@ -109,6 +404,133 @@ def parse_args():
         help="specify time period for graphs (ex: 15m, 1h, 1d) (default 1d)",
         default="1d",
     )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        metavar="N",
+        help="keep running and refresh the portfolio every N seconds",
+        default=None,
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running and serve the portfolio to daemon.py clients over a unix "
+        "socket, refreshing it every --watch seconds (default 60)",
+        default=False,
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        help="path of the daemon's unix socket (default {})".format(
+            daemon.default_socket_path()
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "--provider",
+        type=str,
+        help="where market data comes from (yahoo | chart | replay) (default yahoo)",
+        default="yahoo",
+    )
+    parser.add_argument(
+        "--chart-url",
+        type=str,
+        help="base url of the chart provider (default {})".format(
+            providers.ChartProvider.DEFAULT_URL
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "--download-batch-size",
+        type=int,
+        metavar="N",
+        help="download at most N tickers per request (default {})".format(
+            providers.DEFAULT_BATCH_SIZE
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        metavar="N",
+        help="download up to N batches at once (default {})".format(
+            providers.DEFAULT_WORKERS
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "--download-retries",
+        type=int,
+        metavar="N",
+        help="retry a failed batch up to N times (default {})".format(
+            providers.DEFAULT_RETRIES
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "--download-deadline",
+        type=float,
+        metavar="SECONDS",
+        help="give up on the batches still missing after this long",
+        default=None,
+    )
+    parser.add_argument(
+        "--replay-dir",
+        type=str,
+        help="directory of recorded market data used by the replay provider",
+        default=None,
+    )
+    parser.add_argument(
+        "--record-dir",
+        type=str,
+        help="save the downloaded market data to this directory for later replay",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="directory used to cache downloaded market data (default ~/.cache/cliStocksTracker)",
+        default=cache.default_cache_dir(),
+    )
+    parser.add_argument(
+        "--cache-max-size",
+        type=int,
+        help="maximum size of the market data cache in MB (default 64)",
+        default=64,
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always download fresh market data instead of using the cache",
+        default=False,
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="text",
+        choices=profiler.PROFILE_FORMATS,
+        help="time every phase of the run and print a report (text | json) to stderr",
+        default=None,
+    )
+    parser.add_argument(
+        "--profile-dump",
+        type=str,
+        metavar="PATH",
+        help="also record the run with cProfile and save the stats to PATH",
+        default=None,
+    )
+    parser.add_argument(
+        "--store-dir",
+        type=str,
+        help="keep every downloaded bar in this directory and only download newer ones",
+        default=None,
+    )
+    parser.add_argument(
+        "--no-snapshot",
+        action="store_true",
+        help="always parse portfolio.ini instead of loading its compiled snapshot",
+        default=False,
+    )
     parser.add_argument(
         "--config", type=str, help="path to a config.ini file", default="config.ini"
     )
@@ -0,0 +1,253 @@
+import io
+import os
+import sys
+import json
+import time
+import cache
+import socket
+import argparse
+import threading
+import contextlib
+import socketserver
+
+SOCKET_NAME = "daemon.sock"
+
+# what a client can ask for, the table renderer's and the exporter's output
+COMMANDS = ("frame", "table", "graphs", "ndjson", "csv", "json", "status")
+
+# a request is one line of json, anything longer is not a request
+MAX_REQUEST_BYTES = 64 * 1024
+
+# rendered responses kept per portfolio version
+MAX_RESPONSES = 64
+
+
+def default_socket_path():
+    return os.path.join(cache.default_cache_dir(), SOCKET_NAME)
+
+
+# is a daemon answering on path
+def is_running(path):
+    with contextlib.closing(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    timeout = 5  # a client that never sends its request is dropped
+
+    def handle(self):
+        try:
+            line = self.rfile.readline(MAX_REQUEST_BYTES)
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a json object")
+            body = self.server.daemon.respond(request)
+            header = {"ok": True}
+        except (ValueError, TypeError, OSError) as e:
+            body = ""
+            header = {"ok": False, "error": str(e)}
+
+        with contextlib.suppress(OSError):
+            self.wfile.write((json.dumps(header) + "\n" + body).encode())
+        return
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon:
+    """Owns a populated portfolio and answers clients over a Unix socket.
+
+    Market data is refreshed every interval seconds by a single background
+    thread, so however many panes, status bars or cron jobs ask, upstream is
+    only hit once per interval. Clients get the rendered frame, table, graphs
+    or exported records of the latest data; a response is rendered once per
+    portfolio version and request, and then served from memory.
+    """
+
+    def __init__(self, portfolio, render_engine, refresh, interval, path=None):
+        self.portfolio = portfolio
+        self.render_engine = render_engine
+        self.refresh = refresh
+        self.interval = interval
+        self.path = path or default_socket_path()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.responses = {}
+        self.responses_version = None
+        self.refreshed = time.time()
+        self.server = None
+        return
+
+    # bind the socket, a stale one left behind by a crashed daemon is replaced
+    def listen(self):
+        if os.path.exists(self.path):
+            if is_running(self.path):
+                raise OSError("A daemon is already listening on " + self.path)
+            os.unlink(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.server = DaemonServer(self.path, RequestHandler)
+        self.server.daemon = self
+        os.chmod(self.path, 0o600)
+        return
+
+    def serve(self):
+        if self.server is None:
+            self.listen()
+
+        refresher = threading.Thread(target=self.refresh_loop, daemon=True)
+        refresher.start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stopped.set()
+            self.server.server_close()
+            with contextlib.suppress(OSError):
+                os.unlink(self.path)
+        return
+
+    def shutdown(self):
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+        return
+
+    # refresh takes the lock it needs itself, clients are only blocked while
+    # the new bars are folded in, never during the download
+    def refresh_loop(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.refresh(self.lock)
+                self.refreshed = time.time()
+            except Exception as e:
+                print("Refreshing the portfolio failed:", e, file=sys.stderr)
+        return
+
+    def respond(self, request) -> str:
+        command = request.get("command", "frame")
+        if command not in COMMANDS:
+            raise ValueError(
+                'Unknown command "{}", expected one of: {}'.format(
+                    command, ", ".join(COMMANDS)
+                )
+            )
+
+        with self.lock:
+            if command == "status":
+                return self.status()
+
+            if self.responses_version != self.portfolio.version:
+                self.responses = {}
+                self.responses_version = self.portfolio.version
+            key = json.dumps(request, sort_keys=True)
+            response = self.responses.get(key)
+            if response is None:
+                response = self.render(command, request)
+                if len(self.responses) >= MAX_RESPONSES:
+                    self.responses.clear()
+                self.responses[key] = response
+        return response
+
+    def render(self, command, request) -> str:
+        if command in ("ndjson", "csv", "json"):
+            import exporter
+
+            out = io.StringIO()
+            exporter.Exporter(
+                command, self.portfolio, curve=bool(request.get("value_curve"))
+            ).render(stream=out)
+            return out.getvalue()
+
+        from renderer import TableFilter, TableView
+
+        view = TableView(
+            request.get("sort"),
+            [TableFilter.parse(text) for text in request.get("filter") or []],
+            request.get("limit"),
+            request.get("page") or 1,
+        )
+        default_view, self.render_engine.view = self.render_engine.view, view
+        try:
+            return self.render_engine.frame(
+                graphs=command in ("frame", "graphs"),
+                table=command in ("frame", "table"),
+            )
+        finally:
+            self.render_engine.view = default_view
+
+    def status(self) -> str:
+        status = {
+            "pid": os.getpid(),
+            "positions": len(self.portfolio.stocks),
+            "version": self.portfolio.version,
+            "refreshed": self.refreshed,
+            "interval": self.interval,
+        }
+        return json.dumps(status) + "\n"
+
+
+# send a request to the daemon, the response body or an OSError
+def request(path, message, timeout=10) -> str:
+    with contextlib.closing(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((json.dumps(message) + "\n").encode())
+        with sock.makefile("rb") as response:
+            header = json.loads(response.readline() or b"{}")
+            body = response.read().decode()
+
+    if not header.get("ok"):
+        raise OSError(header.get("error", "The daemon closed the connection"))
+    return body
+
+
+# the thin client: ask a running daemon and print what it answers
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ask a running cliStocksTracker.py --daemon for the portfolio"
+    )
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=COMMANDS,
+        default="frame",
+        help="what to print (default frame, the graphs and the table)",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        help="path of the daemon's socket (default {})".format(default_socket_path()),
+        default=default_socket_path(),
+    )
+    parser.add_argument("--sort", type=str, metavar="COLUMN", default=None)
+    parser.add_argument(
+        "--filter", type=str, metavar="EXPR", action="append", default=[]
+    )
+    parser.add_argument("--limit", type=int, metavar="N", default=None)
+    parser.add_argument("--page", type=int, metavar="P", default=1)
+    parser.add_argument("--value-curve", action="store_true", default=False)
+    args = parser.parse_args()
+
+    message = {"command": args.command}
+    for option in ["sort", "filter", "limit", "value_curve"]:
+        if getattr(args, option):
+            message[option] = getattr(args, option)
+    if args.page != 1:
+        message["page"] = args.page
+
+    try:
+        sys.stdout.write(request(args.socket, message))
+    except OSError as e:
+        print(e)
+        exit(1)
+    return
+
+
+if __name__ == "__main__":
+    main()
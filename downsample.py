@@ -0,0 +1,26 @@
+import numpy as np
+
+
+# indices of the points worth plotting when values is drawn buckets pixels wide
+# every bucket keeps its lowest and highest point (in time order), so visible
+# peaks and troughs survive, and the first and last points are always kept so
+# the line still spans the whole x range. Downsampling the result again keeps
+# every point
+def minmax_indices(values, buckets):
+    values = np.asarray(values, dtype=float)
+    count = len(values)
+    if buckets <= 0 or count <= 2 * buckets + 2:
+        return np.arange(count)
+
+    size = -(-count // buckets)  # ceiling division
+    padded = np.empty(size * buckets)
+    padded[:count] = values
+    padded[count:] = values[-1]  # repeating the last point never adds an extreme
+    rows = padded.reshape(buckets, size)
+
+    offsets = np.arange(buckets) * size
+    lows = rows.argmin(axis=1) + offsets
+    highs = rows.argmax(axis=1) + offsets
+
+    keep = np.concatenate(([0, count - 1], lows, highs))
+    return np.unique(np.minimum(keep, count - 1))
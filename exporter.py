@@ -0,0 +1,169 @@
+import sys
+import csv
+import json
+import math
+import profiler
+
+from datetime import datetime
+
+OUTPUT_FORMATS = ("ndjson", "csv", "json")
+
+# (field, attribute) of a position record, the values behind the table columns
+STOCK_FIELDS = [
+    ("symbol", "symbol"),
+    ("last", "curr_value"),
+    ("change", "change_amount"),
+    ("change_percent", "change_percentage"),
+    ("low", "low"),
+    ("high", "high"),
+    ("average", "average"),
+]
+ENTRY_FIELDS = [
+    ("owned", "count"),
+    ("gains_per_share", "gains_per_share"),
+    ("market_value", "holding_market_value"),
+    ("average_cost", "average_cost"),
+    ("gains", "gains"),
+    ("cost_basis", "cost_basis"),
+]
+SUMMARY_FIELDS = [
+    "time",
+    "total_cost",
+    "total_value",
+    "gained_today",
+    "gained_today_percent",
+    "gained_overall",
+    "gained_overall_percent",
+    "realized",
+]
+
+
+# plain python values, with missing numbers as None (null in json, empty in csv)
+# infinities (e.g. the change of a stock that opened at 0) count as missing,
+# json has no way to write them
+def plain(value):
+    if isinstance(value, str):
+        return value
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def position_record(entry) -> dict:
+    record = {}
+    for field, attribute in STOCK_FIELDS:
+        record[field] = plain(getattr(entry.stock, attribute))
+    for field, attribute in ENTRY_FIELDS:
+        record[field] = plain(getattr(entry, attribute))
+    return record
+
+
+# (time, total_value) records of the portfolio value curve, times in UTC
+def curve_records(portfolio) -> list:
+    import numpy as np
+
+    times, values = portfolio.value_curve()
+    times = np.datetime_as_string(times, unit="s", timezone="UTC")
+    return [
+        {"time": time, "total_value": plain(value)}
+        for time, value in zip(times.tolist(), values.tolist())
+    ]
+
+
+# the numbers under the table, as in Renderer.print_overall_summary
+def summary_record(portfolio) -> dict:
+    gained_today = portfolio.market_value - portfolio.open_market_value
+    gained_overall = portfolio.market_value - portfolio.cost_value
+    cost = portfolio.cost_value
+    return {
+        "time": datetime.now().astimezone().isoformat(timespec="seconds"),
+        "total_cost": plain(cost),
+        "total_value": plain(portfolio.market_value),
+        "gained_today": plain(gained_today),
+        "gained_today_percent": plain(gained_today / cost * 100 if cost else 0),
+        "gained_overall": plain(gained_overall),
+        "gained_overall_percent": plain(gained_overall / cost * 100 if cost else 0),
+        "realized": plain(portfolio.realized_value),
+    }
+
+
+class Exporter:
+    """Writes the portfolio as machine readable records instead of the table.
+
+    Every position becomes one record, followed by a summary record, written
+    to the stream as soon as it is built. Nothing here formats for a terminal,
+    so neither colorama nor plotille is ever imported. It renders like
+    Renderer does, so --watch appends a new batch of records every refresh.
+    With curve the portfolio value curve is written too, before the summary.
+    """
+
+    def __init__(self, output_format, portfolio, stream=None, curve=False):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                'Unknown output format "{}", expected one of: {}'.format(
+                    output_format, ", ".join(OUTPUT_FORMATS)
+                )
+            )
+        self.format = output_format
+        self.portfolio = portfolio
+        self.stream = stream
+        self.curve = curve
+        self.csv_writer = None
+        return
+
+    def render(self, stream=None, clear=False):
+        stream = stream or self.stream or sys.stdout
+        getattr(self, "write_" + self.format)(stream)
+        stream.flush()
+        return
+
+    def entries(self):
+        profiler.count("rows", len(self.portfolio.stocks))
+        return list(self.portfolio.stocks.values())
+
+    def write_ndjson(self, stream):
+        for entry in self.entries():
+            record = {"type": "position", **position_record(entry)}
+            stream.write(json.dumps(record) + "\n")
+        for record in self.curve_records():
+            stream.write(json.dumps({"type": "value_curve", **record}) + "\n")
+        record = {"type": "summary", **summary_record(self.portfolio)}
+        stream.write(json.dumps(record) + "\n")
+        return
+
+    def curve_records(self):
+        return curve_records(self.portfolio) if self.curve else []
+
+    # one document per refresh: {"positions": [...], "summary": {...}}, with
+    # curve also "value_curve": {"times": [...], "values": [...]}
+    def write_json(self, stream):
+        stream.write('{"positions": [')
+        for i, entry in enumerate(self.entries()):
+            stream.write((", " if i > 0 else "") + json.dumps(position_record(entry)))
+        if self.curve:
+            records = self.curve_records()
+            curve = {
+                "times": [record["time"] for record in records],
+                "values": [record["total_value"] for record in records],
+            }
+            stream.write('], "value_curve": ' + json.dumps(curve))
+            stream.write(', "summary": ')
+        else:
+            stream.write('], "summary": ')
+        stream.write(json.dumps(summary_record(self.portfolio)) + "}\n")
+        return
+
+    # one table of all record fields, the header is only written once
+    def write_csv(self, stream):
+        if self.csv_writer is None:
+            fields = ["type"] + [field for field, _ in STOCK_FIELDS + ENTRY_FIELDS]
+            self.csv_writer = csv.DictWriter(
+                stream, fields + SUMMARY_FIELDS, lineterminator="\n"
+            )
+            self.csv_writer.writeheader()
+
+        for entry in self.entries():
+            self.csv_writer.writerow({"type": "position", **position_record(entry)})
+        for record in self.curve_records():
+            self.csv_writer.writerow({"type": "value_curve", **record})
+        self.csv_writer.writerow({"type": "summary", **summary_record(self.portfolio)})
+        return
@@ -0,0 +1,135 @@
+import os
+import pickle
+import hashlib
+import braille
+import tempfile
+import contextlib
+
+import numpy as np
+
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 128
+
+# bump whenever the rendered output changes for the same input, older files are
+# then ignored
+GRAPH_CACHE_VERSION = 1
+
+
+# a short digest of arrays and plain values, arrays are hashed by their bytes
+def fingerprint(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(str(part.dtype).encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# the key of a rendered graph: every plotted point, the session calendar that
+# places them on the x axis, the y axis limits and the render parameters,
+# including whether the graph is drawn with color escapes or without
+# series is a list of (symbol, data, times) holding only the plotted points
+def graph_key(
+    series,
+    colors,
+    calendar,
+    width,
+    height,
+    timezone,
+    backend="plotille",
+    y_range=None,
+    colored=None,
+):
+    if colored is None:
+        colored = braille.colors_enabled()
+    parts = [backend, width, height, str(timezone), list(colors), colored]
+    if y_range is not None:
+        parts += [float(y_range[0]), float(y_range[1])]
+    for symbol, data, times in series:
+        parts += [symbol, np.asarray(data, dtype=float), times]
+    if calendar is not None:
+        parts += [calendar.starts, calendar.lengths, calendar.step]
+    return fingerprint(*parts)
+
+
+class GraphCache:
+    """Rendered graphs by graph_key, least recently used ones are evicted first.
+
+    Charts of tickers whose data did not move (halted tickers, a closed
+    market) come back from here instead of being drawn again. With a path the
+    cache is loaded from and saved to that file, so it also survives between
+    runs.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.changed = False
+        return
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        graph = self.entries.get(key)
+        if graph is not None:
+            self.entries.move_to_end(key)
+        return graph
+
+    def put(self, key, graph):
+        self.entries[key] = graph
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.changed = True
+        return
+
+    def load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "rb") as fp:
+                saved = pickle.load(fp)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return
+        if not isinstance(saved, dict) or saved.get("version") != GRAPH_CACHE_VERSION:
+            return
+
+        # graphs drawn in this run are more recent than the saved ones
+        for key, graph in saved["entries"]:
+            if key not in self.entries:
+                self.entries[key] = graph
+                self.entries.move_to_end(key, last=False)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return
+
+    def save(self):
+        if self.path is None or not self.changed:
+            return
+        saved = {"version": GRAPH_CACHE_VERSION, "entries": list(self.entries.items())}
+
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        except OSError:
+            return  # the cache is only an optimization, a read-only directory is fine
+
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump(saved, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self.changed = False
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+        return
@@ -0,0 +1,150 @@
+import ssl
+import asyncio
+import urllib.parse
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) cliStocksTracker"
+
+# largest response header section accepted, in lines
+MAX_HEADER_LINES = 100
+
+
+# responses worth asking again for, the server was overloaded or restarting
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, reason):
+        super().__init__("HTTP " + str(status) + " " + reason)
+        self.status = status
+        self.transient = status in TRANSIENT_STATUSES
+        return
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to a single host, shared by coroutines.
+
+    At most size requests are in flight at once, the others wait for a free
+    slot. Connections stay open between requests until the server closes them,
+    so a burst of requests pays for the TCP and TLS handshakes only once per
+    connection. A request whose reused connection turns out to be closed is
+    sent again on a new one.
+    """
+
+    def __init__(self, url, size=8, timeout=10):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError("Unsupported url '" + url + "', expected http(s)://")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.base_path = parts.path.rstrip("/")
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.size = size
+        self.timeout = timeout
+        self.idle = []
+        self.slots = None  # created by the first get(), see slot()
+        self.opened = 0  # connections opened so far, how well keep-alive works
+        return
+
+    async def get(self, path, params=None) -> bytes:
+        target = self.base_path + path
+        if params:
+            target += "?" + urllib.parse.urlencode(params)
+
+        async with self.slot():
+            while True:
+                reused = len(self.idle) > 0
+                reader, writer = self.idle.pop() if reused else await self.connect()
+                try:
+                    status, reason, body, keep_alive = await asyncio.wait_for(
+                        self.request(reader, writer, target), self.timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused:
+                        continue  # closed while idle, try again on a fresh one
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+
+                if keep_alive:
+                    self.idle.append((reader, writer))
+                else:
+                    writer.close()
+                if status != 200:
+                    raise HTTPError(status, reason)
+                return body
+
+    # the semaphore limiting requests in flight. Before Python 3.10 asyncio
+    # primitives bind to the event loop current when they are created, and the
+    # pool is usually built on another thread than the loop it runs on
+    def slot(self):
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.size)
+        return self.slots
+
+    async def connect(self):
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout
+        )
+        self.opened += 1
+        return connection
+
+    async def request(self, reader, writer, target):
+        writer.write(
+            (
+                "GET {} HTTP/1.1\r\n"
+                "Host: {}\r\n"
+                "User-Agent: {}\r\n"
+                "Accept: application/json\r\n"
+                "Accept-Encoding: identity\r\n"
+                "Connection: keep-alive\r\n\r\n"
+            )
+            .format(target, self.host, USER_AGENT)
+            .encode("latin-1")
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("The server closed the connection")
+        version, status, *reason = status_line.decode("latin-1").split(" ", 2)
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if version == "HTTP/1.0":
+            keep_alive = headers.get("connection", "").lower() == "keep-alive"
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self.read_chunked(reader)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return int(status), " ".join(reason).strip(), body, keep_alive
+
+    async def read_chunked(self, reader):
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # skip the trailer
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+        return
@@ -0,0 +1,315 @@
+import numpy as np
+
+# how the cost of sold shares is matched against earlier buys
+#   net:     sale proceeds are subtracted from the total amount paid, every gain
+#            stays in the position (the original cliStocksTracker behaviour)
+#   average: sold shares are taken out at the current average cost
+#   fifo:    sold shares come out of the oldest lots first
+#   lifo:    sold shares come out of the newest lots first
+COST_BASIS_MODES = ("net", "average", "fifo", "lifo")
+
+# shares left over from float rounding when a position is closed
+_EPSILON = 1e-9
+
+
+class LedgerError(ValueError):
+    pass
+
+
+# below this many fills plain Python floats beat the fixed cost of every numpy
+# call, and most portfolio.ini sections only hold a handful
+SMALL_LOAD = 32
+
+
+# turn "count@price" strings into two float arrays in one vectorized conversion
+def parse_fills(fills, key="buy"):
+    if isinstance(fills, str):
+        fills = (fills,)
+    if len(fills) < SMALL_LOAD:
+        counts, prices = split_fills(fills, key)
+        return np.array(counts, dtype=float), np.array(prices, dtype=float)
+
+    # every fill needs exactly one "@", comparing totals would let a fill
+    # missing one pair up with another holding two
+    if any(fill.count("@") != 1 for fill in fills):
+        raise not_formatted(key, fills)
+    parts = "@".join(fills).split("@")
+    try:
+        values = np.array(parts, dtype=float).reshape(-1, 2)
+    except ValueError:
+        raise not_a_number(key, fills)
+
+    counts, prices = values[:, 0], values[:, 1]
+    if (counts <= 0).any():
+        raise negative(key)
+    return counts, prices
+
+
+# parse_fills for a few fills, into lists of Python floats
+def split_fills(fills, key="buy"):
+    if isinstance(fills, str):
+        fills = (fills,)
+    counts = []
+    prices = []
+    for fill in fills:
+        parts = fill.split("@")
+        if len(parts) != 2:
+            raise not_formatted(key, fills)
+        try:
+            counts.append(float(parts[0]))
+            prices.append(float(parts[1]))
+        except ValueError:
+            raise not_a_number(key, fills)
+    if len(counts) > 0 and min(counts) <= 0:
+        raise negative(key)
+    return counts, prices
+
+
+def not_formatted(key, fills):
+    return LedgerError(
+        'A "' + key + '" key is not formatted as count@price: ' + ", ".join(fills)
+    )
+
+
+def not_a_number(key, fills):
+    return LedgerError(
+        'A "' + key + '" key holds something that is not a number: ' + ", ".join(fills)
+    )
+
+
+def negative(key):
+    other = "sell" if key == "buy" else "buy"
+    return LedgerError(
+        'A negative "'
+        + key
+        + '" key was detected. Use the '
+        + other
+        + " key instead to guarantee accurate calculations."
+    )
+
+
+class Ledger:
+    """Buy and sell fills of one ticker.
+
+    Fills are kept in growable arrays (signed counts, positive for buys, and
+    prices), together with the open lots and running totals of the chosen
+    cost basis mode, so appending a fill is amortized O(1) and never rescans
+    the history.
+    """
+
+    def __init__(self, mode="net"):
+        if mode not in COST_BASIS_MODES:
+            raise LedgerError(
+                "Unknown cost basis mode '"
+                + str(mode)
+                + "', use one of "
+                + ", ".join(COST_BASIS_MODES)
+                + "."
+            )
+        self.mode = mode
+        self.size = 0
+        self.counts = np.empty(16)
+        self.prices = np.empty(16)
+
+        # open lots live in lot_counts[lot_head:lot_tail]
+        self.lot_counts = np.empty(16)
+        self.lot_prices = np.empty(16)
+        self.lot_head = 0
+        self.lot_tail = 0
+
+        self.shares = 0.0  # shares currently held
+        self.cost = 0.0  # cost basis of the shares currently held
+        self.realized = 0.0  # gains locked in by sells
+        return
+
+    def __len__(self):
+        return self.size
+
+    def average_cost(self):
+        if abs(self.shares) < _EPSILON:
+            return 0
+        return self.cost / self.shares
+
+    def unrealized(self, price):
+        return self.shares * price - self.cost
+
+    def buy(self, count, price):
+        self.append(count, price)
+        return
+
+    def sell(self, count, price):
+        self.append(-count, price)
+        return
+
+    # add a single fill, buys have a positive count and sells a negative one
+    def append(self, count, price):
+        if count == 0:
+            raise LedgerError("A fill needs a count other than zero.")
+        self.counts, self.prices = self.grow(self.counts, self.prices, self.size + 1)
+        self.counts[self.size] = count
+        self.prices[self.size] = price
+        self.size += 1
+
+        if count > 0:
+            self.apply_buy(count, price)
+        else:
+            self.apply_sell(-count, price)
+        return
+
+    # add the buy and sell keys of one portfolio.ini section
+    # the config file does not keep buys and sells in order, so the buys are
+    # applied first and the sells are matched against them afterwards
+    # a handful of fills is applied one by one on Python floats, numpy only
+    # pays off for longer histories
+    def load(self, buys, sells):
+        if isinstance(buys, str):
+            buys = (buys,)
+        if isinstance(sells, str):
+            sells = (sells,)
+        small = len(buys) + len(sells) < SMALL_LOAD
+        parse = split_fills if small else parse_fills
+        buy_counts, buy_prices = parse(buys, "buy")
+        sell_counts, sell_prices = parse(sells, "sell")
+        if self.size > 0:
+            for count, price in zip(buy_counts, buy_prices):
+                self.append(count, price)
+            for count, price in zip(sell_counts, sell_prices):
+                self.append(-count, price)
+            return
+
+        total = len(buy_counts) + len(sell_counts)
+        self.counts, self.prices = self.grow(self.counts, self.prices, total)
+        self.size = total
+        if small:
+            self.counts[:total] = buy_counts + [-count for count in sell_counts]
+            self.prices[:total] = buy_prices + sell_prices
+            for count, price in zip(buy_counts, buy_prices):
+                self.apply_buy(count, price)
+            for count, price in zip(sell_counts, sell_prices):
+                self.apply_sell(count, price)
+            return
+
+        self.counts[: len(buy_counts)] = buy_counts
+        self.counts[len(buy_counts) : total] = -sell_counts
+        self.prices[: len(buy_counts)] = buy_prices
+        self.prices[len(buy_counts) : total] = sell_prices
+        self.load_lots(buy_counts, buy_prices, sell_counts, sell_prices)
+        return
+
+    # match every sell against the buys at once, instead of fill by fill
+    def load_lots(self, buy_counts, buy_prices, sell_counts, sell_prices):
+        bought = buy_counts.sum()
+        sold = sell_counts.sum()
+        if self.mode != "net" and sold > bought + _EPSILON:
+            raise LedgerError(
+                "More shares were sold ("
+                + str(sold)
+                + ") than were bought ("
+                + str(bought)
+                + ")."
+            )
+        proceeds = (sell_counts * sell_prices).sum()
+
+        if self.mode == "net":
+            self.shares = float(bought - sold)
+            self.cost = float((buy_counts * buy_prices).sum() - proceeds)
+            return
+
+        if self.mode == "average":
+            average = (buy_counts * buy_prices).sum() / bought if bought > 0 else 0
+            remaining = buy_counts * (1 - sold / bought) if bought > 0 else buy_counts
+            self.realized = proceeds - sold * average
+        else:
+            # a lot is used up once the shares sold cover it, counted from the
+            # oldest lot for fifo and from the newest for lifo
+            order = slice(None) if self.mode == "fifo" else slice(None, None, -1)
+            ordered = buy_counts[order]
+            used = np.clip(sold - (np.cumsum(ordered) - ordered), 0, ordered)
+            remaining = (ordered - used)[order]
+            self.realized = proceeds - (used * buy_prices[order]).sum()
+
+        keep = remaining > _EPSILON
+        self.lot_counts, self.lot_prices = self.grow(
+            self.lot_counts, self.lot_prices, int(keep.sum())
+        )
+        self.lot_head = 0
+        self.lot_tail = int(keep.sum())
+        self.lot_counts[: self.lot_tail] = remaining[keep]
+        self.lot_prices[: self.lot_tail] = buy_prices[keep]
+
+        self.shares = float(self.lot_counts[: self.lot_tail].sum())
+        self.cost = float(
+            (self.lot_counts[: self.lot_tail] * self.lot_prices[: self.lot_tail]).sum()
+        )
+        return
+
+    def apply_buy(self, count, price):
+        self.shares += count
+        self.cost += count * price
+        if self.mode in ("fifo", "lifo"):
+            if self.lot_tail == len(self.lot_counts) and self.lot_head > 0:
+                # reuse the space of the lots fifo already used up
+                open_lots = slice(self.lot_head, self.lot_tail)
+                self.lot_tail -= self.lot_head
+                self.lot_counts[: self.lot_tail] = self.lot_counts[open_lots].copy()
+                self.lot_prices[: self.lot_tail] = self.lot_prices[open_lots].copy()
+                self.lot_head = 0
+            self.lot_counts, self.lot_prices = self.grow(
+                self.lot_counts, self.lot_prices, self.lot_tail + 1
+            )
+            self.lot_counts[self.lot_tail] = count
+            self.lot_prices[self.lot_tail] = price
+            self.lot_tail += 1
+        return
+
+    def apply_sell(self, count, price):
+        if self.mode == "net":
+            self.shares -= count
+            self.cost -= count * price
+            return
+
+        if count > self.shares + _EPSILON:
+            raise LedgerError(
+                "Cannot sell "
+                + str(count)
+                + " shares, only "
+                + str(self.shares)
+                + " are held."
+            )
+
+        if self.mode == "average":
+            average = self.average_cost()
+            self.realized += count * (price - average)
+            self.cost -= count * average
+            self.shares -= count
+        else:
+            remaining = count
+            while remaining > _EPSILON and self.lot_head < self.lot_tail:
+                lot = self.lot_head if self.mode == "fifo" else self.lot_tail - 1
+                used = min(remaining, self.lot_counts[lot])
+                self.realized += used * (price - self.lot_prices[lot])
+                self.cost -= used * self.lot_prices[lot]
+                self.lot_counts[lot] -= used
+                remaining -= used
+                if self.lot_counts[lot] <= _EPSILON:
+                    if self.mode == "fifo":
+                        self.lot_head += 1
+                    else:
+                        self.lot_tail -= 1
+            self.shares -= count
+
+        if abs(self.shares) < _EPSILON:
+            self.shares = 0.0
+            self.cost = 0.0
+        return
+
+    # make room for at least size entries in a pair of parallel arrays
+    @staticmethod
+    def grow(first, second, size):
+        if size <= len(first):
+            return first, second
+        capacity = max(size, 2 * len(first))
+        new_first, new_second = np.empty(capacity), np.empty(capacity)
+        new_first[: len(first)] = first
+        new_second[: len(second)] = second
+        return new_first, new_second
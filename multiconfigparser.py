@@ -1,7 +1,21 @@
 import sys
+import itertools
 import configparser
 
 
+class _MultiValue(list):
+    """Values of an option that was given more than once, each a list of lines"""
+
+    @classmethod
+    def from_existing(cls, value):
+        # a value joined by an earlier read() is a str, or a tuple if repeated
+        if isinstance(value, tuple):
+            return cls([part] for part in value)
+        if isinstance(value, str):
+            return cls([[value]])
+        return cls([value])
+
+
 class ConfigParserMultiOpt(configparser.RawConfigParser):
     """ConfigParser allowing duplicate keys. Values are stored in a list"""
 
@@ -34,20 +48,21 @@ class ConfigParserMultiOpt(configparser.RawConfigParser):
         lineno = 0
         indent_level = 0
         e = None  # None, or an exception
+        comment_prefixes = tuple(self._comment_prefixes)
+        inline_comment_prefixes = tuple(self._inline_comment_prefixes)
         for lineno, line in enumerate(fp, start=1):
             comment_start = None
             # strip inline comments
-            for prefix in self._inline_comment_prefixes:
+            for prefix in inline_comment_prefixes:
                 index = line.find(prefix)
                 if index == 0 or (index > 0 and line[index - 1].isspace()):
                     comment_start = index
                     break
-            # strip full line comments
-            for prefix in self._comment_prefixes:
-                if line.strip().startswith(prefix):
-                    comment_start = 0
-                    break
-            value = line[:comment_start].strip()
+            # strip full line comments, every prefix is checked in one call
+            stripped = line.strip()
+            if comment_prefixes and stripped.startswith(comment_prefixes):
+                comment_start = 0
+            value = stripped if comment_start is None else line[:comment_start].strip()
             if not value:
                 if self._empty_lines_in_values:
                     # add empty line to the value, but only if there was no
@@ -58,7 +73,8 @@ class ConfigParserMultiOpt(configparser.RawConfigParser):
                         and optname
                         and cursect[optname] is not None
                     ):
-                        cursect[optname].append("")  # newlines added at join
+                        # newlines added at join
+                        self._lines(cursect, optname).append("")
                 else:
                     # empty line marks end of value
                     indent_level = sys.maxsize
@@ -67,7 +83,7 @@ class ConfigParserMultiOpt(configparser.RawConfigParser):
             first_nonspace = self.NONSPACECRE.search(line)
             cur_indent_level = first_nonspace.start() if first_nonspace else 0
             if cursect is not None and optname and cur_indent_level > indent_level:
-                cursect[optname].append(value)
+                self._lines(cursect, optname).append(value)
             # a section header or option header?
             else:
                 indent_level = cur_indent_level
@@ -77,7 +93,9 @@ class ConfigParserMultiOpt(configparser.RawConfigParser):
                     sectname = mo.group("header")
                     if sectname in self._sections:
                         if self._strict and sectname in elements_added:
-                            raise DuplicateSectionError(sectname, fpname, lineno)
+                            raise configparser.DuplicateSectionError(
+                                sectname, fpname, lineno
+                            )
                         cursect = self._sections[sectname]
                         elements_added.add(sectname)
                     elif sectname == self.default_section:
@@ -93,7 +111,7 @@ class ConfigParserMultiOpt(configparser.RawConfigParser):
                     optname = None
                 # no section header in the file?
                 elif cursect is None:
-                    raise MissingSectionHeaderError(fpname, lineno, line)
+                    raise configparser.MissingSectionHeaderError(fpname, lineno, line)
                 # an option line?
                 else:
                     mo = self._optcre.match(value)
@@ -113,10 +131,14 @@ class ConfigParserMultiOpt(configparser.RawConfigParser):
                             optval = optval.strip()
                             # Check if this optname already exists
                             if (optname in cursect) and (cursect[optname] is not None):
-                                # If it does, convert it to a tuple if it isn't already one
-                                if not isinstance(cursect[optname], tuple):
-                                    cursect[optname] = tuple(cursect[optname])
-                                cursect[optname] = cursect[optname] + tuple([optval])
+                                # If it does, collect every value in a list that is
+                                # only turned into a tuple once the file is read, so
+                                # n duplicates cost O(n) instead of O(n^2)
+                                if not isinstance(cursect[optname], _MultiValue):
+                                    cursect[optname] = _MultiValue.from_existing(
+                                        cursect[optname]
+                                    )
+                                cursect[optname].append([optval])
                             else:
                                 cursect[optname] = [optval]
                         else:
@@ -132,3 +154,22 @@ class ConfigParserMultiOpt(configparser.RawConfigParser):
         if e:
             raise e
         self._join_multiline_values()
+
+    # the list of lines of the value currently being read for optname
+    def _lines(self, cursect, optname):
+        value = cursect[optname]
+        return value[-1] if isinstance(value, _MultiValue) else value
+
+    def _join_multiline_values(self):
+        """Join the lines of every value, repeated options become tuples."""
+        defaults = self.default_section, self._defaults
+        all_sections = itertools.chain((defaults,), self._sections.items())
+        for section, options in all_sections:
+            for name, val in options.items():
+                if isinstance(val, _MultiValue):
+                    val = tuple("\n".join(lines).rstrip() for lines in val)
+                elif isinstance(val, list):
+                    val = "\n".join(val).rstrip()
+                options[name] = self._interpolation.before_read(
+                    self, section, name, val
+                )
@@ -1,21 +1,33 @@
+import os
 import pytz
+import cache
 import utils
-import plotille
 import warnings
-import webcolors
 import autocolors
+import providers
+import sessions
+import graphcache
+import braille
+import downsample
+import pricestore
+import profiler
 
 import numpy as np
-import yfinance as market
 
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from ledger import Ledger
+from pricematrix import PriceMatrix, value_curve
 
 
 @dataclass
 class Stock:
     symbol: str
     data: list
+    times: list = None  # bar timestamps matching data, when known
+
+    # spare room behind data and times once extend() has grown them
+    data_buffer = None
+    times_buffer = None
 
     def __post_init__(self):
         self.curr_value = self.data[-1]
@@ -23,10 +35,99 @@ class Stock:
         self.high = max(self.data)
         self.low = min(self.data)
         self.average = sum(self.data) / len(self.data)
+        self.update_change()
+        return
+
+    # build a stock from one row of a PriceMatrix, whose statistics were already
+    # computed for every ticker in a single vectorized pass
+    @classmethod
+    def from_matrix(cls, matrix, symbol):
+        row = matrix.rows[symbol]
+        stock = cls.__new__(cls)
+        stock.symbol = symbol
+        stock.data, stock.times = matrix.series(symbol)
+        stock.curr_value = matrix.curr_value[row]
+        stock.open_value = matrix.open_value[row]
+        stock.high = matrix.high[row]
+        stock.low = matrix.low[row]
+        stock.average = matrix.average[row]
+        stock.change_amount = matrix.change_amount[row]
+        stock.change_percentage = matrix.change_percentage[row]
+        return stock
+
+    # build a stock from a window of a PriceStore, data and times are strided
+    # views of the memory mapped bars, so nothing is read before it is used
+    @classmethod
+    def from_bars(cls, symbol, bars):
+        return cls.from_series(symbol, bars["open"], bars["time"].view("M8[ns]"))
+
+    # build a stock from numpy arrays, with the statistics computed by numpy
+    @classmethod
+    def from_series(cls, symbol, data, times=None):
+        stock = cls.__new__(cls)
+        stock.symbol = symbol
+        stock.data = data
+        stock.times = times
+        stock.curr_value = float(stock.data[-1])
+        stock.open_value = float(stock.data[0])
+        stock.high = float(np.max(stock.data))
+        stock.low = float(np.min(stock.data))
+        stock.average = float(np.mean(stock.data))
+        stock.update_change()
+        return stock
+
+    def update_change(self):
         self.change_amount = self.curr_value - self.open_value
         self.change_percentage = (self.change_amount / self.curr_value) * 100
         return
 
+    # fold newly arrived bars into the statistics without rescanning the old ones
+    # the series grow in place, so a bar costs O(1) however long they are
+    def extend(self, values, times=None):
+        if len(values) == 0:
+            return
+        count = len(self.data)
+        self.data, self.data_buffer = append_to(self.data, self.data_buffer, values)
+        if self.times is not None and times is not None:
+            self.times, self.times_buffer = append_to(
+                self.times, self.times_buffer, times
+            )
+
+        self.curr_value = self.data[-1]
+        self.high = max(self.high, np.max(values))
+        self.low = min(self.low, np.min(values))
+        self.average = (self.average * count + np.sum(values)) / len(self.data)
+        self.update_change()
+        return
+
+    # a live quote between bars, it moves the current value and the range but
+    # is not a bar of the series, so the average stays the bars' average
+    def tick(self, price):
+        self.curr_value = price
+        self.high = max(self.high, price)
+        self.low = min(self.low, price)
+        self.update_change()
+        return
+
+    def last_time(self):
+        if self.times is None or len(self.times) == 0:
+            return None
+        return self.times[-1]
+
+
+# append values to array, a view of the start of buffer, returns the new
+# (array, buffer): the buffer doubles when full, so appends are amortized O(1)
+def append_to(array, buffer, values):
+    array = np.asarray(array)
+    values = np.asarray(values, dtype=array.dtype)
+    used = len(array)
+    if buffer is None or array.base is not buffer or used + len(values) > len(buffer):
+        grown = np.empty(max(2 * (used + len(values)), 64), dtype=array.dtype)
+        grown[:used] = array
+        buffer = grown
+    buffer[used : used + len(values)] = values
+    return buffer[: used + len(values)], buffer
+
 
 @dataclass
 class PortfolioEntry:
@@ -35,12 +136,21 @@ class PortfolioEntry:
     average_cost: float
     graph: bool = False
     color: str = None
+    ledger: Ledger = None
 
     def __post_init__(self):
+        self.update()
+        return
+
+    # (re)derive the holding values from the current stock statistics
+    def update(self):
         self.holding_market_value = self.stock.curr_value * self.count
         self.holding_open_value = self.stock.open_value * self.count
         self.cost_basis = self.count * self.average_cost
         self.gains = self.holding_market_value - self.cost_basis
+        # with the "net" cost basis every gain stays in the position
+        self.realized_gains = self.ledger.realized if self.ledger is not None else 0
+        self.unrealized_gains = self.gains
         if self.count == 0:
             self.gains_per_share = 0
         else:
@@ -48,6 +158,27 @@ class PortfolioEntry:
         return
 
 
+@dataclass
+class Position:
+    symbol: str
+    ledger: Ledger
+    color: str = None
+    graph: bool = False
+
+
+# pull one ticker's prices and their timestamps out of a download, dropping NaN values
+# single ticker downloads from older yfinance releases are not split into tickers
+def extract_series(market_data, ticker, data_key="Open"):
+    column = market_data[data_key]
+    if hasattr(column, "columns"):
+        if ticker not in column.columns:
+            raise KeyError(ticker)  # another ticker's bars are not this one's
+        column = column[ticker]
+    values = np.asarray(column.values, dtype=float).reshape(-1)
+    mask = ~np.isnan(values)
+    return values[mask], column.index.values[mask]
+
+
 class Portfolio(metaclass=utils.Singleton):
     def __init__(self, *args, **kwargs):
         self.stocks = {}
@@ -56,6 +187,25 @@ class Portfolio(metaclass=utils.Singleton):
             0  # amount invested into the portfolio (sum of cost of shares)
         )
         self.market_value = 0  # current market value of shares
+        self.realized_value = 0  # gains locked in by sells
+        self.graphs = []
+        self.provider = None  # where market data comes from, see providers.py
+        self.graph_cache = None  # rendered graphs, see graphcache.py
+        self.store = None  # bar history on disk, see pricestore.py
+        self.curve = None  # (version, value curve) of the last value_curve() call
+        self.pool = None  # (workers, executor) rendering graphs, see graph_pool()
+        self.version = 0  # bumped whenever the entries or their values change
+        return
+
+    # forget every entry, e.g. before populating again from a changed portfolio.ini
+    def reset(self):
+        self.stocks = {}
+        self.open_market_value = 0
+        self.cost_value = 0
+        self.market_value = 0
+        self.realized_value = 0
+        self.graphs = []
+        self.version += 1
         return
 
     def add_entry(
@@ -65,13 +215,16 @@ class Portfolio(metaclass=utils.Singleton):
         average_buyin_cost: float,
         color: str,
         graph: bool,
+        ledger: Ledger = None,
     ):
-        entry = PortfolioEntry(stock, count, average_buyin_cost, graph, color)
+        entry = PortfolioEntry(stock, count, average_buyin_cost, graph, color, ledger)
         self.stocks[stock.symbol] = entry
 
         self.open_market_value += entry.holding_open_value
         self.market_value += entry.holding_market_value
         self.cost_value += entry.cost_basis
+        self.realized_value += entry.realized_gains
+        self.version += 1
         return
 
     def get_stocks(self):
@@ -80,38 +233,13 @@ class Portfolio(metaclass=utils.Singleton):
     def get_stock(self, symbol):
         return self.stocks[symbol]
 
+    # weighted average buy in price, sale proceeds reduce the amount paid
     def average_buyin(self, buys: list, sells: list):
-        buy_c, buy_p, sell_c, sell_p, count, bought_at = 0, 0, 0, 0, 0, 0
-        buys = [_.split("@") for _ in ([buys] if type(buys) is not tuple else buys)]
-        sells = [_.split("@") for _ in ([sells] if type(sells) is not tuple else sells)]
-
-        for buy in buys:
-            next_c = float(buy[0])
-            if next_c <= 0:
-                print(
-                    'A negative "buy" key was detected. Use the sell key instead to guarantee accurate calculations.'
-                )
-                exit()
-            buy_c += next_c
-            buy_p += float(buy[1]) * next_c
-
-        for sell in sells:
-            next_c = float(sell[0])
-            if next_c <= 0:
-                print(
-                    'A negative "sell" key was detected. Use the buy key instead to guarantee accurate calculations.'
-                )
-                exit()
-            sell_c += next_c
-            sell_p += float(sell[1]) * next_c
-
-        count = buy_c - sell_c
-        if count == 0:
+        ledger = Ledger("net")
+        ledger.load(buys, sells)
+        if ledger.shares == 0:
             return 0, 0
-
-        bought_at = (buy_p - sell_p) / count
-
-        return count, bought_at
+        return ledger.shares, ledger.average_cost()
 
     # download all ticker data in a single request
     # harder to parse but this provides a signficant performance boost
@@ -120,12 +248,136 @@ class Portfolio(metaclass=utils.Singleton):
         time_period = args.time_period if args.time_period else "1d"
         time_interval = args.time_interval if args.time_interval else "1m"
 
+        if self.provider is None:
+            self.provider = providers.from_args(args)
+
+        market_data = self.load_market_data(args, stocks, time_period, time_interval)
+
+        record_dir = getattr(args, "record_dir", None)
+        if record_dir is not None and market_data is not None:
+            providers.record_market_data(market_data, stocks, time_interval, record_dir)
+        return market_data
+
+    def load_market_data(self, args, stocks, time_period, time_interval):
+        if self.open_store(args) is not None:
+            return self.load_store_tail(stocks, time_period, time_interval)
+
+        data_cache = self.open_cache(args)
+        if data_cache is None:
+            return self.fetch(stocks, time_interval, period=time_period)
+
+        frames = {}
+        stale = {}
+        missing = []
+        for ticker in stocks:
+            entry = data_cache.load(ticker, time_period, time_interval)
+            if entry is None or entry.last_timestamp() is None:
+                missing.append(ticker)
+            elif entry.fresh:
+                frames[ticker] = entry.frame
+            else:
+                stale[ticker] = entry
+
+        # partial hits only need the bars newer than the ones already cached
+        if len(stale) > 0:
+            start = min(entry.last_timestamp() for entry in stale.values())
+            tail = self.fetch(list(stale.keys()), time_interval, start=start)
+            tail_frames = cache.split_by_ticker(tail, list(stale.keys()))
+            for ticker, entry in stale.items():
+                if tail is None:
+                    # offline, fall back to the last known bars
+                    frames[ticker] = entry.frame
+                elif ticker in tail_frames:
+                    frames[ticker] = cache.merge_tail(
+                        entry.frame, tail_frames[ticker], time_period
+                    )
+                    data_cache.store(ticker, time_period, time_interval, frames[ticker])
+                else:
+                    frames[ticker] = entry.frame
+                    data_cache.touch(ticker, time_period, time_interval)
+
+        if len(missing) > 0:
+            fetched = cache.split_by_ticker(
+                self.fetch(missing, time_interval, period=time_period), missing
+            )
+            for ticker, frame in fetched.items():
+                if len(frame) > 0:
+                    data_cache.store(ticker, time_period, time_interval, frame)
+                frames[ticker] = frame
+
+        return cache.combine_tickers(
+            {ticker: frames[ticker] for ticker in stocks if ticker in frames}
+        )
+
+    # only the bars newer than the stored history are downloaded, tickers
+    # without history (or one older than the period) get the whole period
+    def load_store_tail(self, stocks, time_period, time_interval):
+        span = cache.period_span(time_period)
+        now = np.datetime64("now", "ns").view(np.int64)
+        recent = {}
+        full = []
+        for ticker in stocks:
+            last = self.store.last_time(ticker, time_interval)
+            if last is None or (
+                span is not None and last < now - span.total_seconds() * 10**9
+            ):
+                full.append(ticker)
+            else:
+                recent[ticker] = last
+
+        frames = {}
+        if len(recent) > 0:
+            start = np.datetime64(min(recent.values()), "ns").astype("datetime64[s]")
+            start = start.item().replace(tzinfo=pytz.utc)
+            tail = self.fetch(list(recent), time_interval, start=start)
+            frames.update(cache.split_by_ticker(tail, list(recent)))
+        if len(full) > 0:
+            fetched = self.fetch(full, time_interval, period=time_period)
+            frames.update(cache.split_by_ticker(fetched, full))
+
+        self.store.append_download(
+            cache.combine_tickers(frames), list(frames), time_interval
+        )
+        return cache.combine_tickers(
+            {ticker: frames[ticker] for ticker in stocks if ticker in frames}
+        )
+
+    # the price store is opt-in, it keeps every bar ever downloaded
+    def open_store(self, args):
+        store_dir = getattr(args, "store_dir", None)
+        if store_dir is None:
+            self.store = None
+        elif self.store is None or self.store.directory != store_dir:
+            self.store = pricestore.PriceStore(store_dir)
+        return self.store
+
+    def open_cache(self, args):
+        cache_dir = getattr(args, "cache_dir", None)
+        if cache_dir is None or getattr(args, "no_cache", False):
+            return None
+        max_size = getattr(args, "cache_max_size", None)
+        return cache.MarketDataCache(
+            cache_dir,
+            max_size * 1024 * 1024 if max_size else cache.DEFAULT_MAX_BYTES,
+            # entries of one provider are never served as another one's data
+            namespace=self.provider.cache_namespace() if self.provider else None,
+        )
+
+    # rendered graphs are always kept in memory, and saved next to the market
+    # data while the disk cache is enabled
+    def open_graph_cache(self, args):
+        cache_dir = getattr(args, "cache_dir", None)
+        path = None
+        if cache_dir is not None and not getattr(args, "no_cache", False):
+            path = os.path.join(cache_dir, "graphs.pickle")
+        graph_cache = graphcache.GraphCache(path=path)
+        graph_cache.load()
+        return graph_cache
+
+    def fetch(self, stocks, time_interval, period=None, start=None):
         try:
-            return market.download(
-                tickers=stocks,
-                period=time_period,
-                interval=time_interval,
-                progress=False,
+            return self.provider.fetch(
+                stocks, time_interval, period=period, start=start
             )
         except Exception as e:
             print(
@@ -134,27 +386,16 @@ class Portfolio(metaclass=utils.Singleton):
             print("Error message:", e)
 
     def populate(self, stocks_config, args):
-        sections = stocks_config.sections()
-
-        # download all stock data
-        market_data = self.download_market_data(args, sections)
-
-        # iterate through each ticker data
-        data_key = "Open"
-        for ticker in sections:
-            # convert the numpy array into a list of prices while removing NaN values
-            # if there is only one section, the data frame is not split into tickers
-            if len(sections) > 1:
-                data = market_data[data_key][ticker].values[
-                    ~np.isnan(market_data[data_key][ticker].values)
-                ]
-            else:
-                data = market_data[data_key].values[
-                    ~np.isnan(market_data[data_key].values)
-                ]
-            new_stock = Stock(ticker, data)
+        cost_basis = getattr(args, "cost_basis", None) or "net"
+        self.populate_positions(self.compile_positions(stocks_config, cost_basis), args)
+        return
 
-            # calculate average buy in
+    # everything populate needs from portfolio.ini, without any market data
+    # the result does not change until the file does, see snapshot.py
+    def compile_positions(self, stocks_config, cost_basis="net"):
+        positions = []
+        for ticker in stocks_config.sections():
+            # replay the buys and sells into the ticker's ledger
             buyin = (
                 stocks_config[ticker]["buy"]
                 if "buy" in list(stocks_config[ticker].keys())
@@ -165,7 +406,8 @@ class Portfolio(metaclass=utils.Singleton):
                 if "sell" in list(stocks_config[ticker].keys())
                 else ()
             )
-            count, bought_at = self.average_buyin(buyin, sellout)
+            ledger = Ledger(cost_basis)
+            ledger.load(buyin, sellout)
 
             # Check the stock color for graphing
             color = (
@@ -179,6 +421,8 @@ class Portfolio(metaclass=utils.Singleton):
             if color == None:
                 colorWarningFlag = False
             elif type(color) == str:
+                import webcolors
+
                 if (color.startswith("#")) or (
                     color in webcolors.CSS3_NAMES_TO_HEX.keys()
                 ):
@@ -197,11 +441,237 @@ class Portfolio(metaclass=utils.Singleton):
                 and stocks_config[ticker]["graph"] == "True"
             )
 
-            # finally, add the stock to the portfolio
-            self.add_entry(new_stock, count, bought_at, color, should_graph)
+            positions.append(Position(ticker, ledger, color, should_graph))
+        return positions
+
+    def populate_positions(self, positions, args, on_batch=None):
+        sections = [position.symbol for position in positions]
+        by_symbol = {position.symbol: position for position in positions}
+
+        # download all stock data, entries are added batch by batch as the
+        # provider hands them out and on_batch() is called after each batch
+        profiler.count("tickers", len(sections))
+        batches = self.stream_market_data(args, sections)
+        while True:
+            with profiler.phase("download"):
+                batch = next(batches, None)
+            if batch is None:
+                break
+            tickers, market_data = batch
+
+            with profiler.phase("build"):
+                stocks = self.build_stocks(args, tickers, market_data)
+                for symbol, stock in stocks.items():
+                    position = by_symbol.get(symbol)
+                    if position is None:
+                        continue
+
+                    # finally, add the stock to the portfolio
+                    self.add_entry(
+                        stock,
+                        position.ledger.shares,
+                        position.ledger.average_cost(),
+                        position.color,
+                        position.graph,
+                        position.ledger,
+                    )
+                    profiler.count("bars", len(stock.data))
+            if on_batch is not None:
+                on_batch()
+
+        for symbol in sections:
+            if symbol not in self.stocks:
+                warnings.warn(
+                    "No market data was found for " + symbol + ", skipping it."
+                )
+
+        # batches arrive in any order, the table follows portfolio.ini
+        self.stocks = {
+            symbol: self.stocks[symbol] for symbol in sections if symbol in self.stocks
+        }
+        return
+
+    # the stocks of a batch, windows of the price store when there is one
+    def build_stocks(self, args, tickers, market_data):
+        if self.store is None:
+            # per ticker statistics are computed for every ticker at once
+            matrix = PriceMatrix.from_download(market_data, tickers)
+            return {
+                symbol: Stock.from_matrix(matrix, symbol)
+                for symbol in tickers
+                if matrix.has_data(symbol)
+            }
+
+        time_period = args.time_period if args.time_period else "1d"
+        time_interval = args.time_interval if args.time_interval else "1m"
+        stocks = {}
+        for symbol in tickers:
+            bars = self.store.window(symbol, time_interval, time_period)
+            if len(bars) > 0:
+                stocks[symbol] = Stock.from_bars(symbol, bars)
+        return stocks
+
+    # (tickers, market data) batches, a single one unless the provider streams
+    # fresh cache entries come first, the rest as the provider delivers it
+    def stream_market_data(self, args, stocks):
+        if self.provider is None:
+            self.provider = providers.from_args(args)
+        self.open_store(args)
+        if not self.provider.streams:
+            yield stocks, self.download_market_data(args, stocks)
+            return
+
+        time_period = args.time_period if args.time_period else "1d"
+        time_interval = args.time_interval if args.time_interval else "1m"
+        record_dir = getattr(args, "record_dir", None)
+        # the store holds everything the cache would, and more
+        data_cache = self.open_cache(args) if self.store is None else None
+
+        pending = stocks
+        if data_cache is not None:
+            fresh = {}
+            for ticker in stocks:
+                entry = data_cache.load(ticker, time_period, time_interval)
+                if entry is not None and entry.fresh and len(entry.frame) > 0:
+                    fresh[ticker] = entry.frame
+            if len(fresh) > 0:
+                yield list(fresh), cache.combine_tickers(fresh)
+            pending = [ticker for ticker in stocks if ticker not in fresh]
+
+        try:
+            for frames in self.provider.stream(
+                pending, time_interval, period=time_period
+            ):
+                market_data = cache.combine_tickers(frames)
+                if data_cache is not None:
+                    for ticker, frame in frames.items():
+                        data_cache.store(ticker, time_period, time_interval, frame)
+                if self.store is not None:
+                    self.store.append_download(market_data, list(frames), time_interval)
+                if record_dir is not None:
+                    providers.record_market_data(
+                        market_data, list(frames), time_interval, record_dir
+                    )
+                yield list(frames), market_data
+        except Exception as e:
+            print(
+                "cliStocksTracker must be connected to the internet to function. Please ensure that you are connected to the internet and try again."
+            )
+            print("Error message:", e)
+        return
+
+    # fetch only the bars newer than the newest one held for each ticker
+    # safe to run on a worker thread, the portfolio is not modified
+    def fetch_updates(self, args):
+        time_interval = args.time_interval if args.time_interval else "1m"
+        last_times = [entry.stock.last_time() for entry in self.stocks.values()]
+        last_times = [last for last in last_times if last is not None]
+        if len(last_times) == 0:
+            return None
+
+        # timestamps are held as UTC datetime64 values
+        start = min(last_times).astype("datetime64[s]").item().replace(tzinfo=pytz.utc)
+        market_data = self.fetch(list(self.stocks.keys()), time_interval, start=start)
+        if self.store is not None and market_data is not None:
+            self.store.append_download(market_data, list(self.stocks), time_interval)
+        return market_data
+
+    # fold the bars returned by fetch_updates into the stocks and the portfolio totals
+    def apply_updates(self, market_data):
+        if market_data is None or len(market_data.columns) == 0:
+            return
+        for symbol, entry in self.stocks.items():
+            try:
+                data, times = extract_series(market_data, symbol)
+            except KeyError:
+                continue  # no new data for this ticker
+            self.update_bars(symbol, data, times)
+        return
+
+    # move a position to a live price, the entry and the portfolio totals are
+    # adjusted by the difference, in constant time
+    def update_price(self, symbol, price):
+        entry = self.stocks[symbol]
+        old_values = entry.holding_market_value, entry.holding_open_value
+        entry.stock.tick(float(price))
+        self.update_totals(entry, *old_values)
+        return
+
+    # append new bars to a position, bars is either a price array (with times
+    # matching it) or a window of a PriceStore, bars the position already
+    # holds are skipped; costs O(len(bars)) however long the series is
+    def update_bars(self, symbol, bars, times=None):
+        entry = self.stocks[symbol]
+        if getattr(bars, "dtype", None) is not None and bars.dtype.names:
+            bars, times = bars["open"], bars["time"].view("datetime64[ns]")
+        if times is None and entry.stock.times is not None:
+            raise ValueError("The new bars of " + symbol + " need their timestamps")
+        values = np.asarray(bars, dtype=float)
+        keep = ~np.isnan(values)
+        last = entry.stock.last_time()
+        if last is not None and times is not None:
+            keep &= np.asarray(times) > last
+        if not keep.all():
+            values = values[keep]
+            times = np.asarray(times)[keep] if times is not None else None
+        if len(values) == 0:
+            return
+
+        old_values = entry.holding_market_value, entry.holding_open_value
+        entry.stock.extend(values, times)
+        self.update_totals(entry, *old_values)
+        return
+
+    # rederive an entry whose stock changed and fold the difference into the
+    # totals, the cost of a position does not depend on the price
+    def update_totals(self, entry, old_market_value, old_open_value):
+        entry.update()
+        self.market_value += entry.holding_market_value - old_market_value
+        self.open_market_value += entry.holding_open_value - old_open_value
+        self.version += 1
+        return
+
+    # (timestamps, portfolio value) of every bar any holding traded, with each
+    # holding at its latest price, see pricematrix.value_curve
+    def value_curve(self):
+        if self.curve is not None and self.curve[0] == self.version:
+            return self.curve[1]
+        entries = [
+            entry for entry in self.stocks.values() if entry.stock.times is not None
+        ]
+        curve = value_curve(
+            [(entry.stock.data, entry.stock.times) for entry in entries],
+            [entry.count for entry in entries],
+        )
+        self.curve = (self.version, curve)
+        return curve
 
-    def gen_graphs(self, independent_graphs, graph_width, graph_height, cfg_timezone):
+    def gen_graphs(
+        self,
+        independent_graphs,
+        graph_width,
+        graph_height,
+        cfg_timezone,
+        parallel=False,
+        backend="plotille",
+        curve=False,
+    ):
+        # the total value goes on a graph of its own, above the tickers
         graphs = []
+        if curve:
+            times, values = self.value_curve()
+            if len(values) > 0:
+                graphs.append(
+                    Graph(
+                        [Stock.from_series("Portfolio", values, times)],
+                        graph_width,
+                        graph_height,
+                        [None],
+                        timezone=cfg_timezone,
+                        backend=backend,
+                    )
+                )
+
         if not independent_graphs:
             graphing_list = []
             color_list = []
@@ -217,26 +687,157 @@ class Portfolio(metaclass=utils.Singleton):
                         graph_height,
                         color_list,
                         timezone=cfg_timezone,
+                        backend=backend,
                     )
                 )
         else:
-            for sm in self.get_stocks().values():
-                if sm.graph:
-                    graphs.append(
-                        Graph(
-                            [sm.stock],
-                            graph_width,
-                            graph_height,
-                            [sm.color],
-                            timezone=cfg_timezone,
-                        )
+            graphed = [sm for sm in self.get_stocks().values() if sm.graph]
+            workers = min(len(graphed), available_cores()) if parallel else 1
+            if workers > 1:
+                for graph in graphs:
+                    graph.gen_graph(autocolors.color_list, self.graph_cache)
+                self.graphs = graphs + render_in_pool(
+                    graphed,
+                    graph_width,
+                    graph_height,
+                    cfg_timezone,
+                    self.graph_pool(workers),
+                    self.graph_cache,
+                    backend,
+                )
+                return
+
+            for sm in graphed:
+                graphs.append(
+                    Graph(
+                        [sm.stock],
+                        graph_width,
+                        graph_height,
+                        [sm.color],
+                        timezone=cfg_timezone,
+                        backend=backend,
                     )
+                )
 
         for graph in graphs:
-            graph.gen_graph(autocolors.color_list)
+            graph.gen_graph(autocolors.color_list, self.graph_cache)
         self.graphs = graphs
         return
 
+    # the worker processes of parallel gen_graphs calls, started by the first
+    # one and reused by the rest (e.g. every --watch refresh) until close()
+    def graph_pool(self, workers):
+        from concurrent.futures import ProcessPoolExecutor
+
+        if self.pool is not None and self.pool[0] < workers:
+            self.close()
+        if self.pool is None:
+            self.pool = (workers, ProcessPoolExecutor(max_workers=workers))
+        return self.pool[1]
+
+    # stop the graph worker processes, a later gen_graphs call starts new ones
+    def close(self):
+        if self.pool is not None:
+            self.pool[1].shutdown()
+            self.pool = None
+        return
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on every platform
+        return os.cpu_count() or 1
+
+
+# render one independent graph per entry on executor, a pool of worker processes
+# only each series' plotted points cross the process boundary, and map keeps
+# the graphs in portfolio order. Graphs found in graph_cache are not sent
+def render_in_pool(
+    entries, width, height, timezone, executor, graph_cache=None, backend="plotille"
+):
+    jobs = []
+    for entry in entries:
+        stock = entry.stock
+        # the downsampled series on the full series' calendar draws exactly
+        # the same graph
+        keep = downsample.minmax_indices(stock.data, width)
+        if stock.times is not None:
+            times = stock.times[keep]
+            calendar = sessions.SessionCalendar.from_times(stock.times)
+        else:
+            times, calendar = None, None
+        data = np.asarray(stock.data)[keep]
+        y_range = (stock.low, stock.high)
+        jobs.append((stock.symbol, data, times, calendar, entry.color, y_range))
+
+    graphs = [None] * len(jobs)
+    keys = [None] * len(jobs)
+    if graph_cache is not None:
+        for i, (symbol, data, times, calendar, color, y_range) in enumerate(jobs):
+            keys[i] = graphcache.graph_key(
+                [(symbol, data, times)],
+                [color],
+                calendar,
+                width,
+                height,
+                pytz.timezone(timezone),
+                backend,
+                y_range,
+            )
+            graphs[i] = graph_cache.get(keys[i])
+
+    missing = [i for i, graph in enumerate(graphs) if graph is None]
+    if len(missing) > 0:
+        rendered = executor.map(
+            render_graph,
+            [jobs[i] for i in missing],
+            [width] * len(missing),
+            [height] * len(missing),
+            [timezone] * len(missing),
+            [backend] * len(missing),
+        )
+        for i, graph in zip(missing, rendered):
+            graphs[i] = graph
+            if graph_cache is not None:
+                graph_cache.put(keys[i], graph)
+
+    return [RenderedGraph(graph) for graph in graphs]
+
+
+# worker side of render_in_pool
+def render_graph(job, width, height, timezone, backend):
+    symbol, data, times, calendar, color, y_range = job
+    # a live quote may lie outside the plotted bars
+    stock = Stock(symbol, data, times)
+    stock.low, stock.high = y_range
+    graph = Graph(
+        [stock],
+        width,
+        height,
+        [color],
+        timezone=timezone,
+        calendar=calendar,
+        backend=backend,
+    )
+    graph.gen_graph(autocolors.color_list)
+    return graph()
+
+
+class RenderedGraph:
+    """A graph drawn elsewhere (e.g. in a worker process), only its text is kept."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        return
+
+    def __call__(self):
+        return self.graph
+
+    def draw(self):
+        print(self.graph)
+        return
+
 
 class Graph:
     def __init__(
@@ -245,7 +846,15 @@ class Graph:
         self.stocks = stocks
         self.graph = ""
         self.colors = colors
-        self.plot = plotille.Figure()
+
+        self.backend = kwargs.get("backend") or "plotille"
+        if self.backend == "braille":
+            self.plot = braille.Figure()
+        else:
+            # the plotting stack is only imported by runs that draw a graph
+            import plotille
+
+            self.plot = plotille.Figure()
 
         self.plot.width = width
         self.plot.height = height
@@ -258,31 +867,24 @@ class Graph:
         else:
             self.timezone = pytz.utc
 
-        if "starttime" in kwargs.keys():
-            self.start = (
-                kwargs["startend"].replace(tzinfo=pytz.utc).astimezone(self.timezone)
+        # the x axis is the bars' real timestamps with the market closures cut
+        # out, series without timestamps fall back to their bar index
+        if "calendar" in kwargs.keys():
+            self.calendar = kwargs["calendar"]
+        elif all(stock.times is not None for stock in stocks):
+            self.calendar = sessions.SessionCalendar.from_times(
+                *[stock.times for stock in stocks]
             )
         else:
-            self.start = (
-                datetime.now()
-                .replace(hour=14, minute=30, second=0)
-                .replace(tzinfo=pytz.utc)
-                .astimezone(self.timezone)
-            )
+            self.calendar = None
 
-        if "endtime" in kwargs.keys():
-            self.end = (
-                kwargs["endtime"].replace(tzinfo=pytz.utc).astimezone(self.timezone)
-            )
+        if self.calendar is not None:
+            x_max = self.calendar.span()
+            self.plot.x_ticks_fkt = self.x_tick
         else:
-            self.end = (
-                datetime.now()
-                .replace(hour=21, minute=0, second=0)
-                .replace(tzinfo=pytz.utc)
-                .astimezone(self.timezone)
-            )
+            x_max = max(len(stock.data) for stock in stocks) - 1
 
-        self.plot.set_x_limits(min_=self.start, max_=self.end)
+        self.plot.set_x_limits(min_=0, max_=max(x_max, 1))
 
         return
 
@@ -293,11 +895,37 @@ class Graph:
         print(self.graph)
         return
 
-    def gen_graph(self, auto_colors):
+    def gen_graph(self, auto_colors, graph_cache=None):
+        # a braille cell is two dots wide, so a low and a high point per
+        # column is all the detail the canvas can show
+        series = []
+        for stock in self.stocks:
+            keep = downsample.minmax_indices(stock.data, self.plot.width)
+            times = stock.times[keep] if stock.times is not None else None
+            series.append((stock.symbol, np.asarray(stock.data)[keep], times, keep))
+
         self.y_min, self.y_max = self.find_y_range()
+        if graph_cache is not None:
+            key = graphcache.graph_key(
+                [(symbol, data, times) for symbol, data, times, _ in series],
+                self.colors,
+                self.calendar,
+                self.plot.width,
+                self.plot.height,
+                self.timezone,
+                self.backend,
+                (self.y_min, self.y_max),
+            )
+            graph = graph_cache.get(key)
+            if graph is not None:
+                self.graph = graph
+                return
+
+        import webcolors
+
         self.plot.set_y_limits(min_=self.y_min, max_=self.y_max)
 
-        for i, stock in enumerate(self.stocks):
+        for i, (symbol, data, times, keep) in enumerate(series):
             if self.colors[i] == None:
                 color = webcolors.hex_to_rgb(auto_colors[i % 67])
             elif self.colors[i].startswith("#"):
@@ -307,24 +935,34 @@ class Graph:
                     webcolors.CSS3_NAMES_TO_HEX[self.colors[i]]
                 )
 
-            self.plot.plot(
-                [self.start + timedelta(minutes=i) for i in range(len(stock.data))],
-                stock.data,
-                lc=color,
-                label=stock.symbol,
-            )
+            self.plot.plot(self.x_values(times, keep), data, lc=color, label=symbol)
 
         self.graph = self.plot.show(legend=True)
+        if graph_cache is not None:
+            graph_cache.put(key, self.graph)
         return
 
+    # x positions of the plotted bars, whose indices are keep
+    def x_values(self, times, keep):
+        if self.calendar is None:
+            return keep.astype(float)
+        return self.calendar.to_x(times)
+
+    # label for the x axis tick at x, in the configured timezone
+    def x_tick(self, x, next_x):
+        time = self.calendar.to_times([x])[0].astype("datetime64[s]").item()
+        time = time.replace(tzinfo=pytz.utc).astimezone(self.timezone)
+        return time.strftime(self.calendar.label_format())
+
     def find_y_range(self):
         y_min = 10000000000000  # Arbitrarily large number (bigger than any single stock should ever be worth)
         y_max = 0
 
+        # the stock statistics already hold every series' extremes
         for stock in self.stocks:
-            if y_min > min(stock.data):
-                y_min = min(stock.data)
-            if y_max < max(stock.data):
-                y_max = max(stock.data)
+            if y_min > stock.low:
+                y_min = stock.low
+            if y_max < stock.high:
+                y_max = stock.high
 
         return y_min, y_max
@@ -0,0 +1,128 @@
+import numpy as np
+
+
+class PriceMatrix:
+    """Prices of many tickers on one shared time axis (tickers x timestamps).
+
+    Bars a ticker did not trade are NaN. When the matrix is built the valid
+    prices are packed row by row into one flat array, so every ticker's series
+    is a contiguous slice of it, and every per ticker statistic is computed for
+    all rows at once from that array. Stock.from_matrix only copies a few
+    scalars and a view of the packed series.
+    """
+
+    def __init__(self, symbols, prices, times=None):
+        self.symbols = list(symbols)
+        self.prices = np.asarray(prices, dtype=float).reshape(len(self.symbols), -1)
+        self.times = times
+        self.rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.compute()
+        return
+
+    # convert a (field, ticker) download into a matrix with a single copy of the
+    # price block, tickers missing from the download become rows of NaN
+    @classmethod
+    def from_download(cls, market_data, tickers, data_key="Open"):
+        if market_data is None or data_key not in market_data:
+            # nothing was downloaded, every ticker is missing
+            return cls(tickers, np.empty((len(tickers), 0)), None)
+        column = market_data[data_key]
+        if hasattr(column, "columns"):
+            block = column.reindex(columns=tickers).to_numpy(dtype=float)
+        else:
+            # older yfinance releases do not split single ticker downloads
+            block = column.to_numpy(dtype=float).reshape(-1, 1)
+        # the transpose of a pandas block is usually C ordered already
+        prices = np.ascontiguousarray(block.T)
+        return cls(tickers, prices, market_data.index.values)
+
+    def compute(self):
+        prices = self.prices
+        valid = ~np.isnan(prices)
+
+        self.counts = valid.sum(axis=1)
+        self.offsets = np.zeros(len(self.symbols) + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=self.offsets[1:])
+
+        # row major boolean indexing packs each ticker's prices contiguously
+        self.values = prices[valid]
+        if self.times is not None:
+            self.value_times = np.broadcast_to(self.times, prices.shape)[valid]
+        else:
+            self.value_times = None
+
+        self.open_value = np.full(len(self.symbols), np.nan)
+        self.curr_value = np.full(len(self.symbols), np.nan)
+        self.high = np.full(len(self.symbols), np.nan)
+        self.low = np.full(len(self.symbols), np.nan)
+        self.average = np.full(len(self.symbols), np.nan)
+
+        has_data = self.counts > 0
+        if has_data.any():
+            # empty rows have zero length, so the starts of the other rows are
+            # exactly the segment boundaries reduceat needs
+            starts = self.offsets[:-1][has_data]
+            ends = self.offsets[1:][has_data]
+            self.open_value[has_data] = self.values[starts]
+            self.curr_value[has_data] = self.values[ends - 1]
+            self.high[has_data] = np.maximum.reduceat(self.values, starts)
+            self.low[has_data] = np.minimum.reduceat(self.values, starts)
+            self.average[has_data] = (
+                np.add.reduceat(self.values, starts) / self.counts[has_data]
+            )
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.change_amount = self.curr_value - self.open_value
+            self.change_percentage = self.change_amount / self.curr_value * 100
+        return
+
+    def has_data(self, symbol):
+        return self.counts[self.rows[symbol]] > 0
+
+    # the prices (and timestamps) of one row with the missing bars removed
+    # both are views into the packed arrays, nothing is copied
+    def series(self, symbol):
+        row = self.rows[symbol]
+        start, end = self.offsets[row], self.offsets[row + 1]
+        times = self.value_times[start:end] if self.value_times is not None else None
+        return self.values[start:end], times
+
+
+# the summed value of many holdings at every timestamp any of them traded,
+# the same as forward filling an aligned tickers x timestamps price matrix and
+# multiplying it by the counts, without ever building the matrix: a ticker's
+# value only changes at its own bars, so the curve is the cumulative sum of
+# those changes over the sorted timestamps. Before its first bar a ticker is
+# held at its first price. series is a list of (prices, times) in time order.
+def value_curve(series, counts):
+    # a holding without bars adds nothing, its count goes with its series
+    held = [(pair, count) for pair, count in zip(series, counts) if len(pair[0]) > 0]
+    if len(held) == 0:
+        return np.empty(0, dtype="datetime64[ns]"), np.empty(0)
+    series = [pair for pair, _ in held]
+    counts = np.array([count for _, count in held], dtype=float)
+
+    lengths = np.array([len(values) for values, _ in series])
+    values = np.concatenate([values for values, _ in series]).astype(float)
+    times = np.concatenate([times for _, times in series])
+    starts = np.zeros(len(series), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+
+    previous = np.empty_like(values)
+    previous[1:] = values[:-1]
+    previous[starts] = values[starts]
+    changes = np.repeat(counts, lengths) * (values - previous)
+
+    # every series is a sorted run, which a stable (merge) sort only has to
+    # merge, several times faster than the quicksort np.unique would do
+    stamps = times.view(np.int64) if times.dtype.kind == "M" else times
+    grid = np.sort(stamps, kind="stable")
+    distinct = np.empty(len(grid), dtype=bool)
+    distinct[0] = True
+    np.not_equal(grid[1:], grid[:-1], out=distinct[1:])
+    grid = grid[distinct]
+    columns = np.searchsorted(grid, stamps)
+
+    base = np.dot(counts, values[starts])
+    curve = base + np.cumsum(np.bincount(columns, changes, len(grid)))
+    return grid.view(times.dtype), curve
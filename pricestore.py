@@ -0,0 +1,186 @@
+import os
+import re
+import cache
+import warnings
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks, concurrent appends are not guarded
+    fcntl = None
+
+MAGIC = b"CSTBARS1"
+HEADER_BYTES = 16  # MAGIC and padding, keeps the bars 8 byte aligned
+
+# one bar on disk, timestamps are UTC nanoseconds
+BAR = np.dtype(
+    [
+        ("time", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+FIELDS = {"Open": "open", "High": "high", "Low": "low", "Close": "close"}
+FIELDS["Volume"] = "volume"
+
+NS_PER_DAY = 86400 * 10**9
+
+_empty = np.empty(0, dtype=BAR)
+
+
+# the bars of a single ticker frame (Open, High, ... columns), rows without an
+# open price are left out, like the series the portfolio is built from
+def frame_to_bars(frame):
+    if frame is None or len(frame) == 0 or "Open" not in frame:
+        return _empty
+    index = frame.index
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+
+    bars = np.empty(len(frame), dtype=BAR)
+    bars["time"] = index.values.astype("datetime64[ns]").view(np.int64)
+    for column, field in FIELDS.items():
+        bars[field] = frame[column].to_numpy(dtype=float) if column in frame else np.nan
+    bars = bars[~np.isnan(bars["open"])]
+
+    # downloads are sorted already, a store needs them strictly increasing
+    if np.any(np.diff(bars["time"]) <= 0):
+        _, unique = np.unique(bars["time"][::-1], return_index=True)
+        bars = bars[len(bars) - 1 - unique]
+    return bars
+
+
+# where the bars of the last period end up in times, as trim_to_period cuts a frame
+def period_start(times, period):
+    if len(times) == 0 or period in (None, "max"):
+        return 0
+    last = int(times[-1])
+    if period == "ytd":
+        year = np.datetime64(last, "ns").astype("datetime64[Y]")
+        return int(np.searchsorted(times, year.astype("datetime64[ns]").view(np.int64)))
+
+    match = re.fullmatch(r"(\d+)d", period)
+    if match is None:
+        span = cache.period_span(period)
+        if span is None:
+            return 0
+        cutoff = last - span.total_seconds() * 10**9
+        return int(np.searchsorted(times, cutoff, side="right"))
+
+    # the last N trading dates, looking back further until enough were found
+    amount = int(match.group(1))
+    days = amount + 7
+    while True:
+        start = int(np.searchsorted(times, last - days * NS_PER_DAY))
+        dates = np.unique(times[start:] // NS_PER_DAY)
+        if len(dates) >= amount or start == 0:
+            if len(dates) <= amount:
+                return start
+            return start + int(
+                np.searchsorted(times[start:], dates[-amount] * NS_PER_DAY)
+            )
+        days *= 2
+
+
+class PriceStore:
+    """Bars kept on disk, one append-only file of fixed width records per
+    ticker and interval.
+
+    Files are memory mapped for reading, so a window of any length is a slice
+    of the mapping: nothing is copied or parsed, and only the pages actually
+    used are read from disk. Downloads are appended, keeping only the bars
+    newer than the last stored one, so the history grows a little every run
+    instead of being downloaded again.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.maps = {}
+        os.makedirs(self.directory, exist_ok=True)
+        return
+
+    def path(self, ticker, interval):
+        name = "_".join(
+            re.sub(r"[^A-Za-z0-9.^=-]", "-", part) for part in (ticker, interval)
+        )
+        return os.path.join(self.directory, name + ".bars")
+
+    # every stored bar, as a read-only structured array mapped from the file
+    def bars(self, ticker, interval):
+        path = self.path(ticker, interval)
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            return _empty
+        count = (size - HEADER_BYTES) // BAR.itemsize  # ignores a torn last record
+        if count <= 0:
+            return _empty
+
+        mapped = self.maps.get(path)
+        if mapped is None or len(mapped) != count:
+            with open(path, "rb") as fp:
+                if fp.read(len(MAGIC)) != MAGIC:
+                    warnings.warn(path + " is not a price store file, ignoring it.")
+                    return _empty
+            mapped = np.memmap(
+                path, dtype=BAR, mode="r", offset=HEADER_BYTES, shape=(count,)
+            )
+            self.maps[path] = mapped
+        return mapped
+
+    def last_time(self, ticker, interval):
+        bars = self.bars(ticker, interval)
+        return int(bars["time"][-1]) if len(bars) > 0 else None
+
+    # the bars of the last period, or from start (UTC nanoseconds) on
+    def window(self, ticker, interval, period=None, start=None):
+        bars = self.bars(ticker, interval)
+        times = bars["time"]
+        first = period_start(times, period)
+        if start is not None:
+            first = max(first, int(np.searchsorted(times, start)))
+        return bars[first:]
+
+    # add the bars newer than the stored ones, returns how many were added
+    def append(self, ticker, interval, bars):
+        if len(bars) == 0:
+            return 0
+        path = self.path(ticker, interval)
+        with open(path, "ab+") as fp:
+            if fcntl is not None:
+                fcntl.flock(fp, fcntl.LOCK_EX)
+            try:
+                size = fp.seek(0, os.SEEK_END)
+                if size < HEADER_BYTES:
+                    fp.truncate(0)
+                    fp.write(MAGIC.ljust(HEADER_BYTES, b"\0"))
+                    size = HEADER_BYTES
+
+                # drop a record torn by a crash, then skip what is stored already
+                size -= (size - HEADER_BYTES) % BAR.itemsize
+                fp.truncate(size)
+                if size > HEADER_BYTES:
+                    fp.seek(size - BAR.itemsize)
+                    last = np.frombuffer(fp.read(BAR.itemsize), dtype=BAR)["time"][0]
+                    bars = bars[bars["time"] > last]
+                fp.seek(size)
+                fp.write(np.ascontiguousarray(bars, dtype=BAR).tobytes())
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fp, fcntl.LOCK_UN)
+        return len(bars)
+
+    # append every ticker of a (field, ticker) download
+    def append_download(self, market_data, tickers, interval):
+        added = 0
+        for ticker, frame in cache.split_by_ticker(market_data, tickers).items():
+            added += self.append(ticker, interval, frame_to_bars(frame))
+        return added
+
+    def close(self):
+        self.maps = {}
+        return
@@ -0,0 +1,129 @@
+import sys
+import json
+import time
+import contextlib
+
+PROFILE_FORMATS = ("text", "json")
+
+# the Profiler of this run, None while profiling is off
+active = None
+
+_disabled = contextlib.nullcontext()
+
+
+# time a phase of the run, phases started inside it are reported under it
+# while profiling is off this returns a shared no-op context manager, so the
+# hooks can stay in the hot paths
+def phase(name):
+    if active is None:
+        return _disabled
+    return active.phase(name)
+
+
+# count things processed (tickers, bars, rows, ...), a no-op while off
+def count(name, amount=1):
+    if active is not None:
+        active.counts[name] = active.counts.get(name, 0) + amount
+    return
+
+
+class Profiler:
+    """Times the phases of a run and counts what they processed.
+
+    Phases nest: a phase started while another one runs is recorded as
+    "outer/inner", and a phase entered several times (a render per --watch
+    frame) adds up its time and calls. With a dump path the whole run is
+    also recorded by cProfile and saved for pstats or snakeviz.
+    """
+
+    def __init__(self, output_format="text", dump=None):
+        if output_format not in PROFILE_FORMATS:
+            raise ValueError(
+                'Unknown profile format "{}", expected one of: {}'.format(
+                    output_format, ", ".join(PROFILE_FORMATS)
+                )
+            )
+        self.format = output_format
+        self.dump = dump
+        self.phases = {}  # "outer/inner" -> [seconds, calls], in start order
+        self.counts = {}
+        self.stack = []
+        self.profile = None
+        self.started = None
+        self.elapsed = 0.0
+        return
+
+    def start(self):
+        global active
+        active = self
+        self.started = time.perf_counter()
+        if self.dump is not None:
+            import cProfile
+
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return self
+
+    def stop(self):
+        global active
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.dump)
+        self.elapsed = time.perf_counter() - self.started
+        if active is self:
+            active = None
+        return
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self.stack.append(name)
+        key = "/".join(self.stack)
+        timing = self.phases.setdefault(key, [0.0, 0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing[0] += time.perf_counter() - start
+            timing[1] += 1
+            self.stack.pop()
+        return
+
+    def record(self) -> dict:
+        return {
+            "total": self.elapsed,
+            "phases": {
+                key: {"seconds": seconds, "calls": calls}
+                for key, (seconds, calls) in self.phases.items()
+            },
+            "counts": dict(self.counts),
+        }
+
+    # the report goes to stderr, stdout may be carrying --output records
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        if self.format == "json":
+            stream.write(json.dumps(self.record()) + "\n")
+            return
+
+        total = self.elapsed or 1e-9
+        lines = ["Profile, {:.3f}s in total:".format(self.elapsed)]
+        for key, (seconds, calls) in self.phases.items():
+            depth = key.count("/")
+            name = "  " * depth + key.rsplit("/", 1)[-1]
+            line = "  {:<20} {:>9.3f}s {:>5.1f}%".format(
+                name, seconds, seconds / total * 100
+            )
+            if calls > 1:
+                line += "  x{}".format(calls)
+            lines.append(line)
+        if len(self.counts) > 0:
+            lines.append(
+                "  "
+                + ", ".join(
+                    "{} {}".format(name, amount) for name, amount in self.counts.items()
+                )
+            )
+        if self.dump is not None:
+            lines.append("  cProfile stats saved to " + self.dump)
+        stream.write("\n".join(lines) + "\n")
+        return
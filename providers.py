@@ -0,0 +1,427 @@
+import os
+import json
+import time
+import queue
+import cache
+import hashlib
+import warnings
+import threading
+
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# defaults of how fetch() splits up large downloads
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 1.0  # seconds before the first retry, doubled for every next one
+
+
+class DownloadError(Exception):
+    pass
+
+
+class MarketDataProvider:
+    """Source of OHLCV bars.
+
+    download() returns a DataFrame in the layout of yfinance.download, with
+    (field, ticker) columns and one row per bar timestamp.
+
+    fetch() downloads any number of tickers in batches of batch_size, up to
+    workers batches at a time. A batch that raises is retried with exponential
+    backoff, and whatever is still missing once the deadline (in seconds) has
+    passed is given up on. Failed batches only cost their own tickers, the
+    rest of the download is still returned.
+    """
+
+    name = None
+
+    # whether download() may run for several batches at once
+    thread_safe = True
+
+    # whether stream() hands out tickers as they arrive, instead of all at once
+    streams = False
+
+    batch_size = DEFAULT_BATCH_SIZE
+    workers = DEFAULT_WORKERS
+    retries = DEFAULT_RETRIES
+    backoff = DEFAULT_BACKOFF
+    deadline = None
+
+    def download(self, tickers, interval, period=None, start=None):
+        raise NotImplementedError
+
+    # what the market data cache files its entries under, two providers only
+    # share entries when they serve the same data
+    def cache_namespace(self):
+        return self.name or type(self).__name__.lower()
+
+    def fetch(self, tickers, interval, period=None, start=None):
+        tickers = list(tickers)
+        batches = [
+            tickers[i : i + self.batch_size]
+            for i in range(0, len(tickers), self.batch_size)
+        ]
+        deadline = time.monotonic() + self.deadline if self.deadline else None
+
+        def download(batch):
+            return self.download_batch(batch, interval, period, start, deadline)
+
+        if len(batches) <= 1:
+            return download(tickers)
+
+        results = {}
+        errors = {}
+        workers = min(self.workers, len(batches)) if self.thread_safe else 1
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {
+                executor.submit(download, batch): i for i, batch in enumerate(batches)
+            }
+            timeout = max(deadline - time.monotonic(), 0) if deadline else None
+            done, _ = wait(futures, timeout=timeout)
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    errors[futures[future]] = e
+        finally:
+            # batches still running past the deadline are abandoned
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        failed = [i for i in range(len(batches)) if i not in results]
+        if len(results) == 0:
+            raise DownloadError(
+                "Every batch failed, the last error: {}".format(
+                    errors.get(failed[-1], "the deadline passed")
+                )
+            )
+        if len(failed) > 0:
+            missing = sum(len(batches[i]) for i in failed)
+            warnings.warn(
+                "Downloading {} of {} tickers failed, continuing without them.".format(
+                    missing, len(tickers)
+                )
+            )
+
+        frames = {}
+        for i in sorted(results):
+            frames.update(cache.split_by_ticker(results[i], batches[i]))
+        return cache.combine_tickers(frames)
+
+    # the download as {ticker: frame} batches, see ChartProvider
+    def stream(self, tickers, interval, period=None, start=None):
+        yield cache.split_by_ticker(
+            self.fetch(tickers, interval, period=period, start=start), list(tickers)
+        )
+
+    def download_batch(self, batch, interval, period, start, deadline):
+        attempt = 0
+        while True:
+            try:
+                return self.download(batch, interval, period=period, start=start)
+            except Exception:
+                delay = self.backoff * 2**attempt
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    raise
+                time.sleep(delay)
+
+
+class YahooProvider(MarketDataProvider):
+    name = "yahoo"
+
+    # yfinance.download keeps its results in module globals, so batches are
+    # downloaded one after another, each one on yfinance's own threads
+    thread_safe = False
+
+    def download(self, tickers, interval, period=None, start=None):
+        # yfinance pulls in pandas, requests and curl_cffi, so it is only
+        # imported once something actually has to be downloaded
+        import yfinance as market
+
+        frame = market.download(
+            tickers=tickers,
+            period=period,
+            start=start,
+            interval=interval,
+            progress=False,
+        )
+        # yfinance reports failures by returning empty or all-NaN columns
+        # instead of raising. Nothing at all arriving is an error worth
+        # retrying, while a few tickers missing from an otherwise good download
+        # are usually delisted or mistyped and would only fail again
+        arrived = cache.split_by_ticker(frame, list(tickers))
+        if all(len(bars) == 0 for bars in arrived.values()):
+            raise DownloadError("yfinance returned no data for " + ", ".join(tickers))
+        return frame
+
+
+class ChartProvider(MarketDataProvider):
+    """Downloads bars from the Yahoo chart API over keep-alive connections.
+
+    Every ticker is one request. The requests of all downloads share a
+    httppool.ConnectionPool on one event loop, running on a background thread
+    for the lifetime of the provider, so they overlap with each other and the
+    connections stay open between downloads, e.g. across --watch refreshes.
+    stream() yields tickers as soon as their responses are parsed.
+    """
+
+    name = "chart"
+    streams = True
+
+    DEFAULT_URL = "https://query1.finance.yahoo.com"
+    DEFAULT_CONNECTIONS = 8
+
+    def __init__(self, url=None, connections=DEFAULT_CONNECTIONS):
+        self.url = url or self.DEFAULT_URL
+        self.connections = connections
+        self.loop = None
+        self.pool = None
+        self.lock = threading.Lock()
+        return
+
+    # a mock server's bars are not Yahoo's
+    def cache_namespace(self):
+        if self.url == self.DEFAULT_URL:
+            return self.name
+        return self.name + "-" + hashlib.sha1(self.url.encode()).hexdigest()[:12]
+
+    # asyncio takes tens of milliseconds to import, which only the chart
+    # provider should pay for
+    def start_loop(self):
+        import asyncio
+        import httppool
+
+        with self.lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, daemon=True).start()
+                self.pool = httppool.ConnectionPool(self.url, self.connections)
+                self.loop = loop
+        return self.loop
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.pool.close)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop = None
+        return
+
+    def download(self, tickers, interval, period=None, start=None):
+        frames = {}
+        for batch in self.stream(tickers, interval, period=period, start=start):
+            frames.update(batch)
+        return cache.combine_tickers(
+            {ticker: frames[ticker] for ticker in tickers if ticker in frames}
+        )
+
+    def stream(self, tickers, interval, period=None, start=None):
+        import asyncio
+
+        tickers = list(tickers)
+        if len(tickers) == 0:
+            return
+        arrived = queue.Queue()
+        loop = self.start_loop()
+        params = self.params(interval, period, start)
+        for ticker in tickers:
+            asyncio.run_coroutine_threadsafe(
+                self.download_ticker(ticker, params, arrived), loop
+            )
+
+        # hand out everything that arrived while the last batch was processed
+        deadline = time.monotonic() + self.deadline if self.deadline else None
+        failed = {}  # ticker: error, for the ones that may work another time
+        remaining = len(tickers)
+        while remaining > 0:
+            timeout = max(deadline - time.monotonic(), 0) if deadline else None
+            try:
+                ready = [arrived.get(timeout=timeout)]
+            except queue.Empty:
+                warnings.warn(
+                    "Downloading {} of {} tickers did not finish in time, "
+                    "continuing without them.".format(remaining, len(tickers))
+                )
+                break
+            while True:
+                try:
+                    ready.append(arrived.get_nowait())
+                except queue.Empty:
+                    break
+            remaining -= len(ready)
+
+            frames = {}
+            for ticker, frame, error in ready:
+                if error is not None:
+                    # unknown tickers are not a sign of being offline
+                    if getattr(error, "transient", True):
+                        failed[ticker] = error
+                elif frame is not None:
+                    frames[ticker] = frame
+            if len(frames) > 0:
+                yield frames
+
+        if len(failed) == len(tickers):
+            raise DownloadError(
+                "Downloading every ticker failed: "
+                + "; ".join(
+                    "{}: {}".format(ticker, error) for ticker, error in failed.items()
+                )
+            )
+        return
+
+    @staticmethod
+    def params(interval, period=None, start=None):
+        params = {"interval": interval, "includePrePost": "false"}
+        if start is not None:
+            params["period1"] = int(start.timestamp())
+            params["period2"] = int(time.time())
+        else:
+            params["range"] = period or "1d"
+        return params
+
+    async def download_ticker(self, ticker, params, arrived):
+        import asyncio
+        import httppool
+
+        attempt = 0
+        while True:
+            try:
+                body = await self.pool.get("/v8/finance/chart/" + ticker, params)
+                arrived.put((ticker, parse_chart(body), None))
+                return
+            except (OSError, asyncio.TimeoutError, httppool.HTTPError) as e:
+                # unknown tickers and bad requests would only fail again
+                transient = getattr(e, "transient", True)
+                if not transient or attempt >= self.retries:
+                    arrived.put((ticker, None, e))
+                    return
+                await asyncio.sleep(self.backoff * 2**attempt)
+                attempt += 1
+            except Exception as e:
+                arrived.put((ticker, None, e))  # a malformed response, not retried
+                return
+
+
+# a chart API response as a frame of OHLCV bars, None when it holds no bars
+def parse_chart(body):
+    import pandas as pd
+
+    chart = json.loads(body)["chart"]
+    if chart.get("error"):
+        raise DownloadError(chart["error"].get("description", str(chart["error"])))
+    result = chart["result"][0]
+    timestamps = result.get("timestamp")
+    if not timestamps:
+        return None
+
+    # one block for all fields, missing values (null) become NaN
+    quote = result["indicators"]["quote"][0]
+    fields = ["Close", "High", "Low", "Open", "Volume"]
+    block = np.array([quote[field.lower()] for field in fields], dtype=float).T
+    traded = ~np.isnan(block).all(axis=1)
+    return pd.DataFrame(
+        block[traded],
+        index=pd.to_datetime(np.asarray(timestamps)[traded], unit="s", utc=True),
+        columns=fields,
+    )
+
+
+class ReplayProvider(MarketDataProvider):
+    """Replays bars recorded to csv files, one file per ticker and interval.
+
+    Files are named <ticker>_<interval>.csv (or just <ticker>.csv to serve every
+    interval) and hold a timestamp column followed by the OHLCV fields, which is
+    what record_market_data writes.
+    """
+
+    name = "replay"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.frames = {}
+        return
+
+    # every recording gets entries of its own
+    def cache_namespace(self):
+        directory = os.path.abspath(self.directory).encode()
+        return self.name + "-" + hashlib.sha1(directory).hexdigest()[:12]
+
+    def path(self, ticker, interval):
+        path = os.path.join(self.directory, ticker + "_" + interval + ".csv")
+        if not os.path.exists(path):
+            path = os.path.join(self.directory, ticker + ".csv")
+        return path
+
+    def load(self, ticker, interval):
+        import pandas as pd
+
+        key = (ticker, interval)
+        if key not in self.frames:
+            try:
+                frame = pd.read_csv(self.path(ticker, interval), index_col=0)
+            except FileNotFoundError:
+                frame = None
+            else:
+                frame.index = pd.to_datetime(frame.index, utc=True)
+                frame = frame.sort_index()
+            self.frames[key] = frame
+        return self.frames[key]
+
+    def download(self, tickers, interval, period=None, start=None):
+        import pandas as pd
+
+        frames = {}
+        for ticker in tickers:
+            frame = self.load(ticker, interval)
+            if frame is None:
+                continue
+            if start is not None:
+                start = pd.Timestamp(start)
+                if start.tzinfo is None:
+                    start = start.tz_localize("UTC")
+                frame = frame[frame.index >= start]
+            elif period is not None:
+                frame = cache.trim_to_period(frame, period)
+            frames[ticker] = frame
+        return cache.combine_tickers(frames)
+
+
+# write a download out as replay files, so the same run can be repeated offline
+def record_market_data(market_data, tickers, interval, directory):
+    os.makedirs(directory, exist_ok=True)
+    for ticker, frame in cache.split_by_ticker(market_data, tickers).items():
+        frame.to_csv(
+            os.path.join(directory, ticker + "_" + interval + ".csv"),
+            index_label="Datetime",
+        )
+    return
+
+
+def from_args(args):
+    name = getattr(args, "provider", None) or YahooProvider.name
+    if name == YahooProvider.name:
+        provider = YahooProvider()
+    elif name == ChartProvider.name:
+        provider = ChartProvider(getattr(args, "chart_url", None))
+    elif name == ReplayProvider.name:
+        replay_dir = getattr(args, "replay_dir", None)
+        if replay_dir is None:
+            raise ValueError("The replay provider needs a directory of recorded data.")
+        provider = ReplayProvider(replay_dir)
+    else:
+        raise ValueError("Unknown market data provider '" + str(name) + "'.")
+
+    for option in ["batch_size", "workers", "retries", "deadline"]:
+        value = getattr(args, "download_" + option, None)
+        if value is not None:
+            if value < (0 if option == "retries" else 1):
+                raise ValueError(
+                    "--download-" + option.replace("_", "-") + " is out of range."
+                )
+            setattr(provider, option, value)
+    return provider
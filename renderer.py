@@ -1,9 +1,16 @@
 import io
+import re
+import sys
+import operator
 import utils
+import profiler
 import portfolio
 
+import numpy as np
+
 from colorama import Fore, Style, Back
-from dataclasses import dataclass
+from itertools import repeat
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import List, Callable
 
@@ -22,10 +29,26 @@ class ColumnFormatter:
     # function that takes a thing and produces a printable string for it
     generator: Callable[[object], CellData] = lambda v: CellData(str(v))
 
+    # optional batch version of generator, takes a list of things and returns
+    # the strings and colors of the whole column
+    batch: Callable[[list], tuple] = None
+
+    # the raw value of a thing the column is sorted and filtered by
+    key: Callable[[object], object] = None
+
+    # whether key gives numbers, only those columns can be filtered
+    numeric: bool = True
+
     def generate_string(self, input) -> str:
         cell_data = self.generator(input)
         return cell_data.value
 
+    def generate_column(self, inputs) -> tuple:
+        if self.batch is not None:
+            return self.batch(inputs)
+        cells = [self.generator(input) for input in inputs]
+        return [cell.value for cell in cells], [cell.color for cell in cells]
+
 
 def format_number(value) -> str:
     return str(abs(utils.round_value(value, "math", 2)))
@@ -39,89 +62,381 @@ def format_gl(value: float, is_currency: bool = True) -> str:
     return change_symbol + format_number(value)
 
 
-_stock_column_formatters = {
-    "Ticker": ColumnFormatter("Ticker", 9, lambda stock: CellData(stock.symbol)),
-    "Current Price": ColumnFormatter(
-        "Last", 12, lambda stock: CellData(format_number(stock.curr_value))
-    ),
-    "Daily Change Amount": ColumnFormatter(
-        "Chg",
-        12,
-        lambda stock: CellData(
-            format_gl(stock.change_amount),
-            Fore.GREEN if stock.change_amount >= 0 else Fore.RED,
-        ),
-    ),
-    "Daily Change Percentage": ColumnFormatter(
-        "Chg%",
-        10,
-        lambda stock: CellData(
-            format_gl(stock.change_percentage, False) + "%",
-            Fore.GREEN if stock.change_percentage >= 0 else Fore.RED,
+# how str() ends a float rounded to two decimals, by its cents
+_cents_suffixes = [
+    "." + (str(c // 10) if c % 10 == 0 else str(c).zfill(2)) for c in range(100)
+]
+
+
+# format_number for a whole column, round_value returns 0 for zero and NaN
+# the column is rounded to whole cents in one NumPy call and the text is built
+# from the cents instead of printing every float. Values that call for the
+# exact rounding of format_number (huge values, integers, and python floats
+# that sit on a half cent) are still formatted one by one. A column can mix
+# python and numpy floats (e.g. after update_price), so the rounding is
+# picked per value
+def format_numbers(values) -> list:
+    count = len(values)
+    kinds = set(map(type, values))
+    if len(kinds) == 1:
+        kind = kinds.pop()
+        numpy_floats = issubclass(kind, np.floating)
+        floats = numpy_floats or issubclass(kind, float)
+    else:
+        numpy_floats = np.fromiter(
+            map(isinstance, values, repeat(np.floating)), dtype=bool, count=count
+        )
+        floats = numpy_floats | np.fromiter(
+            map(isinstance, values, repeat(float)), dtype=bool, count=count
+        )
+    if not np.any(floats):
+        return [format_number(v) for v in values]
+
+    array = np.fromiter(values, dtype=float, count=count)
+    shown = (array == array) & (array != 0)
+    scaled = np.where(shown, array, 0) * 100
+    cents = np.rint(scaled)
+    exact = floats & (np.abs(cents) < 1e15)
+    if not np.all(numpy_floats):
+        # round() of a python float rounds its exact binary value, np.rint the
+        # product, they only disagree right at half a cent
+        half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5)
+        exact &= numpy_floats | (half > 1e-9 + np.abs(scaled) * 1e-15)
+    cents = np.abs(np.where(exact, cents, 0)).astype(np.int64)
+
+    dollars = map(str, (cents // 100).tolist())
+    suffixes = [_cents_suffixes[c] for c in (cents % 100).tolist()]
+    numbers = [
+        d + c if s else "0" for d, c, s in zip(dollars, suffixes, shown.tolist())
+    ]
+    for i in np.flatnonzero(shown & ~exact).tolist():
+        numbers[i] = format_number(values[i])
+    return numbers
+
+
+def number_column(header, width, attribute) -> ColumnFormatter:
+    getter = operator.attrgetter(attribute)
+    return ColumnFormatter(
+        header,
+        width,
+        lambda obj: CellData(format_number(getter(obj))),
+        lambda objs: (format_numbers(list(map(getter, objs))), None),
+        getter,
+    )
+
+
+# gains and losses, green when positive and red when negative
+def gl_column(header, width, attribute, is_currency=True, suffix="") -> ColumnFormatter:
+    getter = operator.attrgetter(attribute)
+    plus, minus = ("+$", "-$") if is_currency else ("+", "-")
+
+    def batch(objs):
+        values = list(map(getter, objs))
+        positive = (np.fromiter(values, dtype=float, count=len(values)) >= 0).tolist()
+        numbers = format_numbers(values)
+        return (
+            [(plus if p else minus) + n + suffix for p, n in zip(positive, numbers)],
+            [Fore.GREEN if p else Fore.RED for p in positive],
+        )
+
+    return ColumnFormatter(
+        header,
+        width,
+        lambda obj: CellData(
+            format_gl(getter(obj), is_currency) + suffix,
+            Fore.GREEN if getter(obj) >= 0 else Fore.RED,
         ),
+        batch,
+        getter,
+    )
+
+
+_stock_column_formatters = {
+    "Ticker": ColumnFormatter(
+        "Ticker",
+        9,
+        lambda stock: CellData(stock.symbol),
+        lambda stocks: ([stock.symbol for stock in stocks], None),
+        operator.attrgetter("symbol"),
+        numeric=False,
     ),
-    "Low": ColumnFormatter("Low", 12, lambda stock: CellData(format_number(stock.low))),
-    "High": ColumnFormatter(
-        "High", 12, lambda stock: CellData(format_number(stock.high))
-    ),
-    "Daily Average Price": ColumnFormatter(
-        "Avg", 12, lambda stock: CellData(format_number(stock.average))
-    ),
+    "Current Price": number_column("Last", 12, "curr_value"),
+    "Daily Change Amount": gl_column("Chg", 12, "change_amount"),
+    "Daily Change Percentage": gl_column("Chg%", 10, "change_percentage", False, "%"),
+    "Low": number_column("Low", 12, "low"),
+    "High": number_column("High", 12, "high"),
+    "Daily Average Price": number_column("Avg", 12, "average"),
 }
 
 _portfolio_column_formatters = {
-    "Stocks Owned": ColumnFormatter(
-        "Owned", 9, lambda entry: CellData(format_number(entry.count))
-    ),
-    "Gains per Share": ColumnFormatter(
-        "G/L/S",
-        12,
-        lambda entry: CellData(
-            format_gl(entry.gains_per_share),
-            Fore.GREEN if entry.gains_per_share >= 0 else Fore.RED,
-        ),
-    ),
-    "Current Market Value": ColumnFormatter(
-        "Mkt V", 12, lambda entry: CellData(format_number(entry.holding_market_value))
-    ),
-    "Average Buy Price": ColumnFormatter(
-        "Buy", 12, lambda entry: CellData(format_number(entry.average_cost))
-    ),
-    "Total Share Gains": ColumnFormatter(
-        "G/L/T",
-        12,
-        lambda entry: CellData(
-            format_gl(entry.gains), Fore.GREEN if entry.gains >= 0 else Fore.RED
-        ),
-    ),
-    "Total Share Cost": ColumnFormatter(
-        "Cost", 12, lambda entry: CellData(format_number(entry.cost_basis))
-    ),
+    "Stocks Owned": number_column("Owned", 9, "count"),
+    "Gains per Share": gl_column("G/L/S", 12, "gains_per_share"),
+    "Current Market Value": number_column("Mkt V", 12, "holding_market_value"),
+    "Average Buy Price": number_column("Buy", 12, "average_cost"),
+    "Total Share Gains": gl_column("G/L/T", 12, "gains"),
+    "Total Share Cost": number_column("Cost", 12, "cost_basis"),
 }
 
 
+# a table column by the name in its header, e.g. "Chg%" or "mkt v"
+def find_column(name) -> tuple:
+    for formatters, is_stock in (
+        (_stock_column_formatters, True),
+        (_portfolio_column_formatters, False),
+    ):
+        for formatter in formatters.values():
+            if formatter.header.lower() == name.strip().lower():
+                return formatter, is_stock
+
+    headers = [
+        formatter.header
+        for formatters in (_stock_column_formatters, _portfolio_column_formatters)
+        for formatter in formatters.values()
+    ]
+    raise ValueError(
+        'Unknown table column "{}", expected one of: {}'.format(
+            name, ", ".join(headers)
+        )
+    )
+
+
+FILTER_OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+_filter_pattern = re.compile(r"^(.+?)\s*(<=|>=|==|!=|<|>)\s*(\S+)$")
+
+
+@dataclass
+class TableFilter:
+    """A condition on a numeric column, e.g. "G/L/T < -1000"."""
+
+    column: str
+    op: str
+    value: float
+
+    @classmethod
+    def parse(cls, text):
+        match = _filter_pattern.match(text.strip())
+        if match is None:
+            raise ValueError(
+                'Invalid filter "{}", expected COLUMN OP VALUE with OP one of: {}'.format(
+                    text, " ".join(FILTER_OPERATORS)
+                )
+            )
+        column, op, value = match.groups()
+        try:
+            return cls(column.strip(), op, float(value))
+        except ValueError:
+            raise ValueError(
+                'Invalid filter "{}", {} is not a number'.format(text, value)
+            )
+
+    def mask(self, index):
+        keys = index.keys(self.column)
+        if keys.dtype.kind != "f":
+            raise ValueError('The "{}" column cannot be filtered'.format(self.column))
+        with np.errstate(invalid="ignore"):
+            return FILTER_OPERATORS[self.op](keys, self.value)
+
+
+class TableIndex:
+    """Sort keys of the table columns as arrays over the portfolio entries.
+
+    A column's keys are extracted the first time a view sorts or filters by
+    it and then reused until the portfolio changes, text columns are kept as
+    their rank so they sort like numbers.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.stocks = [entry.stock for entry in entries]
+        self.columns = {}
+        return
+
+    def keys(self, name):
+        formatter, is_stock = find_column(name)
+        if formatter.header not in self.columns:
+            values = list(map(formatter.key, self.stocks if is_stock else self.entries))
+            if len(values) > 0 and isinstance(values[0], str):
+                _, keys = np.unique(values, return_inverse=True)
+                keys = keys.astype(np.int64)
+            else:
+                keys = np.fromiter(values, dtype=float, count=len(values))
+            self.columns[formatter.header] = keys
+        return self.columns[formatter.header]
+
+
+@dataclass
+class TableView:
+    """Which rows of the table are shown, and in what order.
+
+    Rows are filtered, sorted by one column (descending when its name starts
+    with "-") and cut into pages of limit rows. Only the rows up to the end of
+    the requested page are ordered, picked with np.partition, so showing
+    the top 20 of thousands of positions never sorts all of them.
+    """
+
+    sort: str = None
+    filters: List[TableFilter] = field(default_factory=list)
+    limit: int = None
+    page: int = 1
+
+    def __post_init__(self):
+        if self.sort is not None:
+            find_column(self.sort.lstrip("-"))
+        for table_filter in self.filters:
+            formatter, _ = find_column(table_filter.column)
+            if not formatter.numeric:
+                raise ValueError(
+                    'The "{}" column cannot be filtered'.format(table_filter.column)
+                )
+        if self.limit is not None and self.limit < 1:
+            raise ValueError("The table limit must be at least 1")
+        if self.page < 1:
+            raise ValueError("The table page must be at least 1")
+        return
+
+    # does the view show anything but every entry in portfolio order
+    def active(self):
+        return self.sort is not None or len(self.filters) > 0 or self.limit is not None
+
+    # positions of the shown entries, in display order, and how many entries
+    # passed the filters
+    def select(self, index) -> tuple:
+        rows = np.arange(len(index.entries))
+        for table_filter in self.filters:
+            rows = rows[table_filter.mask(index)[rows]]
+        total = len(rows)
+
+        start = (self.page - 1) * self.limit if self.limit is not None else 0
+        end = start + self.limit if self.limit is not None else total
+        if self.sort is not None and start < total:
+            keys = index.keys(self.sort.lstrip("-"))[rows]
+            if keys.dtype.kind == "f":
+                # missing values go last either way
+                keys = np.where(
+                    np.isnan(keys), np.inf, -keys if self.sort.startswith("-") else keys
+                )
+            elif self.sort.startswith("-"):
+                keys = -keys
+
+            if end < total:
+                # everything up to the key of the last shown row, ties included
+                last = np.partition(keys, end - 1)[end - 1]
+                first = keys <= last
+                rows, keys = rows[first], keys[first]
+            # ties keep portfolio order
+            rows = rows[np.lexsort((rows, keys))]
+        return rows[start:end], total
+
+
+class TableTemplate:
+    """The selected table columns compiled into a single row format string.
+
+    Columns are resolved once, every column is generated for all entries in
+    one batch, and each row is then a single str.format call. Columns whose
+    cells are never colored get their color baked into the template.
+    """
+
+    def __init__(self, columns):
+        self.columns = []
+        for col in columns:
+            formatter = _stock_column_formatters.get(col)
+            is_stock = formatter is not None
+            if not is_stock:
+                formatter = _portfolio_column_formatters.get(col)
+            self.columns.append((formatter, is_stock))
+
+        self.heading = "\t" + "".join(
+            ("{:" + str(formatter.width) + "}").format(formatter.header)
+            for formatter, _ in self.columns
+        )
+        self.divider = "\t" + "".join(
+            "-" * formatter.width for formatter, _ in self.columns
+        )
+        return
+
+    # the row template, once it is known which columns have colored cells
+    def compile(self, colored):
+        template = "\t{}"
+        for (formatter, _), has_colors in zip(self.columns, colored):
+            cell = "{:" + str(formatter.width) + "}"
+            template += ("{}" if has_colors else Fore.RESET) + cell
+        return template + Style.RESET_ALL
+
+    def rows(self, entries) -> list:
+        profiler.count("rows", len(entries))
+        stocks = [entry.stock for entry in entries]
+        cells = []
+        colored = []
+        for formatter, is_stock in self.columns:
+            values, colors = formatter.generate_column(stocks if is_stock else entries)
+            colored.append(colors is not None)
+            if colors is not None:
+                cells.append(colors)
+            cells.append(values)
+
+        template = self.compile(colored)
+        highlights = [Back.LIGHTBLACK_EX, Back.RESET] * (len(entries) // 2 + 1)
+        return [template.format(*row) for row in zip(highlights, *cells)]
+
+
 class Renderer(metaclass=utils.Singleton):
     def __init__(self, rounding: str, portfolio: portfolio.Portfolio, *args, **kwargs):
         self.mode = rounding
         self.portfolio = portfolio
+        self.view = kwargs.get("view") or TableView()
+        self.index = None
+        self.index_version = None
         return
 
-    def render(self):
-        print()
-        for graph in self.portfolio.graphs:
-            graph.draw()
-
-        self.print_new_table()
-        print()
+    # the sort keys of the current portfolio, rebuilt only after it changed
+    def table_index(self):
+        if self.index is None or self.index_version != self.portfolio.version:
+            self.index = TableIndex(list(self.portfolio.stocks.values()))
+            self.index_version = self.portfolio.version
+        return self.index
+
+    # the whole frame is built in memory and written to stream at once, so a
+    # refresh is a single write instead of one per line
+    def render(self, stream=None, clear=False):
+        stream = stream if stream is not None else sys.stdout
+        stream.write(self.frame(clear))
+        stream.flush()
         return
 
-    def print_gains(self, format_str, gain, timespan):
+    # the text of one frame, optionally only its graphs or only its table
+    def frame(self, clear=False, graphs=True, table=True) -> str:
+        out = io.StringIO()
+        if clear:
+            out.write("\033[H\033[2J")
+        out.write("\n")
+        if graphs:
+            for graph in self.portfolio.graphs:
+                out.write(graph() + "\n")
+
+        if table:
+            self.print_new_table(out=out)
+            out.write("\n")
+        return out.getvalue()
+
+    def print_gains(self, format_str, gain, timespan, out=None):
         positive_gain = gain >= 0
         gain_symbol = "+" if positive_gain else "-"
         gain_verboge = "Gained" if positive_gain else "Lost"
 
-        print("{:25}".format("Value " + gain_verboge + " " + timespan + ": "), end="")
-        print(Fore.GREEN if positive_gain else Fore.RED, end="")
+        print(
+            "{:25}".format("Value " + gain_verboge + " " + timespan + ": "),
+            end="",
+            file=out,
+        )
+        print(Fore.GREEN if positive_gain else Fore.RED, end="", file=out)
 
         # This prevents a runtime warning by making sure we are never dividing by zero
         if self.portfolio.cost_value == 0:
@@ -134,81 +449,79 @@ class Renderer(metaclass=utils.Singleton):
             )
             + format_str.format(
                 gain_symbol + str(abs(utils.round_value(gain_val, self.mode, 2))) + "%"
-            )
+            ),
+            file=out,
         )
-        print(Style.RESET_ALL, end="")
+        print(Style.RESET_ALL, end="", file=out)
         return
 
-    def print_overall_summary(self):
+    def print_overall_summary(self, out=None):
         print(
             "\n"
             + "{:25}".format("Current Time: ")
-            + "{:13}".format(datetime.now().strftime("%A %b %d, %Y - %I:%M:%S %p"))
+            + "{:13}".format(datetime.now().strftime("%A %b %d, %Y - %I:%M:%S %p")),
+            file=out,
         )
         print(
             "{:25}".format("Total Cost: ")
-            + "{:13}".format("$" + format_number(self.portfolio.cost_value))
+            + "{:13}".format("$" + format_number(self.portfolio.cost_value)),
+            file=out,
         )
         print(
             "{:25}".format("Total Value: ")
-            + "{:13}".format("$" + format_number(self.portfolio.market_value))
+            + "{:13}".format("$" + format_number(self.portfolio.market_value)),
+            file=out,
         )
 
         # print daily value
         value_gained_day = (
             self.portfolio.market_value - self.portfolio.open_market_value
         )
-        self.print_gains("{:13}", value_gained_day, "Today")
+        self.print_gains("{:13}", value_gained_day, "Today", out)
 
         # print overall value
         value_gained_all = self.portfolio.market_value - self.portfolio.cost_value
-        self.print_gains("{:13}", value_gained_all, "Overall")
+        self.print_gains("{:13}", value_gained_all, "Overall", out)
+
+        # only fifo, lifo and average cost bases split out the realized gains
+        if self.portfolio.realized_value != 0:
+            self.print_gains("{:13}", self.portfolio.realized_value, "Realized", out)
         return
 
     def print_new_table(
         self,
         stock_cols=list(_stock_column_formatters.keys()),
         portfolio_cols=list(_portfolio_column_formatters.keys()),
+        out=None,
     ):
-        # print heading
-        print("\nPortfolio Summary:\n")
-
-        # print the heading
-        heading = "\t"
-        divider = "\t"
-        for col in stock_cols + portfolio_cols:
-            column = _stock_column_formatters.get(
-                col
-            ) or _portfolio_column_formatters.get(col)
-            heading += ("{:" + str(column.width) + "}").format(column.header)
-            divider += "-" * column.width
-        print(heading + "\n" + divider)
-
-        # now print every portfolio entry
-        for i, entry in enumerate(self.portfolio.stocks.values()):
-            stock = entry.stock
-            line = "\t"
-
-            highlight_color = Back.LIGHTBLACK_EX if i % 2 == 0 else Back.RESET
-            line += highlight_color
-
-            for i, col in enumerate(stock_cols + portfolio_cols):
-                col_formatter = _stock_column_formatters.get(col)
-
-                is_stock = col_formatter != None
-                if not is_stock:
-                    col_formatter = _portfolio_column_formatters.get(col)
-
-                cell_data = col_formatter.generator(stock if is_stock else entry)
-                line += cell_data.color + (
-                    "{:" + str(col_formatter.width) + "}"
-                ).format(cell_data.value)
-
-            # print the entry
-            line += Style.RESET_ALL
-            print(line)
+        table = TableTemplate(stock_cols + portfolio_cols)
+        lines = ["\nPortfolio Summary:\n", table.heading, table.divider]
+        if self.view.active():
+            index = self.table_index()
+            rows, total = self.view.select(index)
+            lines += table.rows([index.entries[row] for row in rows.tolist()])
+            lines.append(self.page_footer(len(rows), total))
+        else:
+            lines += table.rows(list(self.portfolio.stocks.values()))
 
         # TODO: print totals line
 
-        self.print_overall_summary()
+        print("\n".join(lines), file=out)
+        self.print_overall_summary(out)
         return
+
+    def page_footer(self, shown, total):
+        if total == 0:
+            return "\nNo positions match the filters"
+        limit = self.view.limit or total
+        pages = -(-total // limit)  # ceiling division
+        if shown == 0:
+            return "\nNo positions on page {} of {}".format(self.view.page, pages)
+
+        first = (self.view.page - 1) * limit + 1
+        footer = "\nShowing positions {}-{} of {}".format(
+            first, first + shown - 1, total
+        )
+        if self.view.limit is not None:
+            footer += " (page {} of {})".format(self.view.page, pages)
+        return footer
@@ -0,0 +1,76 @@
+import numpy as np
+
+# a pause longer than this many bar intervals is treated as the market being closed
+GAP_FACTOR = 2
+
+NS_PER_SECOND = 10**9
+NS_PER_DAY = 86400 * NS_PER_SECOND
+
+
+class SessionCalendar:
+    """The trading sessions covered by a set of bar timestamps.
+
+    Sessions are runs of bars without a pause longer than GAP_FACTOR bar
+    intervals. Laid end to end, one bar interval apart, they form a continuous
+    x axis in seconds on which nights, weekends and holidays take no space.
+    Timestamps are UTC datetime64 values, and all conversions work on whole
+    arrays at once.
+    """
+
+    def __init__(self, starts, ends, step):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.lengths = np.asarray(ends, dtype=np.int64) - self.starts
+        self.step = int(step)
+
+        # x position (in ns) where each session begins
+        self.offsets = np.zeros(len(self.starts), dtype=np.int64)
+        np.cumsum(self.lengths[:-1] + self.step, out=self.offsets[1:])
+        return
+
+    # the calendar of the union of several timestamp arrays
+    @classmethod
+    def from_times(cls, *series):
+        times = np.unique(
+            np.concatenate(
+                [np.asarray(s, dtype="datetime64[ns]").view(np.int64) for s in series]
+            )
+        )
+        if len(times) < 2:
+            # a lone bar still needs some width to be drawn on
+            return cls(times, times, 60 * NS_PER_SECOND)
+
+        gaps = np.diff(times)
+        step = int(np.median(gaps))
+        breaks = np.flatnonzero(gaps > GAP_FACTOR * step)
+        starts = np.concatenate((times[:1], times[breaks + 1]))
+        ends = np.concatenate((times[breaks], times[-1:]))
+        return cls(starts, ends, step)
+
+    # x positions (in seconds) of an array of timestamps, a time outside every
+    # session is pinned to the end of the session before it
+    def to_x(self, times):
+        times = np.asarray(times, dtype="datetime64[ns]").view(np.int64)
+        session = np.maximum(np.searchsorted(self.starts, times, side="right") - 1, 0)
+        into = np.minimum(times - self.starts[session], self.lengths[session])
+        return (self.offsets[session] + into) / NS_PER_SECOND
+
+    # the timestamps at an array of x positions
+    def to_times(self, x):
+        x = np.round(np.asarray(x, dtype=float) * NS_PER_SECOND).astype(np.int64)
+        session = np.maximum(np.searchsorted(self.offsets, x, side="right") - 1, 0)
+        into = np.minimum(x - self.offsets[session], self.lengths[session])
+        return (self.starts[session] + into).astype("datetime64[ns]")
+
+    # width of the whole axis in seconds
+    def span(self):
+        if len(self.starts) == 0:
+            return 0.0
+        return (self.offsets[-1] + self.lengths[-1]) / NS_PER_SECOND
+
+    # strftime pattern short enough for a 9 character axis label
+    def label_format(self):
+        if self.step >= NS_PER_DAY:
+            return "%y-%m-%d"
+        if len(self.starts) > 1 or self.span() * NS_PER_SECOND > NS_PER_DAY:
+            return "%d %H:%M"
+        return "%H:%M"
@@ -0,0 +1,98 @@
+import os
+import pickle
+import hashlib
+import warnings
+import tempfile
+import contextlib
+
+# bump whenever Position, Ledger or the snapshot itself change shape, older
+# snapshots are then ignored
+SNAPSHOT_VERSION = 2
+
+
+def snapshot_path(config_path):
+    directory, name = os.path.split(os.path.abspath(config_path))
+    return os.path.join(directory, "." + name + ".snapshot")
+
+
+def file_digest(path):
+    digest = hashlib.blake2b()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# what a snapshot is keyed on, taken before the file is parsed so an edit made
+# while parsing can never be stored under the new contents
+def file_key(config_path):
+    try:
+        stat = os.stat(config_path)
+        return {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "digest": file_digest(config_path),
+        }
+    except OSError:
+        return None
+
+
+# the compiled positions of config_path, or None if the file changed since the
+# snapshot was written. An unchanged mtime and size is trusted without reading
+# the file at all, otherwise the content hash decides. The warnings compiling
+# the file raised (e.g. an invalid color) are raised again
+def load(config_path, cost_basis):
+    try:
+        stat = os.stat(config_path)
+        with open(snapshot_path(config_path), "rb") as fp:
+            snapshot = pickle.load(fp)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+    if (
+        not isinstance(snapshot, dict)
+        or snapshot.get("version") != SNAPSHOT_VERSION
+        or snapshot.get("cost_basis") != cost_basis
+    ):
+        return None
+
+    if snapshot["mtime"] != stat.st_mtime_ns or snapshot["size"] != stat.st_size:
+        # touched but possibly unchanged (e.g. checked out again), compare contents
+        key = file_key(config_path)
+        if key is None or key["digest"] != snapshot["digest"]:
+            return None
+        store(config_path, cost_basis, snapshot["positions"], key, snapshot["warnings"])
+
+    for message in snapshot["warnings"]:
+        warnings.warn(message)
+    return snapshot["positions"]
+
+
+# messages are the warnings compiling the positions raised, as strings
+def store(config_path, cost_basis, positions, key, messages=()):
+    if key is None:
+        return
+    snapshot = dict(key)
+    snapshot.update(
+        {
+            "version": SNAPSHOT_VERSION,
+            "cost_basis": cost_basis,
+            "positions": positions,
+            "warnings": list(messages),
+        }
+    )
+
+    path = snapshot_path(config_path)
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    except OSError:
+        return  # a snapshot is only an optimization, a read-only directory is fine
+
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            pickle.dump(snapshot, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+    return
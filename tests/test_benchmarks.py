@@ -0,0 +1,66 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"
+    )
+)
+import run
+
+
+def result(seconds, peak_bytes=2**20):
+    return {"seconds": seconds, "peak_bytes": peak_bytes}
+
+
+baseline = {
+    "populate/1000": result(0.100),
+    "gen_graphs_braille/1000": result(0.050),
+}
+
+
+class TestCompare:
+    def test_within_tolerance(self):
+        results = {
+            "populate/1000": result(0.124),
+            "gen_graphs_braille/1000": result(0.040),
+        }
+        assert run.compare(results, baseline) == []
+
+    def test_over_tolerance(self):
+        results = {
+            "populate/1000": result(0.130),
+            "gen_graphs_braille/1000": result(0.050, peak_bytes=2 * 2**20),
+        }
+        assert run.compare(results, baseline) == [
+            ("populate/1000", "seconds", 0.100, 0.130),
+            ("gen_graphs_braille/1000", "peak_bytes", 2**20, 2 * 2**20),
+        ]
+        assert run.compare(results, baseline, tolerance=1.0) == []
+
+    def test_noise_floor(self):
+        # twice as slow, but by less than a millisecond
+        tiny = {"parse/10": result(0.0002)}
+        assert run.compare({"parse/10": result(0.0004)}, tiny) == []
+
+    def test_case_missing_from_results(self):
+        # e.g. a run with --cases populate only
+        assert run.compare({"populate/1000": result(0.100)}, baseline) == []
+
+    def test_new_case(self):
+        results = {"gen_graphs_plotille/1000": result(10.0)}
+        assert run.compare(results, baseline) == []
+
+
+class TestBaseline:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "baseline.json")
+        assert run.load_baseline(path) is None
+        run.save_baseline(path, baseline)
+        assert run.load_baseline(path) == baseline
+
+
+class TestCases:
+    def test_both_graph_backends(self):
+        assert {"gen_graphs_plotille", "gen_graphs_braille"} <= set(run.CASES)
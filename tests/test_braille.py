@@ -0,0 +1,59 @@
+import os
+import sys
+import pytest
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import autocolors
+from braille import format_number
+from portfolio import Graph, Stock
+
+minutes = np.arange(500).astype("timedelta64[m]")
+times = np.datetime64("2021-03-01T14:30", "ns") + minutes
+
+
+def render(backend, stocks, colors, width=80, height=20):
+    graph = Graph(stocks, width, height, colors, timezone="UTC", backend=backend)
+    graph.gen_graph(autocolors.color_list)
+    return graph()
+
+
+def assert_same_as_plotille(stocks, colors, **kwargs):
+    expected = render("plotille", stocks, colors, **kwargs)
+    assert render("braille", stocks, colors, **kwargs) == expected
+
+
+class TestBrailleBackend:
+    walks = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, (5, 500)), axis=1)
+
+    @pytest.mark.parametrize("force_color", ["0", "1"])
+    def test_many_series(self, monkeypatch, force_color):
+        monkeypatch.setenv("FORCE_COLOR", force_color)
+        stocks = [Stock("T" + str(i), walk, times) for i, walk in enumerate(self.walks)]
+        assert_same_as_plotille(stocks, [None, "#FF0000", "lime", None, None])
+
+    def test_large_canvas(self, monkeypatch):
+        monkeypatch.setenv("FORCE_COLOR", "1")
+        stocks = [Stock("T" + str(i), walk, times) for i, walk in enumerate(self.walks)]
+        assert_same_as_plotille(stocks, [None] * 5, width=300, height=80)
+
+    def test_crossing_zero(self):
+        # the x axis through the origin is drawn too
+        stock = Stock("ZERO", np.sin(np.linspace(0, 20, 500)), times)
+        assert_same_as_plotille([stock], [None])
+
+    def test_without_timestamps(self):
+        assert_same_as_plotille([Stock("IDX", self.walks[0])], [None])
+
+
+class TestFormatNumber:
+    @pytest.mark.parametrize(
+        "value", [0, 3, -12, 100.5, 98.6134605, 0.123, -0.0004567, 1e-7, 12345678901.5]
+    )
+    def test_like_plotille(self, value):
+        from plotille._input_formatter import InputFormatter
+
+        formatter = InputFormatter()
+        for chars, left in [(10, False), (9, True)]:
+            expected = formatter.fmt(value, 1, left=left, chars=chars)
+            assert format_number(value, chars, left=left) == expected
@@ -0,0 +1,205 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cache
+import providers
+
+
+def make_frame(start, periods, freq="1min", base=100.0):
+    index = pd.date_range(start, periods=periods, freq=freq, tz="America/New_York")
+    values = [base + i for i in range(periods)]
+    return pd.DataFrame(
+        {"Open": values, "High": values, "Low": values, "Close": values}, index=index
+    )
+
+
+class TestMarketDataCache:
+    def test_store_and_load(self, tmp_path):
+        data_cache = cache.MarketDataCache(str(tmp_path))
+        frame = make_frame("2021-03-01 09:30", 5)
+        data_cache.store("AAPL", "1d", "1m", frame)
+
+        entry = data_cache.load("AAPL", "1d", "1m")
+        assert entry.fresh
+        assert entry.frame.equals(frame)
+        assert entry.last_timestamp() == frame.index[-1]
+
+    def test_load_missing(self, tmp_path):
+        data_cache = cache.MarketDataCache(str(tmp_path))
+        assert data_cache.load("AAPL", "1d", "1m") is None
+
+    def test_ttl_depends_on_interval(self, tmp_path):
+        data_cache = cache.MarketDataCache(str(tmp_path))
+        frame = make_frame("2021-03-01 09:30", 5)
+        data_cache.store("AAPL", "1d", "1m", frame)
+        data_cache.store("AAPL", "1mo", "1d", frame)
+
+        later = os.stat(data_cache.path("AAPL", "1d", "1m")).st_mtime + 120
+        assert not data_cache.load("AAPL", "1d", "1m", now=later).fresh
+        assert data_cache.load("AAPL", "1mo", "1d", now=later).fresh
+
+    def test_keys_are_separate(self, tmp_path):
+        data_cache = cache.MarketDataCache(str(tmp_path))
+        data_cache.store("AAPL", "1d", "1m", make_frame("2021-03-01 09:30", 5))
+        assert data_cache.load("AAPL", "5d", "1m") is None
+        assert data_cache.load("AAPL", "1d", "5m") is None
+        assert data_cache.load("TSLA", "1d", "1m") is None
+
+    def test_eviction(self, tmp_path):
+        data_cache = cache.MarketDataCache(str(tmp_path))
+        frame = make_frame("2021-03-01 09:30", 200)
+        data_cache.store("AAPL", "1d", "1m", frame)
+        os.utime(data_cache.path("AAPL", "1d", "1m"), (0, 0))
+
+        entry_size = os.path.getsize(data_cache.path("AAPL", "1d", "1m"))
+        data_cache.max_bytes = entry_size + entry_size // 2
+        data_cache.store("TSLA", "1d", "1m", frame)
+
+        assert data_cache.load("AAPL", "1d", "1m") is None
+        assert data_cache.load("TSLA", "1d", "1m") is not None
+        assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+
+class TestFrameHelpers:
+    def test_merge_tail(self):
+        cached = make_frame("2021-03-01 09:30", 5)
+        tail = make_frame("2021-03-01 09:34", 3, base=200.0)
+        merged = cache.merge_tail(cached, tail, "1d")
+
+        assert len(merged) == 7
+        # overlapping bars are replaced by the newer download
+        assert merged["Open"].iloc[4] == 200.0
+        assert merged.index.is_monotonic_increasing
+
+    def test_trim_to_period_days(self):
+        frame = pd.concat(
+            [make_frame("2021-03-01 09:30", 3), make_frame("2021-03-02 09:30", 3)]
+        )
+        assert len(cache.trim_to_period(frame, "1d")) == 3
+        assert len(cache.trim_to_period(frame, "5d")) == 6
+        assert len(cache.trim_to_period(frame, "max")) == 6
+
+    def test_split_and_combine(self):
+        frames = {
+            "AAPL": make_frame("2021-03-01 09:30", 3),
+            "TSLA": make_frame("2021-03-01 09:31", 3),
+        }
+        combined = cache.combine_tickers(frames)
+        assert list(combined["Open"].columns) == ["AAPL", "TSLA"]
+
+        split = cache.split_by_ticker(combined, ["AAPL", "TSLA"])
+        pd.testing.assert_frame_equal(split["AAPL"], frames["AAPL"], check_like=True)
+        pd.testing.assert_frame_equal(split["TSLA"], frames["TSLA"], check_like=True)
+
+
+class CacheArgs:
+    time_period = "1d"
+    time_interval = "1m"
+    no_cache = False
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+
+class TestCachedDownload:
+    def test_fresh_hit_skips_network(self, tmp_path, monkeypatch):
+        import portfolio
+
+        calls = []
+
+        def fake_fetch(self, stocks, time_interval, period=None, start=None):
+            calls.append((tuple(stocks), period, start))
+            return cache.combine_tickers(
+                {ticker: make_frame("2021-03-01 09:30", 5) for ticker in stocks}
+            )
+
+        monkeypatch.setattr(portfolio.Portfolio, "fetch", fake_fetch)
+        my_portfolio = portfolio.Portfolio()
+        args = CacheArgs(str(tmp_path))
+
+        first = my_portfolio.download_market_data(args, ["AAPL", "TSLA"])
+        second = my_portfolio.download_market_data(args, ["AAPL", "TSLA"])
+        assert len(calls) == 1
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_stale_hit_fetches_tail(self, tmp_path, monkeypatch):
+        import portfolio
+
+        calls = []
+
+        def fake_fetch(self, stocks, time_interval, period=None, start=None):
+            calls.append((tuple(stocks), period, start))
+            return cache.combine_tickers(
+                {
+                    ticker: make_frame("2021-03-01 09:34", 3, base=200.0)
+                    for ticker in stocks
+                }
+            )
+
+        monkeypatch.setattr(portfolio.Portfolio, "fetch", fake_fetch)
+        monkeypatch.setattr(
+            portfolio.Portfolio(), "provider", providers.YahooProvider()
+        )
+        data_cache = cache.MarketDataCache(str(tmp_path), namespace="yahoo")
+        cached = make_frame("2021-03-01 09:30", 5)
+        data_cache.store("AAPL", "1d", "1m", cached)
+        os.utime(data_cache.path("AAPL", "1d", "1m"), (0, 0))
+
+        market_data = portfolio.Portfolio().download_market_data(
+            CacheArgs(str(tmp_path)), ["AAPL"]
+        )
+        assert calls == [(("AAPL",), None, cached.index[-1])]
+        assert len(market_data["Open"]["AAPL"]) == 7
+        assert data_cache.load("AAPL", "1d", "1m").fresh
+
+    def test_providers_do_not_share_entries(self, tmp_path, monkeypatch):
+        import portfolio
+
+        calls = []
+
+        def fake_fetch(self, stocks, time_interval, period=None, start=None):
+            calls.append(self.provider.name)
+            return cache.combine_tickers(
+                {ticker: make_frame("2021-03-01 09:30", 5) for ticker in stocks}
+            )
+
+        monkeypatch.setattr(portfolio.Portfolio, "fetch", fake_fetch)
+        my_portfolio = portfolio.Portfolio()
+        args = CacheArgs(str(tmp_path))
+
+        # fixture bars of a replay run are never served to a live run
+        for provider in [
+            providers.ReplayProvider(str(tmp_path / "recording")),
+            providers.YahooProvider(),
+            providers.ReplayProvider(str(tmp_path / "other")),
+        ]:
+            monkeypatch.setattr(my_portfolio, "provider", provider)
+            my_portfolio.download_market_data(args, ["AAPL"])
+        assert calls == ["replay", "yahoo", "replay"]
+
+
+class TestNamespace:
+    def test_namespaced_paths(self, tmp_path):
+        plain = cache.MarketDataCache(str(tmp_path))
+        yahoo = cache.MarketDataCache(str(tmp_path), namespace="yahoo")
+        assert plain.path("AAPL", "1d", "1m") != yahoo.path("AAPL", "1d", "1m")
+
+        yahoo.store("AAPL", "1d", "1m", make_frame("2021-03-01 09:30", 5))
+        assert plain.load("AAPL", "1d", "1m") is None
+        assert (
+            cache.MarketDataCache(str(tmp_path), namespace="replay").load(
+                "AAPL", "1d", "1m"
+            )
+            is None
+        )
+
+    def test_provider_namespaces(self, tmp_path):
+        assert providers.YahooProvider().cache_namespace() == "yahoo"
+        assert providers.ChartProvider().cache_namespace() == "chart"
+        mock = providers.ChartProvider("http://127.0.0.1:8765")
+        assert mock.cache_namespace().startswith("chart-")
+        first = providers.ReplayProvider(str(tmp_path / "a")).cache_namespace()
+        second = providers.ReplayProvider(str(tmp_path / "b")).cache_namespace()
+        assert first.startswith("replay-") and first != second
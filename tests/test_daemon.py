@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import socket
+import pytest
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import daemon
+import renderer
+import portfolio
+
+
+@pytest.fixture
+def my_portfolio(monkeypatch):
+    my_portfolio = portfolio.Portfolio()
+    monkeypatch.setattr(my_portfolio, "stocks", {})
+    monkeypatch.setattr(my_portfolio, "graphs", [])
+    for attribute in ["open_market_value", "cost_value", "market_value"]:
+        monkeypatch.setattr(my_portfolio, attribute, 0)
+    my_portfolio.add_entry(portfolio.Stock("A", [2.0, 1.5]), 3, 1.25, None, False)
+    my_portfolio.add_entry(portfolio.Stock("B", [1.0, 4.0]), 1, 3.0, None, False)
+    return my_portfolio
+
+
+@pytest.fixture
+def server(my_portfolio):
+    refreshed = threading.Event()
+
+    def refresh(lock):
+        refreshed.set()
+
+    # unix socket paths are short, pytest's tmp_path can be too long
+    directory = tempfile.mkdtemp()
+    render_engine = renderer.Renderer("math", my_portfolio)
+    server = daemon.Daemon(
+        my_portfolio,
+        render_engine,
+        refresh,
+        0.01,
+        path=os.path.join(directory, "d.sock"),
+    )
+    server.listen()
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    server.refreshed_event = refreshed
+    yield server
+
+    server.shutdown()
+    thread.join()
+    os.rmdir(directory)
+
+
+class TestDaemon:
+    def test_table(self, server):
+        body = daemon.request(server.path, {"command": "table", "sort": "-chg"})
+        assert "Portfolio Summary:" in body
+        assert body.index("B  ") < body.index("A  ")
+
+    def test_records(self, server):
+        lines = daemon.request(server.path, {"command": "ndjson"}).splitlines()
+        assert [json.loads(line)["type"] for line in lines] == [
+            "position",
+            "position",
+            "summary",
+        ]
+
+    def test_status(self, server):
+        status = json.loads(daemon.request(server.path, {"command": "status"}))
+        assert status["positions"] == 2
+
+    @pytest.mark.parametrize(
+        "message",
+        [{"command": "nope"}, {"command": "table", "sort": "nope"}, {"limit": "x"}],
+    )
+    def test_errors(self, server, message):
+        with pytest.raises(OSError):
+            daemon.request(server.path, message)
+        # the daemon keeps serving after a bad request
+        assert daemon.request(server.path, {"command": "status"})
+
+    def test_responses_follow_the_portfolio(self, server, my_portfolio):
+        first = daemon.request(server.path, {"command": "json"})
+        assert daemon.request(server.path, {"command": "json"}) == first
+        my_portfolio.add_entry(portfolio.Stock("C", [1.0, 1.0]), 1, 1.0, None, False)
+        positions = json.loads(daemon.request(server.path, {"command": "json"}))
+        assert len(positions["positions"]) == 3
+
+    def test_refreshes(self, server):
+        assert server.refreshed_event.wait(5)
+
+    def test_one_daemon_per_socket(self, server, my_portfolio):
+        other = daemon.Daemon(my_portfolio, None, None, 1, path=server.path)
+        with pytest.raises(OSError):
+            other.listen()
+
+    def test_replaces_stale_socket(self, my_portfolio):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "d.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()  # the file stays, nobody listens
+
+        server = daemon.Daemon(my_portfolio, None, None, 1, path=path)
+        server.listen()
+        assert daemon.is_running(path)
+        server.server.server_close()
+        os.unlink(path)
+        os.rmdir(directory)
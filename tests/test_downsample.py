@@ -0,0 +1,43 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from downsample import minmax_indices
+
+
+class TestMinMaxIndices:
+
+    values = np.sin(np.linspace(0, 40, 5000)) + np.linspace(0, 1, 5000)
+    values[1234] = 10  # a single spike
+    values[4321] = -10  # and a single dip
+    keep = minmax_indices(values, 80)
+
+    def test_reduces_points(self):
+        assert len(self.keep) <= 2 * 80 + 2
+
+    def test_sorted_and_unique(self):
+        assert (np.diff(self.keep) > 0).all()
+
+    def test_keeps_extremes(self):
+        assert 1234 in self.keep
+        assert 4321 in self.keep
+
+    def test_keeps_end_points(self):
+        assert self.keep[0] == 0
+        assert self.keep[-1] == len(self.values) - 1
+
+    def test_bucket_extremes(self):
+        # 5000 points in 40 buckets of 125, each bucket's extremes survive
+        keep = set(minmax_indices(self.values, 40))
+        for start in range(0, 5000, 125):
+            bucket = self.values[start : start + 125]
+            assert start + bucket.argmax() in keep
+            assert start + bucket.argmin() in keep
+
+    def test_short_series_untouched(self):
+        assert list(minmax_indices([3, 1, 2], 80)) == [0, 1, 2]
+
+    def test_idempotent(self):
+        again = minmax_indices(self.values[self.keep], 80)
+        assert len(again) == len(self.keep)
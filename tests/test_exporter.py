@@ -0,0 +1,135 @@
+import io
+import os
+import sys
+import csv
+import json
+import pytest
+import subprocess
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import exporter
+import portfolio
+
+
+@pytest.fixture
+def my_portfolio(monkeypatch):
+    my_portfolio = portfolio.Portfolio()
+    monkeypatch.setattr(my_portfolio, "stocks", {})
+    monkeypatch.setattr(my_portfolio, "graphs", [])
+    for attribute in ["open_market_value", "cost_value", "market_value"]:
+        monkeypatch.setattr(my_portfolio, attribute, 0)
+    monkeypatch.setattr(my_portfolio, "realized_value", 0)
+    monkeypatch.setattr(my_portfolio, "curve", None)
+    times = np.array(["2021-03-01T14:30", "2021-03-01T14:31"], dtype="M8[ns]")
+    stock = portfolio.Stock("A", np.array([2.0, 1.5]), times)
+    my_portfolio.add_entry(stock, 3, 1.25, None, False)
+    stock = portfolio.Stock("B", np.array([1.0, 4.0]), times + np.timedelta64(1, "m"))
+    my_portfolio.add_entry(stock, 0.5, 3.0, None, False)
+    return my_portfolio
+
+
+def export(output_format, my_portfolio, frames=1, curve=False):
+    stream = io.StringIO()
+    engine = exporter.Exporter(output_format, my_portfolio, curve=curve)
+    for _ in range(frames):
+        engine.render(stream=stream)
+    return stream.getvalue()
+
+
+class TestExporter:
+    def test_ndjson(self, my_portfolio):
+        records = [
+            json.loads(line) for line in export("ndjson", my_portfolio).split("\n")[:-1]
+        ]
+        assert [record["type"] for record in records] == [
+            "position",
+            "position",
+            "summary",
+        ]
+        assert records[0]["symbol"] == "A"
+        assert records[0]["last"] == 1.5
+        assert records[0]["market_value"] == 4.5
+        assert records[1]["gains"] == 0.5
+        assert records[2]["total_value"] == 6.5
+        assert records[2]["total_cost"] == 5.25
+
+    def test_json(self, my_portfolio):
+        document = json.loads(export("json", my_portfolio))
+        assert [record["symbol"] for record in document["positions"]] == ["A", "B"]
+        assert document["summary"]["gained_overall"] == 1.25
+
+    def test_csv_header_once(self, my_portfolio):
+        rows = list(csv.DictReader(io.StringIO(export("csv", my_portfolio, frames=2))))
+        assert [row["type"] for row in rows] == ["position", "position", "summary"] * 2
+        assert rows[1]["owned"] == "0.5"
+        assert rows[2]["symbol"] == "" and rows[2]["total_value"] == "6.5"
+
+    def test_value_curve(self, my_portfolio):
+        records = [
+            json.loads(line)
+            for line in export("ndjson", my_portfolio, curve=True).split("\n")[:-1]
+        ]
+        assert [record["type"] for record in records[2:]] == [
+            "value_curve",
+            "value_curve",
+            "value_curve",
+            "summary",
+        ]
+        assert records[2] == {
+            "type": "value_curve",
+            "time": "2021-03-01T14:30:00Z",
+            "total_value": 6.5,
+        }
+        assert records[3]["total_value"] == 5.0
+        assert records[4]["total_value"] == records[5]["total_value"] == 6.5
+
+        document = json.loads(export("json", my_portfolio, curve=True))
+        assert document["value_curve"]["values"] == [6.5, 5.0, 6.5]
+        rows = list(
+            csv.DictReader(io.StringIO(export("csv", my_portfolio, curve=True)))
+        )
+        assert rows[4]["time"] == "2021-03-01T14:32:00Z"
+
+    def test_missing_values(self, my_portfolio):
+        my_portfolio.add_entry(
+            portfolio.Stock("N", [float("nan"), 2.0]), 1, 1.0, None, False
+        )
+        records = export("ndjson", my_portfolio).split("\n")
+        assert json.loads(records[2])["average"] is None
+
+    def test_infinite_values(self, my_portfolio):
+        # the change percentage is taken of the last price, here 0
+        stock = portfolio.Stock("Z", np.array([2.0, 0.0]))
+        my_portfolio.add_entry(stock, 1, 1.0, None, False)
+        records = export("ndjson", my_portfolio).split("\n")
+
+        def reject(constant):
+            raise ValueError(constant + " is not valid json")
+
+        records = [json.loads(line, parse_constant=reject) for line in records[:-1]]
+        record = next(record for record in records if record.get("symbol") == "Z")
+        assert record["change_percent"] is None
+        assert record["change"] == -2.0
+
+    def test_unknown_format(self, my_portfolio):
+        with pytest.raises(ValueError):
+            exporter.Exporter("xml", my_portfolio)
+
+    def test_no_terminal_imports(self):
+        # a headless run never loads the table or graph dependencies
+        script = (
+            "import sys, io, cliStocksTracker, exporter, portfolio\n"
+            "p = portfolio.Portfolio()\n"
+            "p.add_entry(portfolio.Stock('A', [1.0, 2.0]), 1, 1.0, None, False)\n"
+            "exporter.Exporter('ndjson', p).render(stream=io.StringIO())\n"
+            "print(sorted({'colorama', 'plotille', 'renderer'} & set(sys.modules)))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert result.stdout.strip() == "[]"
@@ -0,0 +1,94 @@
+import os
+import sys
+import pickle
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import autocolors
+from graphcache import GraphCache, graph_key
+from portfolio import Graph, Stock
+
+times = np.datetime64("2021-03-01T14:30", "ns") + np.arange(300).astype(
+    "timedelta64[m]"
+)
+
+
+def key(data, width=80):
+    return graph_key([("AAPL", data, times)], [None], None, width, 20, "UTC")
+
+
+class TestGraphKey:
+    def test_same_input(self):
+        assert key(np.arange(300.0)) == key(np.arange(300.0))
+
+    def test_data_changes_key(self):
+        moved = np.arange(300.0)
+        moved[-1] += 0.01
+        assert key(np.arange(300.0)) != key(moved)
+
+    def test_dimensions_change_key(self):
+        assert key(np.arange(300.0)) != key(np.arange(300.0), width=81)
+
+    def test_color_mode_changes_key(self, monkeypatch):
+        monkeypatch.delenv("NO_COLOR", raising=False)
+        monkeypatch.setenv("FORCE_COLOR", "1")
+        colored = key(np.arange(300.0))
+        monkeypatch.delenv("FORCE_COLOR")
+        monkeypatch.setenv("NO_COLOR", "1")
+        assert key(np.arange(300.0)) != colored
+
+    def test_y_range_changes_key(self):
+        def ranged(y_range):
+            return graph_key(
+                [("AAPL", np.arange(300.0), times)],
+                [None],
+                None,
+                80,
+                20,
+                "UTC",
+                y_range=y_range,
+            )
+
+        # a tick outside the plotted bars moves the limits, not the data
+        assert ranged((0.0, 299.0)) != ranged((0.0, 310.0))
+
+
+class TestGraphCache:
+    def test_lru_eviction(self):
+        graph_cache = GraphCache(max_entries=2)
+        graph_cache.put("a", "A")
+        graph_cache.put("b", "B")
+        graph_cache.get("a")
+        graph_cache.put("c", "C")
+        assert "a" in graph_cache and "c" in graph_cache
+        assert "b" not in graph_cache
+
+    def test_persistence(self, tmp_path):
+        path = str(tmp_path / "graphs.pickle")
+        graph_cache = GraphCache(path=path)
+        graph_cache.put("a", "A")
+        graph_cache.save()
+
+        loaded = GraphCache(path=path)
+        loaded.load()
+        assert loaded.get("a") == "A"
+
+    def test_other_version_ignored(self, tmp_path):
+        path = str(tmp_path / "graphs.pickle")
+        with open(path, "wb") as fp:
+            pickle.dump({"version": -1, "entries": [("a", "A")]}, fp)
+        graph_cache = GraphCache(path=path)
+        graph_cache.load()
+        assert len(graph_cache) == 0
+
+    def test_graph_hit(self, monkeypatch):
+        graph_cache = GraphCache()
+        stock = Stock("AAPL", np.sin(np.linspace(0, 10, 300)) + 2, times)
+        first = Graph([stock], 40, 10, [None], timezone="UTC")
+        first.gen_graph(autocolors.color_list, graph_cache)
+        assert len(graph_cache) == 1
+
+        second = Graph([stock], 40, 10, [None], timezone="UTC")
+        monkeypatch.setattr(second.plot, "show", None)  # must not be drawn again
+        second.gen_graph(autocolors.color_list, graph_cache)
+        assert second() == first()
@@ -0,0 +1,142 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ledger import Ledger, LedgerError, parse_fills
+
+buys = ("10@100", "5@120")
+sells = ("3@122", "8@125")
+
+
+def loaded(mode):
+    ledger = Ledger(mode)
+    ledger.load(buys, sells)
+    return ledger
+
+
+def appended(mode):
+    ledger = Ledger(mode)
+    ledger.buy(10, 100)
+    ledger.buy(5, 120)
+    ledger.sell(3, 122)
+    ledger.sell(8, 125)
+    return ledger
+
+
+class TestParseFills:
+    def test_parse(self):
+        counts, prices = parse_fills(("1@2.5", "3@4"))
+        assert list(counts) == [1, 3]
+        assert list(prices) == [2.5, 4]
+
+    def test_single_string(self):
+        counts, prices = parse_fills("1@2.5")
+        assert list(counts) == [1]
+
+    def test_negative(self):
+        with pytest.raises(LedgerError):
+            parse_fills(("1@2", "-1@2"))
+
+    def test_malformed(self):
+        with pytest.raises(LedgerError):
+            parse_fills(("1@2", "12"))
+        with pytest.raises(LedgerError):
+            parse_fills(("1@two",))
+
+    def test_malformed_long_list(self):
+        # the "@" missing from one fill must not be made up by another
+        fills = ("1@2@3", "4") + ("1@10",) * 40
+        with pytest.raises(LedgerError, match="not formatted as count@price"):
+            parse_fills(fills)
+        with pytest.raises(LedgerError, match="not formatted as count@price"):
+            parse_fills(fills[:2])
+
+
+class TestCostBasisModes:
+    def test_net(self):
+        ledger = loaded("net")
+        assert ledger.shares == 4
+        assert ledger.cost == 1600 - 366 - 1000
+        assert ledger.realized == 0
+
+    def test_average(self):
+        ledger = loaded("average")
+        average = 1600 / 15
+        assert ledger.shares == 4
+        assert ledger.cost == pytest.approx(4 * average)
+        assert ledger.realized == pytest.approx(1366 - 11 * average)
+
+    def test_fifo(self):
+        ledger = loaded("fifo")
+        # 10 shares at 100 and 1 at 120 were sold, 4 at 120 are left
+        assert ledger.shares == 4
+        assert ledger.cost == pytest.approx(480)
+        assert ledger.realized == pytest.approx(1366 - 1000 - 120)
+
+    def test_lifo(self):
+        ledger = loaded("lifo")
+        # 5 shares at 120 and 6 at 100 were sold, 4 at 100 are left
+        assert ledger.shares == 4
+        assert ledger.cost == pytest.approx(400)
+        assert ledger.realized == pytest.approx(1366 - 600 - 600)
+
+    def test_unrealized(self):
+        ledger = loaded("fifo")
+        assert ledger.unrealized(130) == pytest.approx(4 * 130 - 480)
+
+    def test_incremental_matches_bulk(self):
+        for mode in ("net", "average", "fifo", "lifo"):
+            bulk, incremental = loaded(mode), appended(mode)
+            assert incremental.shares == pytest.approx(bulk.shares)
+            assert incremental.cost == pytest.approx(bulk.cost)
+            assert incremental.realized == pytest.approx(bulk.realized)
+            assert len(incremental) == len(bulk) == 4
+
+    def test_append_after_load(self):
+        ledger = loaded("fifo")
+        ledger.buy(2, 130)
+        ledger.sell(5, 140)
+        assert ledger.shares == 1
+        assert ledger.cost == pytest.approx(130)
+
+    def test_small_load_matches_vectorized(self, monkeypatch):
+        fills = (("10@100", "5@120", "2@90"), ("3@122", "8@125"))
+        small = {mode: Ledger(mode) for mode in ("net", "average", "fifo", "lifo")}
+        for mode, ledger in small.items():
+            ledger.load(*fills)
+        monkeypatch.setattr("ledger.SMALL_LOAD", 0)
+        for mode, ledger in small.items():
+            vectorized = Ledger(mode)
+            vectorized.load(*fills)
+            assert ledger.shares == pytest.approx(vectorized.shares)
+            assert ledger.cost == pytest.approx(vectorized.cost)
+            assert ledger.realized == pytest.approx(vectorized.realized)
+            assert list(ledger.counts[:5]) == list(vectorized.counts[:5])
+
+    def test_many_fills(self):
+        ledger = Ledger("fifo")
+        for i in range(1000):
+            ledger.buy(2, 10 + i)
+            ledger.sell(1, 20 + i)
+        assert ledger.shares == 1000
+        assert len(ledger) == 2000
+
+
+class TestLedgerErrors:
+    def test_unknown_mode(self):
+        with pytest.raises(LedgerError):
+            Ledger("hifo")
+
+    def test_oversell(self):
+        with pytest.raises(LedgerError):
+            Ledger("fifo").load(("1@10",), ("2@10",))
+        ledger = Ledger("average")
+        ledger.buy(1, 10)
+        with pytest.raises(LedgerError):
+            ledger.sell(2, 10)
+
+    def test_net_allows_oversell(self):
+        ledger = Ledger("net")
+        ledger.load(("1@10",), ("2@10",))
+        assert ledger.shares == -1
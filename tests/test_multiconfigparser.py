@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from multiconfigparser import ConfigParserMultiOpt
+
+portfolio_ini = """
+# a full line comment
+[AAPL]
+graph=True
+buy=10@100
+buy=5@120
+sell=3@122
+; another comment
+sell=8@125
+color=#FFFF00
+
+[SPKE]
+buy=1@10.28
+"""
+
+
+def parse(*texts):
+    config = ConfigParserMultiOpt()
+    for text in texts:
+        config.read_string(text)
+    return config
+
+
+class TestConfigParserMultiOpt:
+    def test_sections(self):
+        assert parse(portfolio_ini).sections() == ["AAPL", "SPKE"]
+
+    def test_duplicate_keys(self):
+        config = parse(portfolio_ini)
+        assert config["AAPL"]["buy"] == ("10@100", "5@120")
+        assert config["AAPL"]["sell"] == ("3@122", "8@125")
+
+    def test_single_keys(self):
+        config = parse(portfolio_ini)
+        assert config["AAPL"]["graph"] == "True"
+        assert config["SPKE"]["buy"] == "1@10.28"
+
+    def test_continuation_lines(self):
+        config = parse("[A]\nnote=first\n  second\nnote=third\n  fourth\n")
+        assert config["A"]["note"] == ("first\nsecond", "third\nfourth")
+
+    def test_duplicates_across_reads(self):
+        config = parse("[A]\nbuy=1@1\nbuy=2@2\n", "[A]\nbuy=3@3\n")
+        assert config["A"]["buy"] == ("1@1", "2@2", "3@3")
+
+    def test_many_duplicates(self):
+        fills = ["buy=" + str(i) + "@1" for i in range(1, 20001)]
+        config = parse("[A]\n" + "\n".join(fills) + "\n")
+        assert len(config["A"]["buy"]) == 20000
+        assert config["A"]["buy"][-1] == "20000@1"
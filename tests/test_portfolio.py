@@ -22,6 +22,21 @@ class BlankStocksConfig:
         return list(self.tickers.keys())
 
 
+@pytest.fixture
+def blank_portfolio(monkeypatch):
+    """The Portfolio singleton emptied by reset(), restored after the test"""
+    my_portfolio = portfolio.Portfolio()
+    for name in vars(my_portfolio):
+        monkeypatch.setattr(my_portfolio, name, getattr(my_portfolio, name))
+    my_portfolio.provider = None
+    my_portfolio.graph_cache = None
+    my_portfolio.store = None
+    my_portfolio.pool = None
+    my_portfolio.reset()
+    yield my_portfolio
+    my_portfolio.close()
+
+
 class TestStockDataclass:
 
     my_stock = portfolio.Stock("TEST", [2, 1, 3, 5, 4])
@@ -51,6 +66,29 @@ class TestStockDataclass:
         return self.my_stock.change_percentage == 100
 
 
+class TestStockExtend:
+    full_stock = portfolio.Stock("TEST", [2, 1, 3, 5, 4])
+
+    @pytest.fixture
+    def my_stock(self):
+        my_stock = portfolio.Stock("TEST", [2, 1, 3])
+        my_stock.extend([5, 4])
+        return my_stock
+
+    def test_data(self, my_stock):
+        assert list(my_stock.data) == [2, 1, 3, 5, 4]
+
+    def test_statistics(self, my_stock):
+        for attribute in ("curr_value", "open_value", "high", "low", "average"):
+            assert getattr(my_stock, attribute) == getattr(
+                self.full_stock, attribute
+            )
+
+    def test_change(self, my_stock):
+        assert my_stock.change_amount == self.full_stock.change_amount
+        assert my_stock.change_percentage == self.full_stock.change_percentage
+
+
 class TestPortfolioEntryDataclass:
 
     my_stock = portfolio.Stock("TEST", [2, 1, 3, 5, 4])
@@ -155,11 +193,28 @@ class TestPortfolio:
 
         assert not errors, "errors occured:\n{}".format("\n".join(errors))
 
-    def test_download_market_data(self):
+    def test_download_market_data(self, blank_portfolio, monkeypatch):
+        import types
+        import pandas as pd
+
+        # yfinance is replaced by a stub, the download must work offline
+        index = pd.date_range("2021-03-01 14:30", periods=3, freq="1min", tz="UTC")
+        results = [DataFrame({("Open", "AAPL"): [1.0, 2.0, 3.0]}, index=index)]
+        monkeypatch.setitem(
+            sys.modules,
+            "yfinance",
+            types.SimpleNamespace(download=lambda tickers, **kwargs: results[0]),
+        )
+        blank_portfolio.provider = portfolio.providers.YahooProvider()
+        blank_portfolio.provider.backoff = 0
         assert (
-            type(self.my_portfolio.download_market_data(BlankArgs(), ["AAPL"]))
+            type(blank_portfolio.download_market_data(BlankArgs(), ["AAPL"]))
             == DataFrame
         )
+
+        # an empty download is reported instead of being handed on
+        results[0] = DataFrame()
+        assert blank_portfolio.download_market_data(BlankArgs(), ["AAPL"]) is None
     
     def test_populate(self):
         errors = []
@@ -212,3 +267,162 @@ class TestPortfolio:
             )
         assert not errors, "errors occured:\n{}".format("\n".join(errors))
 
+
+
+class TestApplyUpdates:
+    def test_apply_updates(self, blank_portfolio):
+        import numpy as np
+        import pandas as pd
+
+        my_portfolio = blank_portfolio
+        index = pd.date_range("2021-03-01 14:30", periods=4, freq="1min", tz="UTC")
+        times = index.values
+        my_portfolio.add_entry(
+            portfolio.Stock("TEST", np.array([2.0, 1.0]), times[:2]), 3, 1, None, False
+        )
+
+        # the first bar is already held and must not be counted twice
+        update = pd.DataFrame({("Open", "TEST"): [1.0, 6.0, 4.0]}, index=index[1:])
+        my_portfolio.apply_updates(update)
+
+        stock = my_portfolio.get_stock("TEST").stock
+        assert list(stock.data) == [2.0, 1.0, 6.0, 4.0]
+        assert stock.last_time() == times[-1]
+        assert my_portfolio.market_value == 12
+        assert my_portfolio.open_market_value == 6
+        assert my_portfolio.get_stock("TEST").gains == 9
+
+
+    def test_partial_batch(self, blank_portfolio):
+        import numpy as np
+        import pandas as pd
+
+        my_portfolio = blank_portfolio
+        index = pd.date_range("2021-03-01 14:30", periods=3, freq="1min", tz="UTC")
+        my_portfolio.add_entry(
+            portfolio.Stock("AAPL", np.array([120.0]), index.values[:1]), 1, 1, None, False
+        )
+
+        # the batch holding AAPL failed, only other tickers came back
+        update = pd.DataFrame(
+            {("Open", "TSLA"): [800.0, 801.0], ("Open", "MSFT"): [230.0, 231.0]},
+            index=index[1:],
+        )
+        with pytest.raises(KeyError):
+            portfolio.extract_series(update, "AAPL")
+        my_portfolio.apply_updates(update)
+
+        assert list(my_portfolio.get_stock("AAPL").stock.data) == [120.0]
+        assert my_portfolio.market_value == 120
+
+
+class TestParallelGraphs:
+    def test_same_graphs_as_serial(self, blank_portfolio, monkeypatch):
+        import numpy as np
+
+        my_portfolio = blank_portfolio
+        monkeypatch.setattr(portfolio, "available_cores", lambda: 2)
+
+        minutes = np.arange(1000).astype("timedelta64[m]")
+        times = np.datetime64("2021-03-01T14:30", "ns") + minutes
+        for i, symbol in enumerate(["AAA", "BBB", "CCC"]):
+            data = np.sin(np.linspace(0, 10 + i, 1000)) + 5
+            stock = portfolio.Stock(symbol, data, times)
+            my_portfolio.add_entry(stock, 1, 1, None, True)
+
+        my_portfolio.gen_graphs(True, 40, 10, "America/New_York")
+        serial = [graph() for graph in my_portfolio.graphs]
+        my_portfolio.gen_graphs(True, 40, 10, "America/New_York", parallel=True)
+        parallel = [graph() for graph in my_portfolio.graphs]
+        assert isinstance(my_portfolio.graphs[0], portfolio.RenderedGraph)
+        assert parallel == serial
+
+    def test_pool_is_reused(self, blank_portfolio, monkeypatch):
+        import numpy as np
+
+        my_portfolio = blank_portfolio
+        monkeypatch.setattr(portfolio, "available_cores", lambda: 2)
+        for symbol in ["AAA", "BBB"]:
+            stock = portfolio.Stock(symbol, np.arange(100.0) + len(symbol))
+            my_portfolio.add_entry(stock, 1, 1, None, True)
+
+        my_portfolio.gen_graphs(True, 40, 10, "UTC", parallel=True)
+        pool = my_portfolio.pool
+        my_portfolio.gen_graphs(True, 40, 10, "UTC", parallel=True)
+        assert my_portfolio.pool is pool
+
+        my_portfolio.close()
+        assert my_portfolio.pool is None
+        my_portfolio.gen_graphs(True, 40, 10, "UTC", parallel=True)
+        assert len(my_portfolio.graphs) == 2
+
+
+class TestIncrementalUpdates:
+    @pytest.fixture
+    def my_portfolio(self, blank_portfolio):
+        import numpy as np
+
+        my_portfolio = blank_portfolio
+        my_portfolio.add_entry(
+            portfolio.Stock("A", np.array([2.0, 1.0])), 3, 1, None, False
+        )
+        my_portfolio.add_entry(
+            portfolio.Stock("B", np.array([10.0, 12.0])), 1, 11, None, False
+        )
+        return my_portfolio
+
+    def test_update_price(self, my_portfolio):
+        version = my_portfolio.version
+        my_portfolio.update_price("A", 5)
+
+        entry = my_portfolio.get_stock("A")
+        assert (entry.stock.curr_value, entry.stock.high) == (5, 5)
+        assert entry.stock.average == 1.5  # a quote is not a bar
+        assert entry.gains == 12
+        assert my_portfolio.market_value == 15 + 12
+        assert my_portfolio.open_market_value == 6 + 10
+        assert my_portfolio.cost_value == 3 + 11
+        assert my_portfolio.version > version
+
+    def test_update_bars_matches_rebuild(self, my_portfolio):
+        import numpy as np
+
+        for price in [3.0, float("nan"), 0.5, 4.0]:
+            my_portfolio.update_bars("A", [price])
+
+        stock = my_portfolio.get_stock("A").stock
+        rebuilt = portfolio.Stock("A", [2.0, 1.0, 3.0, 0.5, 4.0])
+        assert list(stock.data) == rebuilt.data
+        for attribute in ("curr_value", "high", "low", "average", "change_amount"):
+            assert getattr(stock, attribute) == getattr(rebuilt, attribute)
+        assert my_portfolio.market_value == 12 + 12
+
+    def test_update_bars_grows_in_place(self, my_portfolio):
+        my_portfolio.update_bars("B", [13.0])
+        stock = my_portfolio.get_stock("B").stock
+        buffer = stock.data_buffer
+        for price in range(20):
+            my_portfolio.update_bars("B", [float(price)])
+        assert stock.data_buffer is buffer
+        assert len(stock.data) == 23
+
+    def test_update_bars_from_store_window(self, blank_portfolio, tmp_path):
+        import numpy as np
+        import pricestore
+
+        my_portfolio = blank_portfolio
+        bars = np.zeros(4, dtype=pricestore.BAR)
+        bars["time"] = np.arange(4) * 60 * 10**9
+        bars["open"] = [1.0, 2.0, 3.0, 4.0]
+        store = pricestore.PriceStore(str(tmp_path))
+        store.append("A", "1m", bars)
+
+        my_portfolio.add_entry(
+            portfolio.Stock.from_bars("A", store.window("A", "1m")[:2]), 2, 1, None, False
+        )
+        # the first two bars are held already
+        my_portfolio.update_bars("A", store.window("A", "1m"))
+        assert list(my_portfolio.get_stock("A").stock.data) == [1.0, 2.0, 3.0, 4.0]
+        assert my_portfolio.market_value == 8
+        with pytest.raises(ValueError):
+            my_portfolio.update_bars("A", [5.0])
@@ -0,0 +1,132 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import portfolio
+from pricematrix import PriceMatrix, value_curve
+
+nan = float("nan")
+
+
+class TestPriceMatrix:
+
+    my_matrix = PriceMatrix(
+        ["TEST_1", "TEST_2", "EMPTY"],
+        [
+            [2, 1, 3, 5, 4],
+            [nan, 6, nan, 2, nan],
+            [nan, nan, nan, nan, nan],
+        ],
+        np.arange(5),
+    )
+
+    def test_open_and_current(self):
+        assert list(self.my_matrix.open_value[:2]) == [2, 6]
+        assert list(self.my_matrix.curr_value[:2]) == [4, 2]
+
+    def test_high_low_average(self):
+        assert list(self.my_matrix.high[:2]) == [5, 6]
+        assert list(self.my_matrix.low[:2]) == [1, 2]
+        assert list(self.my_matrix.average[:2]) == [3, 4]
+
+    def test_empty_row(self):
+        assert not self.my_matrix.has_data("EMPTY")
+        assert np.isnan(self.my_matrix.curr_value[2])
+        assert np.isnan(self.my_matrix.high[2])
+
+    def test_series(self):
+        data, times = self.my_matrix.series("TEST_2")
+        assert list(data) == [6, 2]
+        assert list(times) == [1, 3]
+
+
+class TestStockFromMatrix:
+
+    my_matrix = PriceMatrix(["TEST"], [[2, nan, 1, 3, 5, 4]])
+    my_stock = portfolio.Stock.from_matrix(my_matrix, "TEST")
+    reference = portfolio.Stock("TEST", [2, 1, 3, 5, 4])
+
+    def test_data(self):
+        assert list(self.my_stock.data) == list(self.reference.data)
+
+    def test_statistics(self):
+        for attribute in (
+            "curr_value",
+            "open_value",
+            "high",
+            "low",
+            "average",
+            "change_amount",
+            "change_percentage",
+        ):
+            assert getattr(self.my_stock, attribute) == getattr(
+                self.reference, attribute
+            )
+
+
+class TestFromDownload:
+    def test_multi_ticker(self):
+        index = pd.date_range("2021-03-01 14:30", periods=3, freq="1min", tz="UTC")
+        market_data = pd.DataFrame(
+            {("Open", "TEST_1"): [1.0, nan, 3.0], ("Open", "TEST_2"): [nan, 5.0, 6.0]},
+            index=index,
+        )
+        my_matrix = PriceMatrix.from_download(
+            market_data, ["TEST_2", "TEST_1", "MISSING"]
+        )
+
+        assert list(my_matrix.curr_value[:2]) == [6, 3]
+        assert not my_matrix.has_data("MISSING")
+        data, times = my_matrix.series("TEST_1")
+        assert list(data) == [1, 3]
+        assert list(times) == [index.values[0], index.values[2]]
+
+    def test_single_ticker_layout(self):
+        market_data = pd.DataFrame({"Open": [1.0, 2.0, nan]})
+        my_matrix = PriceMatrix.from_download(market_data, ["TEST"])
+        assert list(my_matrix.series("TEST")[0]) == [1, 2]
+
+
+class TestValueCurve:
+    def test_matches_forward_filled_matrix(self):
+        rng = np.random.default_rng(1)
+        series = []
+        for _ in range(20):
+            times = np.sort(rng.choice(200, rng.integers(1, 60), replace=False))
+            series.append((rng.random(len(times)) * 100, times))
+        counts = rng.integers(0, 10, len(series)).astype(float)
+
+        frame = pd.DataFrame({i: pd.Series(v, t) for i, (v, t) in enumerate(series)})
+        expected = frame.sort_index().ffill().bfill().to_numpy() @ counts
+
+        times, values = value_curve(series, counts)
+        assert list(times) == list(frame.sort_index().index)
+        assert np.allclose(values, expected)
+
+    def test_held_at_first_price_before_first_bar(self):
+        times, values = value_curve(
+            [
+                (np.array([1.0, 2.0]), np.array([0, 2])),
+                (np.array([10.0]), np.array([1])),
+            ],
+            [2, 1],
+        )
+        assert list(times) == [0, 1, 2]
+        assert list(values) == [12.0, 12.0, 14.0]
+
+    def test_holding_without_bars(self):
+        times, values = value_curve(
+            [
+                (np.empty(0), np.empty(0)),
+                (np.array([1.0, 2.0]), np.array([0, 1])),
+            ],
+            [100, 3],
+        )
+        assert list(times) == [0, 1]
+        assert list(values) == [3.0, 6.0]
+
+    def test_empty(self):
+        times, values = value_curve([(np.empty(0), np.empty(0))], [1])
+        assert len(times) == 0 and len(values) == 0
@@ -0,0 +1,160 @@
+import os
+import sys
+import pytest
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cache
+import pricestore
+import portfolio as port
+
+from test_cache import make_frame
+
+
+class TestFrameToBars:
+    def test_converts_to_utc_nanoseconds(self):
+        frame = make_frame("2021-03-01 09:30", 3)
+        bars = pricestore.frame_to_bars(frame)
+        assert bars.dtype == pricestore.BAR
+        assert list(bars["open"]) == [100.0, 101.0, 102.0]
+        assert bars["time"][0] == pd.Timestamp("2021-03-01 14:30").value
+        assert np.all(np.isnan(bars["volume"]))
+
+    def test_drops_bars_without_open(self):
+        frame = make_frame("2021-03-01 09:30", 3)
+        frame.iloc[1, 0] = np.nan
+        assert list(pricestore.frame_to_bars(frame)["open"]) == [100.0, 102.0]
+
+
+class TestPriceStore:
+    def test_append_and_read(self, tmp_path):
+        store = pricestore.PriceStore(str(tmp_path))
+        bars = pricestore.frame_to_bars(make_frame("2021-03-01 09:30", 5))
+        assert store.append("AAPL", "1m", bars) == 5
+
+        stored = store.bars("AAPL", "1m")
+        assert isinstance(stored, np.memmap)
+        assert stored.tobytes() == bars.tobytes()
+        assert store.last_time("AAPL", "1m") == bars["time"][-1]
+        assert len(store.bars("MSFT", "1m")) == 0
+        assert store.last_time("MSFT", "1m") is None
+
+    def test_append_skips_stored_bars(self, tmp_path):
+        store = pricestore.PriceStore(str(tmp_path))
+        store.append(
+            "AAPL", "1m", pricestore.frame_to_bars(make_frame("2021-03-01 09:30", 5))
+        )
+        overlap = pricestore.frame_to_bars(make_frame("2021-03-01 09:32", 5, base=0))
+        assert store.append("AAPL", "1m", overlap) == 2
+
+        stored = store.bars("AAPL", "1m")
+        assert len(stored) == 7
+        assert list(stored["open"][-3:]) == [104.0, 3.0, 4.0]
+        assert np.all(np.diff(stored["time"]) > 0)
+
+    def test_torn_record_is_ignored(self, tmp_path):
+        store = pricestore.PriceStore(str(tmp_path))
+        bars = pricestore.frame_to_bars(make_frame("2021-03-01 09:30", 3))
+        store.append("AAPL", "1m", bars)
+        with open(store.path("AAPL", "1m"), "ab") as fp:
+            fp.write(b"\0" * 10)  # a crash in the middle of an append
+
+        assert len(store.bars("AAPL", "1m")) == 3
+        later = pricestore.frame_to_bars(make_frame("2021-03-01 09:33", 2))
+        assert store.append("AAPL", "1m", later) == 2
+        assert len(store.bars("AAPL", "1m")) == 5
+        size = os.path.getsize(store.path("AAPL", "1m"))
+        assert size == pricestore.HEADER_BYTES + 5 * pricestore.BAR.itemsize
+
+    def test_foreign_file_is_ignored(self, tmp_path):
+        store = pricestore.PriceStore(str(tmp_path))
+        with open(store.path("AAPL", "1m"), "wb") as fp:
+            fp.write(b"x" * 200)
+        with pytest.warns(UserWarning):
+            assert len(store.bars("AAPL", "1m")) == 0
+
+    def test_window_is_a_view(self, tmp_path):
+        store = pricestore.PriceStore(str(tmp_path))
+        bars = pricestore.frame_to_bars(make_frame("2021-03-01 09:30", 120))
+        store.append("AAPL", "1m", bars)
+
+        window = store.window("AAPL", "1m", "30m")
+        assert np.shares_memory(window, store.bars("AAPL", "1m"))
+        assert len(window) == 30
+        assert window["open"][-1] == 219.0
+        assert len(store.window("AAPL", "1m", start=bars["time"][100])) == 20
+
+    def test_day_window_counts_trading_dates(self, tmp_path):
+        store = pricestore.PriceStore(str(tmp_path))
+        # a friday and the monday after it
+        for day in ["2021-03-05 09:30", "2021-03-08 09:30"]:
+            store.append("AAPL", "1m", pricestore.frame_to_bars(make_frame(day, 10)))
+
+        frame = pd.concat(
+            [make_frame("2021-03-05 09:30", 10), make_frame("2021-03-08 09:30", 10)]
+        )
+        for period in ["1d", "2d", "5d", "1mo", "max"]:
+            expected = cache.trim_to_period(frame, period)
+            assert len(store.window("AAPL", "1m", period)) == len(expected)
+
+
+class TestStoreBackedPortfolio:
+    @pytest.fixture
+    def portfolio(self, monkeypatch):
+        portfolio = port.Portfolio()
+        for name, value in [
+            ("stocks", {}),
+            ("graphs", []),
+            ("store", None),
+            ("provider", None),
+            ("open_market_value", 0),
+            ("cost_value", 0),
+            ("market_value", 0),
+        ]:
+            monkeypatch.setattr(portfolio, name, value)
+        return portfolio
+
+    def test_stock_from_bars(self, tmp_path):
+        store = pricestore.PriceStore(str(tmp_path))
+        store.append(
+            "AAPL", "1m", pricestore.frame_to_bars(make_frame("2021-03-01 09:30", 5))
+        )
+        stock = port.Stock.from_bars("AAPL", store.window("AAPL", "1m"))
+        assert (stock.open_value, stock.curr_value) == (100.0, 104.0)
+        assert (stock.low, stock.high, stock.average) == (100.0, 104.0, 102.0)
+        assert stock.times[0] == np.datetime64("2021-03-01T14:30")
+
+    def test_only_newer_bars_are_downloaded(self, tmp_path, portfolio):
+        class Provider:
+            streams = False
+
+            def __init__(self):
+                self.calls = []
+
+            def fetch(self, tickers, interval, period=None, start=None):
+                self.calls.append((tuple(tickers), period, start))
+                begin = "2021-03-01 09:30" if start is None else "2021-03-01 09:33"
+                return cache.combine_tickers(
+                    {ticker: make_frame(begin, 3) for ticker in tickers}
+                )
+
+        class Args:
+            time_period = "max"
+            time_interval = "1m"
+            store_dir = str(tmp_path)
+
+        portfolio.provider = Provider()
+        data = portfolio.load_market_data(Args, ["AAPL"], "max", "1m")
+        assert portfolio.provider.calls[0][2] is None
+        assert portfolio.build_stocks(Args, ["AAPL"], data)["AAPL"].curr_value == 102.0
+
+        data = portfolio.load_market_data(Args, ["AAPL"], "max", "1m")
+        assert portfolio.provider.calls[1][1:] == (
+            None,
+            pd.Timestamp("2021-03-01 14:32", tz="UTC").to_pydatetime(),
+        )
+        stock = portfolio.build_stocks(Args, ["AAPL"], data)["AAPL"]
+        assert len(stock.data) == 6
+        assert stock.curr_value == 102.0
+        assert stock.open_value == 100.0
@@ -0,0 +1,107 @@
+import io
+import os
+import sys
+import json
+import pstats
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import profiler
+
+
+@pytest.fixture
+def run_profiler():
+    run_profiler = profiler.Profiler().start()
+    yield run_profiler
+    run_profiler.stop()
+
+
+class TestDisabled:
+    def test_hooks_do_nothing(self):
+        assert profiler.active is None
+        assert profiler.phase("populate") is profiler.phase("render")
+        with profiler.phase("populate"):
+            profiler.count("bars", 10)
+        assert profiler.active is None
+
+
+class TestProfiler:
+    def test_nested_phases(self, run_profiler):
+        with profiler.phase("populate"):
+            for _ in range(3):
+                with profiler.phase("download"):
+                    pass
+        with profiler.phase("render"):
+            pass
+
+        assert list(run_profiler.phases) == [
+            "populate",
+            "populate/download",
+            "render",
+        ]
+        assert run_profiler.phases["populate/download"][1] == 3
+        assert (
+            run_profiler.phases["populate"][0]
+            >= run_profiler.phases["populate/download"][0]
+        )
+
+    def test_counts(self, run_profiler):
+        profiler.count("tickers", 2)
+        profiler.count("bars", 390)
+        profiler.count("bars", 390)
+        assert run_profiler.counts == {"tickers": 2, "bars": 780}
+
+    def test_phase_survives_errors(self, run_profiler):
+        with pytest.raises(KeyError):
+            with profiler.phase("populate"):
+                raise KeyError("AAPL")
+        assert run_profiler.stack == []
+        assert run_profiler.phases["populate"][1] == 1
+
+    def test_stop_disables(self):
+        run_profiler = profiler.Profiler().start()
+        assert profiler.active is run_profiler
+        run_profiler.stop()
+        assert profiler.active is None
+        assert run_profiler.elapsed > 0
+
+
+class TestReport:
+    def test_text(self):
+        run_profiler = profiler.Profiler().start()
+        with profiler.phase("populate"):
+            with profiler.phase("download"):
+                pass
+        profiler.count("tickers", 2)
+        run_profiler.stop()
+
+        out = io.StringIO()
+        run_profiler.report(out)
+        lines = out.getvalue().split("\n")
+        assert lines[0].startswith("Profile, ")
+        assert lines[1].split()[0] == "populate"
+        assert lines[2].startswith("    download")
+        assert lines[3] == "  tickers 2"
+
+    def test_json(self):
+        run_profiler = profiler.Profiler("json").start()
+        with profiler.phase("render"):
+            pass
+        run_profiler.stop()
+
+        out = io.StringIO()
+        run_profiler.report(out)
+        record = json.loads(out.getvalue())
+        assert record["phases"]["render"]["calls"] == 1
+        assert record["total"] >= record["phases"]["render"]["seconds"]
+
+    def test_cprofile_dump(self, tmp_path):
+        path = str(tmp_path / "run.prof")
+        run_profiler = profiler.Profiler(dump=path).start()
+        sorted(range(1000))
+        run_profiler.stop()
+        assert pstats.Stats(path).total_calls > 0
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            profiler.Profiler("xml")
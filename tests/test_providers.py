@@ -0,0 +1,386 @@
+import os
+import sys
+import time
+import types
+import subprocess
+import pytest
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"
+    )
+)
+import mockquotes
+import cache
+import portfolio
+import providers
+
+
+class ReplayArgs:
+    time_period = "1d"
+    time_interval = "1m"
+    provider = "replay"
+
+    def __init__(self, replay_dir):
+        self.replay_dir = replay_dir
+
+
+def make_frame(start, periods, base=100.0):
+    index = pd.date_range(start, periods=periods, freq="1min", tz="UTC")
+    values = [base + i for i in range(periods)]
+    return pd.DataFrame(
+        {
+            "Close": values,
+            "High": values,
+            "Low": values,
+            "Open": values,
+            "Volume": [1000] * periods,
+        },
+        index=index,
+    )
+
+
+@pytest.fixture
+def replay_dir(tmp_path):
+    recorded = cache.combine_tickers(
+        {
+            "AAPL": make_frame("2021-03-01 14:30", 5),
+            "TSLA": make_frame("2021-03-01 14:31", 4, base=600.0),
+        }
+    )
+    providers.record_market_data(recorded, ["AAPL", "TSLA"], "1m", str(tmp_path))
+    return str(tmp_path)
+
+
+class TestReplayProvider:
+    def test_download_layout(self, replay_dir):
+        market_data = providers.ReplayProvider(replay_dir).download(
+            ["AAPL", "TSLA"], "1m", period="1d"
+        )
+        assert isinstance(market_data.columns, pd.MultiIndex)
+        assert list(market_data["Open"].columns) == ["AAPL", "TSLA"]
+        assert len(market_data) == 5
+        # bars missing for one ticker are NaN, like a yfinance download
+        assert pd.isna(market_data["Open"]["TSLA"].iloc[0])
+
+    def test_download_start(self, replay_dir):
+        market_data = providers.ReplayProvider(replay_dir).download(
+            ["AAPL"], "1m", start=pd.Timestamp("2021-03-01 14:33", tz="UTC")
+        )
+        assert list(market_data["Open"]["AAPL"]) == [103.0, 104.0]
+
+    def test_missing_ticker(self, replay_dir):
+        market_data = providers.ReplayProvider(replay_dir).download(
+            ["AAPL", "MSFT"], "1m", period="1d"
+        )
+        assert list(market_data["Open"].columns) == ["AAPL"]
+
+
+class TestFromArgs:
+    def test_default(self):
+        assert isinstance(providers.from_args(object()), providers.YahooProvider)
+
+    def test_replay_needs_directory(self):
+        args = ReplayArgs(None)
+        with pytest.raises(ValueError):
+            providers.from_args(args)
+
+    def test_unknown(self):
+        args = ReplayArgs("data")
+        args.provider = "carrier-pigeon"
+        with pytest.raises(ValueError):
+            providers.from_args(args)
+
+
+class FlakyProvider(providers.ReplayProvider):
+    """Replays recorded bars, but fails some batches first"""
+
+    backoff = 0
+
+    def __init__(self, directory, failures=None, delays=None):
+        super().__init__(directory)
+        self.failures = dict(failures or {})  # ticker: how often its batch fails
+        self.delays = delays or {}  # ticker: seconds its batch takes
+        self.calls = []
+        return
+
+    def download(self, tickers, interval, period=None, start=None):
+        self.calls.append(list(tickers))
+        for ticker in tickers:
+            time.sleep(self.delays.get(ticker, 0))
+            if self.failures.get(ticker, 0) > 0:
+                self.failures[ticker] -= 1
+                raise ConnectionError("no route to " + ticker)
+        return super().download(tickers, interval, period=period, start=start)
+
+
+@pytest.fixture
+def many_tickers(tmp_path):
+    symbols = ["T{:02}".format(i) for i in range(10)]
+    recorded = cache.combine_tickers(
+        {
+            symbol: make_frame("2021-03-01 14:30", 3 + i % 3, base=10.0 * i)
+            for i, symbol in enumerate(symbols)
+        }
+    )
+    providers.record_market_data(recorded, symbols, "1m", str(tmp_path))
+    return str(tmp_path), symbols
+
+
+class TestFetch:
+    def test_batches_merge(self, many_tickers):
+        replay_dir, symbols = many_tickers
+        expected = providers.ReplayProvider(replay_dir).download(symbols, "1m", "1d")
+
+        provider = FlakyProvider(replay_dir)
+        provider.batch_size = 3
+        market_data = provider.fetch(symbols, "1m", period="1d")
+        assert sorted(map(len, provider.calls)) == [1, 3, 3, 3]
+        pd.testing.assert_frame_equal(market_data, expected)
+
+    def test_retries(self, many_tickers):
+        replay_dir, symbols = many_tickers
+        provider = FlakyProvider(replay_dir, failures={"T04": 2})
+        provider.batch_size = 3
+        market_data = provider.fetch(symbols, "1m", period="1d")
+        assert list(market_data["Open"].columns) == symbols
+        assert len(provider.calls) == 6
+
+    def test_failed_batch(self, many_tickers):
+        replay_dir, symbols = many_tickers
+        provider = FlakyProvider(replay_dir, failures={"T04": 3})
+        provider.batch_size = 3
+        with pytest.warns(UserWarning, match="3 of 10 tickers"):
+            market_data = provider.fetch(symbols, "1m", period="1d")
+        assert list(market_data["Open"].columns) == symbols[:3] + symbols[6:]
+
+    def test_everything_failed(self, many_tickers):
+        replay_dir, symbols = many_tickers
+        provider = FlakyProvider(replay_dir, failures={s: 3 for s in symbols})
+        provider.batch_size = 3
+        with pytest.raises(providers.DownloadError):
+            provider.fetch(symbols, "1m", period="1d")
+
+    def test_deadline(self, many_tickers):
+        replay_dir, symbols = many_tickers
+        provider = FlakyProvider(replay_dir, delays={"T09": 2})
+        provider.batch_size = 3
+        provider.deadline = 0.5
+        started = time.monotonic()
+        with pytest.warns(UserWarning, match="1 of 10 tickers"):
+            market_data = provider.fetch(symbols, "1m", period="1d")
+        assert time.monotonic() - started < 1.5
+        assert list(market_data["Open"].columns) == symbols[:9]
+
+    def test_options(self):
+        args = ReplayArgs("data")
+        args.download_batch_size = 7
+        args.download_retries = 0
+        provider = providers.from_args(args)
+        assert (provider.batch_size, provider.retries) == (7, 0)
+        args.download_workers = 0
+        with pytest.raises(ValueError):
+            providers.from_args(args)
+
+
+class TestYahooProvider:
+    """yfinance itself is replaced by a stub handing out prepared frames"""
+
+    @pytest.fixture
+    def yahoo(self, monkeypatch):
+        results = []
+        calls = []
+
+        def download(tickers, **kwargs):
+            calls.append(list(tickers))
+            return results.pop(0) if len(results) > 1 else results[0]
+
+        monkeypatch.setitem(
+            sys.modules, "yfinance", types.SimpleNamespace(download=download)
+        )
+        provider = providers.YahooProvider()
+        provider.backoff = 0
+        return provider, results, calls
+
+    def test_empty_frame_is_retried(self, yahoo):
+        provider, results, calls = yahoo
+        results += [pd.DataFrame(), pd.DataFrame()]
+        with pytest.raises(providers.DownloadError):
+            provider.fetch(["AAPL", "TSLA"], "1m", period="1d")
+        assert len(calls) == provider.retries + 1
+
+        calls.clear()
+        full = cache.combine_tickers({"AAPL": make_frame("2021-03-01 14:30", 3)})
+        results[:] = [pd.DataFrame(), full]
+        market_data = provider.fetch(["AAPL"], "1m", period="1d")
+        assert len(calls) == 2
+        pd.testing.assert_frame_equal(market_data, full)
+
+    def test_missing_ticker_is_not_retried(self, yahoo):
+        provider, results, calls = yahoo
+        provider.backoff = 1.0
+        results.append(
+            cache.combine_tickers(
+                {
+                    "AAPL": make_frame("2021-03-01 14:30", 3),
+                    "DELISTED": make_frame("2021-03-01 14:30", 3) * float("nan"),
+                }
+            )
+        )
+        started = time.monotonic()
+        market_data = provider.fetch(["AAPL", "DELISTED"], "1m", period="1d")
+        assert time.monotonic() - started < 0.5
+        assert len(calls) == 1
+        assert market_data["Open"]["AAPL"].iloc[0] == 100.0
+        assert market_data["Open"]["DELISTED"].isna().all()
+
+
+@pytest.fixture
+def quote_server():
+    server = mockquotes.MockQuoteServer(bars=30)
+    server.url = server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def chart_provider(quote_server):
+    provider = providers.ChartProvider(quote_server.url, connections=2)
+    provider.backoff = 0
+    yield provider
+    provider.close()
+
+
+class TestChartProvider:
+    def test_download(self, quote_server, chart_provider):
+        symbols = ["T{:02}".format(i) for i in range(20)]
+        market_data = chart_provider.download(symbols, "1m", period="1d")
+        assert list(market_data["Open"].columns) == symbols
+        assert len(market_data) == 30
+
+        expected = mockquotes.chart_response("T07", bars=30)["chart"]["result"][0]
+        assert list(market_data["Close"]["T07"]) == (
+            expected["indicators"]["quote"][0]["close"]
+        )
+        assert market_data.index[0] == pd.Timestamp(
+            expected["timestamp"][0], unit="s", tz="UTC"
+        )
+        # every request went over the two pooled connections
+        assert quote_server.connections == 2
+        assert quote_server.requests == 20
+
+    def test_stream(self, chart_provider):
+        symbols = ["T{:02}".format(i) for i in range(20)]
+        seen = []
+        for frames in chart_provider.stream(symbols, "1m", period="1d"):
+            assert len(frames) > 0
+            seen += list(frames)
+        assert sorted(seen) == symbols
+
+    def test_unknown_tickers(self, chart_provider):
+        market_data = chart_provider.download(["AAA", "MISSING"], "1m", "1d")
+        assert list(market_data["Open"].columns) == ["AAA"]
+        assert len(chart_provider.download(["MISSING"], "1m", "1d").columns) == 0
+
+    def test_retries(self, quote_server, chart_provider):
+        quote_server.fail_every = 3
+        market_data = chart_provider.download(["A", "B", "C", "D"], "1m", "1d")
+        assert list(market_data["Open"].columns) == ["A", "B", "C", "D"]
+
+    def test_semaphore_made_on_the_loop(self, chart_provider):
+        # the pool is built on this thread, its requests run on the loop's
+        chart_provider.start_loop()
+        assert chart_provider.pool.slots is None
+        chart_provider.download(["T{:02}".format(i) for i in range(5)], "1m", "1d")
+        assert chart_provider.pool.slots is not None
+
+    def test_unreachable(self):
+        provider = providers.ChartProvider("http://127.0.0.1:9", connections=2)
+        provider.retries = 0
+        with pytest.raises(providers.DownloadError) as failure:
+            provider.download(["A", "B"], "1m", "1d")
+        provider.close()
+        # every failed ticker is reported, not just the last one to arrive
+        assert "A: " in str(failure.value) and "B: " in str(failure.value)
+
+    def test_asyncio_is_imported_lazily(self):
+        code = "import sys, providers; sys.exit('asyncio' in sys.modules)"
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
+
+    def test_populate_in_batches(self, chart_provider, monkeypatch):
+        my_portfolio = portfolio.Portfolio()
+        for attribute in ("stocks", "open_market_value", "market_value", "cost_value"):
+            monkeypatch.setattr(
+                my_portfolio, attribute, type(getattr(my_portfolio, attribute))()
+            )
+        monkeypatch.setattr(my_portfolio, "provider", chart_provider)
+
+        class StocksConfig(dict):
+            def sections(self):
+                return list(self.keys())
+
+        symbols = ["T{:02}".format(i) for i in range(12)]
+        batches = []
+        my_portfolio.populate(
+            StocksConfig({symbol: {"buy": "1@10"} for symbol in symbols}),
+            ReplayArgs("data"),
+        )
+        assert list(my_portfolio.stocks) == symbols
+
+        monkeypatch.setattr(my_portfolio, "stocks", {})
+        positions = my_portfolio.compile_positions(
+            StocksConfig({symbol: {"buy": "1@10"} for symbol in symbols})
+        )
+        my_portfolio.populate_positions(
+            positions,
+            ReplayArgs("data"),
+            on_batch=lambda: batches.append(len(my_portfolio.stocks)),
+        )
+        assert batches[-1] == len(symbols)
+        assert batches == sorted(batches)
+
+
+class TestReplayPopulate:
+    def test_populate(self, replay_dir, monkeypatch):
+        my_portfolio = portfolio.Portfolio()
+        for attribute in ("stocks", "open_market_value", "market_value", "cost_value"):
+            monkeypatch.setattr(
+                my_portfolio, attribute, type(getattr(my_portfolio, attribute))()
+            )
+        monkeypatch.setattr(my_portfolio, "provider", None)
+
+        stocks_config = {"AAPL": {"buy": "2@100"}, "TSLA": {"graph": "True"}}
+
+        class StocksConfig(dict):
+            def sections(self):
+                return list(self.keys())
+
+        my_portfolio.populate(StocksConfig(stocks_config), ReplayArgs(replay_dir))
+
+        assert isinstance(my_portfolio.provider, providers.ReplayProvider)
+        assert my_portfolio.get_stock("AAPL").stock.curr_value == 104.0
+        assert my_portfolio.get_stock("TSLA").stock.open_value == 600.0
+        assert my_portfolio.market_value == 208.0
+
+    def test_offline(self, monkeypatch):
+        my_portfolio = portfolio.Portfolio()
+        for attribute in ("stocks", "open_market_value", "market_value", "cost_value"):
+            monkeypatch.setattr(
+                my_portfolio, attribute, type(getattr(my_portfolio, attribute))()
+            )
+        provider = FlakyProvider("data", failures={"AAPL": 3})
+        monkeypatch.setattr(my_portfolio, "provider", provider)
+
+        class StocksConfig(dict):
+            def sections(self):
+                return list(self.keys())
+
+        # a download that raised used to crash populate
+        with pytest.warns(UserWarning, match="No market data"):
+            my_portfolio.populate(
+                StocksConfig({"AAPL": {"buy": "2@100"}}), ReplayArgs("data")
+            )
+        assert len(my_portfolio.stocks) == 0
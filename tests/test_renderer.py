@@ -0,0 +1,160 @@
+import io
+import os
+import sys
+import pytest
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import renderer
+import portfolio
+
+from colorama import Back, Style
+
+tricky = [
+    0.0,
+    -0.0,
+    float("nan"),
+    0.001,
+    0.005,
+    -0.015,
+    1.005,
+    2.675,
+    10.3,
+    1e14 + 0.25,
+]
+
+
+class TestFormatNumbers:
+    @pytest.mark.parametrize("convert", [float, np.float64, int])
+    def test_same_as_format_number(self, convert):
+        rng = np.random.default_rng(0)
+        values = [convert(v) for v in rng.normal(0, 1000, 2000).tolist()]
+        values += [convert(v) for v in tricky if v == v or convert is not int]
+        expected = [renderer.format_number(v) for v in values]
+        assert renderer.format_numbers(values) == expected
+
+    def test_mixed_column(self):
+        # update_price leaves a python float among the numpy ones
+        values = [np.float64(v) for v in tricky] + tricky + [3, np.float64(2.675)]
+        values = values[::2] + values[1::2]
+        expected = [renderer.format_number(v) for v in values]
+        assert renderer.format_numbers(values) == expected
+
+
+class TestTableTemplate:
+    def test_rows_match_cells(self):
+        entries = [
+            portfolio.PortfolioEntry(portfolio.Stock("A", [2.0, 1.5]), 3, 1.25),
+            portfolio.PortfolioEntry(portfolio.Stock("B", [1.0, 4.0]), 0.5, 3.0),
+            portfolio.PortfolioEntry(portfolio.Stock("C", [5.0, 5.0]), 1, 0.0),
+        ]
+        columns = list(renderer._stock_column_formatters)
+        columns += list(renderer._portfolio_column_formatters)
+        rows = renderer.TableTemplate(columns).rows(entries)
+
+        # the row each column's generator produces cell by cell
+        for i, entry in enumerate(entries):
+            line = "\t" + (Back.LIGHTBLACK_EX if i % 2 == 0 else Back.RESET)
+            for col in columns:
+                formatter = renderer._stock_column_formatters.get(col)
+                cell = (
+                    formatter.generator(entry.stock)
+                    if formatter is not None
+                    else renderer._portfolio_column_formatters[col].generator(entry)
+                )
+                formatter = formatter or renderer._portfolio_column_formatters[col]
+                line += cell.color + ("{:" + str(formatter.width) + "}").format(
+                    cell.value
+                )
+            assert rows[i] == line + Style.RESET_ALL
+
+
+class TestRenderer:
+    def test_single_write(self, monkeypatch):
+        my_portfolio = portfolio.Portfolio()
+        monkeypatch.setattr(my_portfolio, "stocks", {})
+        monkeypatch.setattr(my_portfolio, "graphs", [])
+        my_portfolio.add_entry(portfolio.Stock("A", [2.0, 1.5]), 3, 1.25, None, False)
+
+        writes = []
+        stream = io.StringIO()
+        monkeypatch.setattr(stream, "write", writes.append)
+        renderer.Renderer("math", my_portfolio).render(stream=stream)
+        assert len(writes) == 1
+        assert "Portfolio Summary:" in writes[0]
+
+
+def make_entries(changes):
+    return [
+        portfolio.PortfolioEntry(
+            portfolio.Stock("T{:03}".format(i), [100.0, 100.0 + change]), 1, 50.0
+        )
+        for i, change in enumerate(changes)
+    ]
+
+
+class TestTableView:
+    def test_top_n_matches_full_sort(self):
+        rng = np.random.default_rng(0)
+        # plenty of ties, a partial sort must still keep them in portfolio order
+        changes = rng.integers(-20, 20, 500).astype(float)
+        entries = make_entries(changes)
+        index = renderer.TableIndex(entries)
+
+        expected = sorted(range(len(changes)), key=lambda i: (-changes[i], i))
+        for page in [1, 2, 7]:
+            view = renderer.TableView("-chg", limit=15, page=page)
+            rows, total = view.select(index)
+            assert total == len(entries)
+            assert list(rows) == expected[(page - 1) * 15 : page * 15]
+
+    def test_text_column(self):
+        entries = make_entries([1.0, 2.0, 3.0])[::-1]
+        rows, _ = renderer.TableView("ticker").select(renderer.TableIndex(entries))
+        assert [entries[i].stock.symbol for i in rows] == ["T000", "T001", "T002"]
+
+    def test_missing_values_last(self):
+        entries = make_entries([1.0, float("nan"), 3.0])
+        index = renderer.TableIndex(entries)
+        for sort in ["chg", "-chg"]:
+            rows, _ = renderer.TableView(sort).select(index)
+            assert rows[-1] == 1
+
+    def test_filters(self):
+        entries = make_entries([-5.0, 2.0, 8.0, float("nan"), 4.0])
+        filters = [renderer.TableFilter.parse(text) for text in ["chg>0", "Chg <= 4"]]
+        rows, total = renderer.TableView(filters=filters).select(
+            renderer.TableIndex(entries)
+        )
+        assert list(rows) == [1, 4]
+        assert total == 2
+
+    @pytest.mark.parametrize("text", ["chg", "chg ~ 3", "chg > x"])
+    def test_invalid_filter(self, text):
+        with pytest.raises(ValueError):
+            renderer.TableFilter.parse(text)
+
+    def test_invalid_view(self):
+        with pytest.raises(ValueError):
+            renderer.TableView("nope")
+        with pytest.raises(ValueError):
+            renderer.TableView(limit=0)
+        # text columns are turned down before anything is downloaded
+        with pytest.raises(ValueError, match="cannot be filtered"):
+            renderer.TableView(filters=[renderer.TableFilter("ticker", "<", 1)])
+
+    def test_page_footer(self, monkeypatch):
+        my_portfolio = portfolio.Portfolio()
+        monkeypatch.setattr(my_portfolio, "stocks", {})
+        monkeypatch.setattr(my_portfolio, "graphs", [])
+        for entry in make_entries([1.0, 2.0, 3.0, 4.0, 5.0]):
+            my_portfolio.add_entry(entry.stock, 1, 50.0, None, False)
+
+        view = renderer.TableView("-chg", limit=2, page=3)
+        my_renderer = renderer.Renderer("math", my_portfolio)
+        monkeypatch.setattr(my_renderer, "view", view)
+        stream = io.StringIO()
+        my_renderer.render(stream=stream)
+        output = stream.getvalue()
+        assert "T000" in output and "T001" not in output
+        assert "Showing positions 5-5 of 5 (page 3 of 3)" in output
@@ -0,0 +1,53 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sessions import SessionCalendar
+
+
+def bars(start, count, minutes):
+    return np.datetime64(start, "ns") + np.arange(count) * np.timedelta64(minutes, "m")
+
+
+# two regular sessions of 5 minute bars with the night in between
+two_days = np.concatenate(
+    (bars("2021-03-01T14:30", 78, 5), bars("2021-03-02T14:30", 78, 5))
+)
+
+
+class TestSessionCalendar:
+    def test_sessions(self):
+        calendar = SessionCalendar.from_times(two_days)
+        assert len(calendar.starts) == 2
+        assert calendar.step == 300 * 10**9
+
+    def test_night_takes_one_bar(self):
+        calendar = SessionCalendar.from_times(two_days)
+        x = calendar.to_x(two_days)
+        assert np.allclose(np.diff(x), 300)
+        assert calendar.span() == x[-1]
+
+    def test_round_trip(self):
+        calendar = SessionCalendar.from_times(two_days)
+        assert np.array_equal(calendar.to_times(calendar.to_x(two_days)), two_days)
+
+    def test_union_of_series(self):
+        first, second = two_days[:78], two_days[78:]
+        calendar = SessionCalendar.from_times(first, second)
+        assert np.allclose(calendar.to_x(second)[0] - calendar.to_x(first)[-1], 300)
+
+    def test_daily_bars(self):
+        # a weekend is only one bar wider than a weekday
+        days = np.array(
+            ["2021-03-04", "2021-03-05", "2021-03-08", "2021-03-09"],
+            dtype="datetime64[ns]",
+        )
+        calendar = SessionCalendar.from_times(days)
+        assert np.allclose(np.diff(calendar.to_x(days)), 86400)
+        assert calendar.label_format() == "%y-%m-%d"
+
+    def test_single_bar(self):
+        calendar = SessionCalendar.from_times(two_days[:1])
+        assert calendar.to_x(two_days[:1])[0] == 0
+        assert calendar.span() == 0
@@ -0,0 +1,102 @@
+import os
+import sys
+import pickle
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import snapshot
+import portfolio
+from multiconfigparser import ConfigParserMultiOpt
+
+portfolio_ini = """[AAPL]
+graph=True
+buy=10@100
+buy=5@120
+sell=3@122
+color=#FFFF00
+
+[SPKE]
+buy=1@10.28
+"""
+
+
+def compile_file(path, cost_basis="net"):
+    config = ConfigParserMultiOpt()
+    config.read(path)
+    return portfolio.Portfolio().compile_positions(config, cost_basis)
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "portfolio.ini"
+    path.write_text(portfolio_ini)
+    return str(path)
+
+
+class TestSnapshot:
+    def test_missing(self, config_path):
+        assert snapshot.load(config_path, "net") is None
+
+    def test_round_trip(self, config_path):
+        key = snapshot.file_key(config_path)
+        snapshot.store(config_path, "net", compile_file(config_path), key)
+        positions = snapshot.load(config_path, "net")
+
+        assert [position.symbol for position in positions] == ["AAPL", "SPKE"]
+        assert positions[0].graph
+        assert positions[0].color == "#FFFF00"
+        assert positions[0].ledger.shares == 12
+        assert positions[1].ledger.average_cost() == 10.28
+
+    def test_cost_basis_mismatch(self, config_path):
+        key = snapshot.file_key(config_path)
+        snapshot.store(config_path, "net", compile_file(config_path), key)
+        assert snapshot.load(config_path, "fifo") is None
+
+    def test_changed_file(self, config_path):
+        key = snapshot.file_key(config_path)
+        snapshot.store(config_path, "net", compile_file(config_path), key)
+        with open(config_path, "a") as fp:
+            fp.write("buy=1@11\n")
+        assert snapshot.load(config_path, "net") is None
+
+    def test_touched_file(self, config_path):
+        key = snapshot.file_key(config_path)
+        snapshot.store(config_path, "net", compile_file(config_path), key)
+        stat = os.stat(config_path)
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert snapshot.load(config_path, "net") is not None
+        # the snapshot now carries the new mtime
+        with open(snapshot.snapshot_path(config_path), "rb") as fp:
+            assert pickle.load(fp)["mtime"] == os.stat(config_path).st_mtime_ns
+
+    def test_warnings_replayed(self, tmp_path):
+        path = tmp_path / "portfolio.ini"
+        path.write_text("[AAPL]\nbuy=1@100\ncolor=not-a-color\n")
+        key = snapshot.file_key(str(path))
+        with pytest.warns(UserWarning) as caught:
+            positions = compile_file(str(path))
+        messages = [str(warning.message) for warning in caught]
+        snapshot.store(str(path), "net", positions, key, messages)
+
+        with pytest.warns(UserWarning, match="The color selected for AAPL"):
+            assert snapshot.load(str(path), "net")[0].color is None
+
+
+class TestLoadPositions:
+    def test_color_warning_on_every_run(self, tmp_path):
+        import cliStocksTracker
+
+        path = tmp_path / "portfolio.ini"
+        path.write_text("[AAPL]\nbuy=1@100\ncolor=not-a-color\n")
+
+        class Args:
+            no_snapshot = False
+            portfolio_config = str(path)
+            cost_basis = "net"
+
+        for _ in range(2):  # compiled, then loaded from the snapshot
+            with pytest.warns(UserWarning, match="The color selected for AAPL"):
+                cliStocksTracker.load_positions(ConfigParserMultiOpt(), Args)
+        assert os.path.exists(snapshot.snapshot_path(str(path)))